@@ -1,3 +1,3 @@
 from .dag_etl_failure import EtlFailure
-from .dag_generator import DagGenerator, EntityRef, MappingRef
+from .dag_generator import DagGenerator, EntityRef, MappingRef, RunLevelMode, StageColoring
 from .dag_reporting import DagReporting
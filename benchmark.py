@@ -0,0 +1,345 @@
+import argparse
+import random
+import time
+from collections import Counter
+
+import igraph as ig
+import numpy as np
+
+from dag_generator import DagGenerator, RunLevelMode, StageColoring, VertexType
+from dag_propagation import simulate_failures
+from dag_reachability import ReachabilityIndex
+from dag_reporting import DagReporting
+from dag_scheduler import get_barrier_makespan, schedule_list
+from mapping_costs import MappingCosts
+from logtools import get_logger
+
+logger = get_logger(__name__)
+
+
+def generate_dag_ETL(qty_mappings: int, qty_sources_max: int = 4, seed: int = 1) -> ig.Graph:
+    """Generate a random ETL DAG of entities and mappings.
+
+    Each mapping loads a new target entity from a random selection of the entities that exist
+    before it, the first mappings load from source entities of their own.
+
+    Args:
+        qty_mappings (int): Number of mappings in the DAG.
+        qty_sources_max (int, optional): Maximum number of source entities of a mapping. Defaults to 4.
+        seed (int, optional): Seed of the random generator. Defaults to 1.
+
+    Returns:
+        ig.Graph: DAG with the vertex attribute 'type'
+    """
+    rnd = random.Random(seed)
+    types = []
+    edges = []
+    entities = []
+    for _ in range(qty_mappings):
+        mapping = len(types)
+        types.append(VertexType.MAPPING.name)
+        qty_sources = rnd.randint(1, qty_sources_max)
+        if len(entities) < qty_sources:
+            sources = list(range(len(types), len(types) + qty_sources))
+            types.extend([VertexType.ENTITY.name] * qty_sources)
+        else:
+            sources = rnd.sample(entities, qty_sources)
+        edges.extend((source, mapping) for source in sources)
+        target = len(types)
+        types.append(VertexType.ENTITY.name)
+        edges.append((mapping, target))
+        entities.append(target)
+    dag = ig.Graph(n=len(types), edges=edges, directed=True)
+    dag.vs["type"] = types
+    return dag
+
+
+def set_run_levels_subcomponents(dag: ig.Graph) -> None:
+    """Determine the run level of the mappings by counting the mappings upstream of each vertex.
+
+    This takes a traversal for each vertex, it is the baseline the run level modes are compared to.
+
+    Args:
+        dag (ig.Graph): DAG that describes entities and mappings
+
+    Returns:
+        None
+    """
+    types = dag.vs["type"]
+    qty_mappings = [
+        sum(types[vx] == VertexType.MAPPING.name for vx in dag.subcomponent(i, mode="in"))
+        for i in range(dag.vcount())
+    ]
+    # Assign valid run order to mappings only
+    dag.vs["run_level"] = [
+        qty - 1 if role == VertexType.MAPPING.name else -1
+        for qty, role in zip(qty_mappings, types)
+    ]
+
+
+def benchmark_run_levels(qty_mappings: int, include_subcomponents: bool = True) -> list:
+    """Compare the run time and resulting run levels of the ways run levels are determined.
+
+    Args:
+        qty_mappings (int): Number of mappings in the generated ETL DAG.
+        include_subcomponents (bool, optional): Whether to include counting upstream mappings with a
+            traversal per vertex, which is slow for large DAGs. Defaults to True.
+
+    Returns:
+        list: A result for each method, with its run time, number of run levels and the largest
+        number of mappings in a run level
+    """
+    dag = generate_dag_ETL(qty_mappings=qty_mappings)
+    methods = {
+        mode.name: DagGenerator(run_level_mode=mode)._dag_ETL_run_levels
+        for mode in RunLevelMode
+    }
+    if include_subcomponents:
+        methods["SUBCOMPONENTS"] = set_run_levels_subcomponents
+
+    results = []
+    for name, method in methods.items():
+        start = time.perf_counter()
+        method(dag=dag)
+        duration = time.perf_counter() - start
+        qty_by_level = Counter(level for level in dag.vs["run_level"] if level >= 0)
+        results.append(
+            {
+                "method": name,
+                "mappings": qty_mappings,
+                "seconds": round(duration, 4),
+                "run_levels": len(qty_by_level),
+                "max_mappings_per_level": max(qty_by_level.values()),
+            }
+        )
+        logger.info(f"Run levels benchmark: {results[-1]}")
+    return results
+
+
+def benchmark_stage_coloring(qty_mappings: int, qty_sources_max: int = 8) -> list:
+    """Compare the run time and resulting stages of the ways the mappings of a run level are colored.
+
+    The run levels are determined by the longest path, which gives wide run levels with many
+    conflicts between their mappings.
+
+    Args:
+        qty_mappings (int): Number of mappings in the generated ETL DAG.
+        qty_sources_max (int, optional): Maximum number of source entities of a mapping. Defaults to 8.
+
+    Returns:
+        list: A result for each stage coloring, with its run time, number of stages and the largest
+        and average number of mappings in a stage
+    """
+    dag = generate_dag_ETL(qty_mappings=qty_mappings, qty_sources_max=qty_sources_max)
+    DagGenerator(run_level_mode=RunLevelMode.LONGEST_PATH)._dag_ETL_run_levels(dag=dag)
+    results = []
+    for stage_coloring in StageColoring:
+        dag_generator = DagGenerator(stage_coloring=stage_coloring)
+        start = time.perf_counter()
+        dag_generator._dag_ETL_run_level_stages(dag=dag)
+        duration = time.perf_counter() - start
+        sizes = Counter(
+            (level, stage)
+            for level, stage in zip(dag.vs["run_level"], dag.vs["run_level_stage"])
+            if level >= 0
+        )
+        results.append(
+            {
+                "method": stage_coloring.name,
+                "mappings": qty_mappings,
+                "seconds": round(duration, 4),
+                "stages": len(sizes),
+                "max_mappings_per_stage": max(sizes.values()),
+                "avg_mappings_per_stage": round(qty_mappings / len(sizes), 2),
+            }
+        )
+        logger.info(f"Stage coloring benchmark: {results[-1]}")
+    return results
+
+
+def benchmark_reachability(qty_mappings: int, qty_queries: int = 1000, seed: int = 1) -> dict:
+    """Measure the build time and memory of a reachability index and compare its queries to traversals.
+
+    Args:
+        qty_mappings (int): Number of mappings in the generated ETL DAG.
+        qty_queries (int, optional): Number of random vertices to query the ancestors of. Defaults to 1000.
+        seed (int, optional): Seed of the random generator. Defaults to 1.
+
+    Returns:
+        dict: The statistics of the index (see ReachabilityIndex.get_stats) and the seconds taken by
+        the queries with the index and with a traversal for each query
+    """
+    dag = generate_dag_ETL(qty_mappings=qty_mappings)
+    index = ReachabilityIndex(graph=dag)
+    rnd = random.Random(seed)
+    vertices = [rnd.randrange(dag.vcount()) for _ in range(qty_queries)]
+
+    start = time.perf_counter()
+    for vertex in vertices:
+        index.get_ancestors(vertex)
+    duration_index = time.perf_counter() - start
+    start = time.perf_counter()
+    for vertex in vertices:
+        dag.subcomponent(vertex, mode="in")
+    duration_traversal = time.perf_counter() - start
+
+    result = index.get_stats() | {
+        "mappings": qty_mappings,
+        "queries": qty_queries,
+        "seconds_queries_index": round(duration_index, 4),
+        "seconds_queries_traversal": round(duration_traversal, 4),
+    }
+    logger.info(f"Reachability benchmark: {result}")
+    return result
+
+
+def benchmark_failure_simulation(
+    qty_mappings: int, qty_samples: int = 10000, probability: float = 0.001, seed: int = 1
+) -> dict:
+    """Measure the run time of a Monte Carlo simulation of failures.
+
+    Args:
+        qty_mappings (int): Number of mappings in the generated ETL DAG.
+        qty_samples (int, optional): Number of failure samples. Defaults to 10000.
+        probability (float, optional): Probability of failure of each mapping. Defaults to 0.001.
+        seed (int, optional): Seed of the random generator. Defaults to 1.
+
+    Returns:
+        dict: The size of the simulation, the seconds it took and the mean number of mappings down
+    """
+    dag = generate_dag_ETL(qty_mappings=qty_mappings)
+    is_mapping = np.array(dag.vs["type"]) == VertexType.MAPPING.name
+    start = time.perf_counter()
+    simulation = simulate_failures(
+        graph=dag,
+        probabilities=np.where(is_mapping, probability, 0.0),
+        is_counted=is_mapping,
+        qty_samples=qty_samples,
+        seed=seed,
+    )
+    duration = time.perf_counter() - start
+    result = {
+        "mappings": qty_mappings,
+        "samples": qty_samples,
+        "seconds": round(duration, 4),
+        "mean_fallout": round(float(simulation.fallout.mean()), 2),
+    }
+    logger.info(f"Failure simulation benchmark: {result}")
+    return result
+
+
+def compare_schedules(dag: ig.Graph, costs: np.ndarray, qty_slots: int, name: str) -> dict:
+    """Compare running the run level stages one after the other with list scheduling on worker slots.
+
+    Args:
+        dag (ig.Graph): ETL DAG with the vertex attributes 'type', 'run_level' and 'run_level_stage'
+        costs (np.ndarray): Run time of each vertex, 0 for entities
+        qty_slots (int): Number of mappings that can run at the same time
+        name (str): Name of the flow in the result
+
+    Returns:
+        dict: The estimated run time with stages and with the list schedule, and the seconds it
+        took to make the schedule
+    """
+    is_mapping = np.array(dag.vs["type"]) == VertexType.MAPPING.name
+    costs_stages = {}
+    for vertex in np.flatnonzero(is_mapping):
+        stage = (dag.vs[vertex]["run_level"], dag.vs[vertex]["run_level_stage"])
+        costs_stages.setdefault(stage, []).append(costs[vertex])
+    makespan_stages = get_barrier_makespan(
+        costs_stages=[costs_stages[stage] for stage in sorted(costs_stages)], qty_slots=qty_slots
+    )
+    start = time.perf_counter()
+    schedule = schedule_list(dag=dag, is_mapping=is_mapping, costs=costs, qty_slots=qty_slots)
+    duration = time.perf_counter() - start
+    result = {
+        "flow": name,
+        "mappings": int(is_mapping.sum()),
+        "slots": qty_slots,
+        "makespan_stages": round(makespan_stages, 1),
+        "makespan_schedule": round(schedule.makespan, 1),
+        "seconds_schedule": round(duration, 4),
+    }
+    logger.info(f"Scheduler benchmark: {result}")
+    return result
+
+
+def benchmark_scheduler(qty_mappings: int, qty_slots: int, seed: int = 1) -> dict:
+    """Compare the run level stages with list scheduling on a generated ETL flow.
+
+    The run times of the mappings are drawn from a log-normal distribution, so a few mappings take
+    much longer than most.
+
+    Args:
+        qty_mappings (int): Number of mappings in the generated ETL DAG.
+        qty_slots (int): Number of mappings that can run at the same time
+        seed (int, optional): Seed of the random generator. Defaults to 1.
+
+    Returns:
+        dict: The comparison, see compare_schedules
+    """
+    dag = generate_dag_ETL(qty_mappings=qty_mappings, seed=seed)
+    dag = DagGenerator()._dag_ETL_run_order(dag=dag)
+    is_mapping = np.array(dag.vs["type"]) == VertexType.MAPPING.name
+    rng = np.random.default_rng(seed)
+    costs = np.where(is_mapping, rng.lognormal(mean=4, sigma=1, size=dag.vcount()), 0.0)
+    return compare_schedules(
+        dag=dag, costs=costs, qty_slots=qty_slots, name=f"generated {qty_mappings}"
+    )
+
+
+def benchmark_scheduler_files(files_RETW: list, qty_slots: int, file_costs: str = None) -> dict:
+    """Compare the run level stages with list scheduling on the ETL flow of RETW files.
+
+    Args:
+        files_RETW (list): RETW files of the flow
+        qty_slots (int): Number of mappings that can run at the same time
+        file_costs (str, optional): CSV or JSON file with run times of the mappings. Defaults to
+            the same run time for all mappings.
+
+    Returns:
+        dict: The comparison, see compare_schedules
+    """
+    dag_reporting = DagReporting()
+    dag_reporting.add_RETW_files(files_RETW=files_RETW)
+    costs = MappingCosts()
+    if file_costs is not None:
+        costs.read(file_runs=file_costs)
+    dag_reporting.set_mapping_costs(costs=costs)
+    dag = dag_reporting.get_dag_ETL()
+    return compare_schedules(
+        dag=dag,
+        costs=dag_reporting._get_mapping_costs(dag=dag),
+        qty_slots=qty_slots,
+        name=f"{len(files_RETW)} RETW files",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the DAG algorithms")
+    parser.add_argument("--mappings", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument(
+        "--max-subcomponents",
+        type=int,
+        default=5000,
+        help="Largest number of mappings to count upstream mappings per vertex for",
+    )
+    parser.add_argument("--slots", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--files", nargs="*", default=[], help="RETW files of a flow to schedule")
+    parser.add_argument("--costs", help="CSV or JSON file with run times of the mappings")
+    args = parser.parse_args()
+    for qty_mappings in args.mappings:
+        benchmark_run_levels(
+            qty_mappings=qty_mappings,
+            include_subcomponents=qty_mappings <= args.max_subcomponents,
+        )
+        benchmark_stage_coloring(qty_mappings=qty_mappings)
+        benchmark_reachability(qty_mappings=qty_mappings)
+        benchmark_failure_simulation(qty_mappings=qty_mappings)
+        for qty_slots in args.slots:
+            benchmark_scheduler(qty_mappings=qty_mappings, qty_slots=qty_slots)
+    if args.files:
+        for qty_slots in args.slots:
+            benchmark_scheduler_files(
+                files_RETW=args.files, qty_slots=qty_slots, file_costs=args.costs
+            )
@@ -0,0 +1,93 @@
+from enum import Enum, auto
+
+import numpy as np
+
+from dag_reachability import ReachabilityIndex
+
+
+class BlastRadiusMeasure(Enum):
+    """Enumerates the measures to rank vertices by their blast radius.
+
+    MAPPINGS: The number of mappings downstream of the vertex.
+    ENTITIES: The number of entities downstream of the vertex.
+    COST: The summed estimated run time of the mappings downstream of the vertex.
+    """
+
+    MAPPINGS = auto()
+    ENTITIES = auto()
+    COST = auto()
+
+
+class BlastRadiusIndex:
+    """The downstream work of every vertex of an ETL DAG, for ranking the vertices whose failure is most harmful.
+
+    The downstream mappings, entities and costs of all vertices are summed from a reachability
+    index of the DAG, see ReachabilityIndex.sum_descendants. The vertex itself is not counted.
+    """
+
+    def __init__(
+        self, index: ReachabilityIndex, is_mapping: np.ndarray, costs: np.ndarray = None
+    ):
+        """Build the index.
+
+        Args:
+            index (ReachabilityIndex): Reachability index of the ETL DAG
+            is_mapping (np.ndarray): Boolean for each vertex, whether it is a mapping
+            costs (np.ndarray, optional): Estimated run time of each vertex, 0 for entities.
+                Defaults to no costs.
+        """
+        is_mapping = np.asarray(is_mapping, dtype=bool)
+        weights = np.column_stack((is_mapping, ~is_mapping))
+        if costs is not None:
+            weights = np.column_stack((weights, costs))
+        sums = index.sum_descendants(weights=weights) - weights
+        self.qty_mappings = sums[:, 0].round().astype(np.int64)
+        self.qty_entities = sums[:, 1].round().astype(np.int64)
+        self.cost = sums[:, 2] if costs is not None else None
+
+    def get_measure(self, measure: BlastRadiusMeasure) -> np.ndarray:
+        """Get the blast radius of each vertex in a measure.
+
+        Args:
+            measure (BlastRadiusMeasure): Measure of the blast radius
+
+        Raises:
+            ValueError: If the measure is the cost, but the index was built without costs.
+
+        Returns:
+            np.ndarray: The blast radius of each vertex
+        """
+        if measure == BlastRadiusMeasure.MAPPINGS:
+            return self.qty_mappings
+        if measure == BlastRadiusMeasure.ENTITIES:
+            return self.qty_entities
+        if self.cost is None:
+            raise ValueError("The blast radius index was built without costs")
+        return self.cost
+
+    def get_top(
+        self, k: int, measure: BlastRadiusMeasure, is_candidate: np.ndarray = None
+    ) -> np.ndarray:
+        """Get the vertices with the largest blast radius.
+
+        Args:
+            k (int): Number of vertices
+            measure (BlastRadiusMeasure): Measure to rank the vertices by
+            is_candidate (np.ndarray, optional): Boolean for each vertex, whether it may be
+                ranked. Defaults to all vertices.
+
+        Returns:
+            np.ndarray: Indices of at most k vertices, largest blast radius first, ties by index
+        """
+        values = self.get_measure(measure=measure)
+        candidates = np.arange(len(values))
+        if is_candidate is not None:
+            candidates = candidates[np.asarray(is_candidate, dtype=bool)]
+        k = min(k, len(candidates))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        # Select the k largest in linear time, then sort only those
+        top = candidates[np.argpartition(-values[candidates], k - 1)[:k]]
+        threshold = values[top].min()
+        top = candidates[values[candidates] >= threshold]
+        return top[np.lexsort((top, -values[top]))][:k]
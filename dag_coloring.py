@@ -0,0 +1,163 @@
+import time
+from collections import Counter
+
+import igraph as ig
+
+
+def get_coloring_dsatur(graph: ig.Graph) -> list:
+    """Color an undirected graph with the DSatur heuristic.
+
+    The next vertex to color is the one with the most distinct colors among its neighbors, it gets
+    the lowest color not used by its neighbors.
+
+    Args:
+        graph (ig.Graph): Undirected graph
+
+    Returns:
+        list: The color of each vertex, numbered from 0
+    """
+    return graph.vertex_coloring_greedy(method="dsatur")
+
+
+def get_coloring_exact(
+    graph: ig.Graph, seconds_budget: float = 0.1, qty_vertices_max: int = 100
+) -> list:
+    """Color an undirected graph with as few colors as possible, within a time budget.
+
+    Each connected component is colored separately. A component is first colored with DSatur; if
+    that takes more colors than the largest clique found, a branch and bound search tries to do
+    with fewer, see _search_coloring. Components with more than qty_vertices_max vertices and
+    components left when the time budget is spent keep their DSatur coloring.
+
+    Args:
+        graph (ig.Graph): Undirected graph
+        seconds_budget (float, optional): Time the search may take for the whole graph. Defaults to 0.1.
+        qty_vertices_max (int, optional): Largest component that is searched. Defaults to 100.
+
+    Returns:
+        list: The color of each vertex, numbered from 0; minimal unless the budget ran out or a
+        component was too large
+    """
+    deadline = time.perf_counter() + seconds_budget
+    colors = [0] * graph.vcount()
+    for members in graph.connected_components():
+        component = graph.induced_subgraph(members)
+        colors_component = get_coloring_dsatur(component)
+        if 1 < len(members) <= qty_vertices_max and time.perf_counter() < deadline:
+            colors_component = _search_coloring(
+                adjacency=[set(neighbors) for neighbors in component.get_adjlist()],
+                colors_initial=colors_component,
+                deadline=deadline,
+            )
+        for vertex, color in zip(members, colors_component):
+            colors[vertex] = color
+    return colors
+
+
+def _get_clique(adjacency: list) -> list:
+    """Find a large clique greedily, starting from each vertex in turn.
+
+    Args:
+        adjacency (list): Set of neighbors of each vertex
+
+    Returns:
+        list: The vertices of the largest clique found
+    """
+    clique_max = []
+    for vertex in range(len(adjacency)):
+        clique = [vertex]
+        for neighbor in sorted(adjacency[vertex], key=lambda vx: -len(adjacency[vx])):
+            if all(neighbor in adjacency[member] for member in clique):
+                clique.append(neighbor)
+        if len(clique) > len(clique_max):
+            clique_max = clique
+    return clique_max
+
+
+def _search_coloring(adjacency: list, colors_initial: list, deadline: float) -> list:
+    """Search for a coloring with fewer colors than a known coloring, by branch and bound.
+
+    The vertices of a clique get the first colors, because any coloring can be renumbered so they
+    have them. The other vertices are colored in DSatur order, trying each color not used by a
+    neighbor and one new color, as long as that stays below the number of colors of the best
+    coloring so far. The search stops when the best coloring uses as many colors as the clique
+    has vertices, or at the deadline.
+
+    Args:
+        adjacency (list): Set of neighbors of each vertex of a connected graph
+        colors_initial (list): A valid coloring of the graph
+        deadline (float): Value of time.perf_counter() at which the search stops
+
+    Returns:
+        list: The best coloring found
+    """
+    best = {"colors": list(colors_initial), "qty": max(colors_initial) + 1}
+    clique = _get_clique(adjacency=adjacency)
+    if best["qty"] <= len(clique):
+        return best["colors"]
+    colors = [-1] * len(adjacency)
+    for color, vertex in enumerate(clique):
+        colors[vertex] = color
+
+    def search(qty_colored: int, qty_colors: int) -> bool:
+        # Returns whether the search is to stop
+        if qty_colored == len(adjacency):
+            best["colors"], best["qty"] = list(colors), qty_colors
+            return best["qty"] <= len(clique)
+        if time.perf_counter() > deadline:
+            return True
+        uncolored = [vx for vx in range(len(adjacency)) if colors[vx] < 0]
+        colors_used = {vx: {colors[nb] for nb in adjacency[vx]} - {-1} for vx in uncolored}
+        vertex = max(uncolored, key=lambda vx: (len(colors_used[vx]), len(adjacency[vx])))
+        for color in range(min(qty_colors + 1, best["qty"] - 1)):
+            if color in colors_used[vertex]:
+                continue
+            colors[vertex] = color
+            if search(qty_colored + 1, max(qty_colors, color + 1)):
+                return True
+        colors[vertex] = -1
+        return False
+
+    search(qty_colored=len(clique), qty_colors=len(clique))
+    return best["colors"]
+
+
+def get_coloring_balanced(graph: ig.Graph, colors: list) -> list:
+    """Even out the number of vertices per color of a coloring, without adding colors.
+
+    A vertex is moved to the smallest color that none of its neighbors has, if that color has at
+    least two vertices fewer than its own. Every move reduces the sum of the squared color sizes,
+    so the moves stop.
+
+    Args:
+        graph (ig.Graph): Undirected graph
+        colors (list): A valid coloring of the graph
+
+    Returns:
+        list: The balanced coloring
+    """
+    colors = list(colors)
+    qty_colors = max(colors, default=-1) + 1
+    sizes = Counter(colors)
+    adjacency = graph.get_adjlist()
+    is_moved = True
+    while is_moved:
+        is_moved = False
+        for vertex, neighbors in enumerate(adjacency):
+            color = colors[vertex]
+            colors_neighbors = {colors[neighbor] for neighbor in neighbors}
+            color_new = min(
+                (
+                    candidate
+                    for candidate in range(qty_colors)
+                    if candidate not in colors_neighbors and sizes[candidate] < sizes[color] - 1
+                ),
+                key=lambda candidate: sizes[candidate],
+                default=None,
+            )
+            if color_new is not None:
+                colors[vertex] = color_new
+                sizes[color] -= 1
+                sizes[color_new] += 1
+                is_moved = True
+    return colors
@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+import igraph as ig
+import numpy as np
+
+ScheduleTimes = namedtuple(
+    "ScheduleTimes", ("earliest_start", "latest_start", "makespan", "critical_path")
+)
+
+
+def get_schedule_times(dag: ig.Graph, costs: np.ndarray) -> ScheduleTimes:
+    """Determine the start times and critical path of a DAG of tasks without resource limits.
+
+    Every vertex starts as soon as all its predecessors have finished. The earliest start times
+    are found in a pass in topological order, the latest start times that don't delay the end in a
+    pass in reverse order. The slack of a vertex is the difference between the two.
+
+    Args:
+        dag (ig.Graph): Directed acyclic graph
+        costs (np.ndarray): Duration of each vertex, 0 for vertices that take no time
+
+    Returns:
+        ScheduleTimes: The earliest and latest start time of each vertex as np.ndarray, the time
+        the last vertex finishes, and the indices of the vertices on a longest path, from first to last
+    """
+    costs = np.asarray(costs, dtype=float).tolist()
+    predecessors = dag.get_adjlist(mode="in")
+    successors = dag.get_adjlist(mode="out")
+    order = dag.topological_sorting(mode="out")
+
+    starts_earliest = [0.0] * dag.vcount()
+    for vertex in order:
+        starts_earliest[vertex] = max(
+            (starts_earliest[pred] + costs[pred] for pred in predecessors[vertex]), default=0.0
+        )
+    makespan = max((start + cost for start, cost in zip(starts_earliest, costs)), default=0.0)
+
+    starts_latest = [0.0] * dag.vcount()
+    for vertex in reversed(order):
+        finish = min((starts_latest[succ] for succ in successors[vertex]), default=makespan)
+        starts_latest[vertex] = finish - costs[vertex]
+
+    # Follow the predecessors that finish exactly when the vertex starts back from the last vertex
+    critical_path = []
+    if order:
+        vertex = max(range(dag.vcount()), key=lambda vx: starts_earliest[vx] + costs[vx])
+        while vertex is not None:
+            critical_path.append(vertex)
+            vertex = next(
+                (
+                    pred
+                    for pred in predecessors[vertex]
+                    if np.isclose(starts_earliest[pred] + costs[pred], starts_earliest[vertex])
+                ),
+                None,
+            )
+    return ScheduleTimes(
+        earliest_start=np.array(starts_earliest),
+        latest_start=np.array(starts_latest),
+        makespan=makespan,
+        critical_path=critical_path[::-1],
+    )
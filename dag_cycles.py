@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+import igraph as ig
+import numpy as np
+
+Cycle = namedtuple("Cycle", ("vertices", "component"))
+
+
+def get_shortest_cycles(graph: ig.Graph, size_block: int = 1024) -> list:
+    """Find a shortest cycle in each strongly connected component of a directed graph that has cycles.
+
+    The components are found in linear time. Within a component with more than one vertex the
+    shortest cycle through an edge u -> v is the shortest path from v back to u, followed by
+    the edge. These paths are found with a breadth first search from each vertex of the component,
+    in blocks of size_block vertices to bound the memory.
+
+    Args:
+        graph (ig.Graph): Directed graph
+        size_block (int, optional): Number of vertices searched from at once. Defaults to 1024.
+
+    Returns:
+        list: A Cycle for each component with a cycle, with the indices of the vertices of a
+        shortest cycle, in the order of the cycle, and the indices of all vertices of the component
+    """
+    cycles = []
+    is_loop = graph.is_loop()
+    vertices_loop = {graph.es[edge].source for edge, loop in enumerate(is_loop) if loop}
+    for members in graph.connected_components(mode="strong"):
+        if len(members) == 1:
+            if members[0] in vertices_loop:
+                cycles.append(Cycle(vertices=members, component=members))
+            continue
+        component = graph.induced_subgraph(members)
+        edges = np.array(component.get_edgelist(), dtype=np.int64)
+        best = (np.inf, None)
+        for begin in range(0, len(members), size_block):
+            sources = list(range(begin, min(begin + size_block, len(members))))
+            distances = np.array(component.distances(source=sources, mode="out"), dtype=float)
+            # Edges u -> v with v in the block close a cycle of the distance from v to u plus one
+            in_block = (edges[:, 1] >= begin) & (edges[:, 1] < begin + len(sources))
+            if not in_block.any():
+                continue
+            lengths = distances[edges[in_block, 1] - begin, edges[in_block, 0]] + 1
+            idx = int(np.argmin(lengths))
+            if lengths[idx] < best[0]:
+                best = (lengths[idx], edges[in_block][idx])
+        vertex_to, vertex_from = best[1]
+        path = component.get_shortest_path(int(vertex_from), to=int(vertex_to), mode="out")
+        cycles.append(
+            Cycle(vertices=[members[vertex] for vertex in path], component=members)
+        )
+    return cycles
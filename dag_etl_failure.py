@@ -1,20 +1,59 @@
+import json
+
 import igraph as ig
+import numpy as np
 
-from dag_reporting import DagReporting, NoFlowError, VertexType
+from dag_blast_radius import BlastRadiusIndex, BlastRadiusMeasure
+from dag_propagation import (
+    get_downstream,
+    get_failure_overlaps,
+    get_reached,
+    propagate_failures,
+    simulate_failures,
+)
+from dag_reporting import (
+    DagReporting,
+    EntityRef,
+    NoFlowError,
+    RunLevelMode,
+    StageColoring,
+    VertexType,
+)
 from logtools import get_logger
+from mapping_costs import MappingCosts
+from retw_cache import RetwCache
 
 logger = get_logger(__name__)
 
 class EtlFailure(DagReporting):
-    def __init__(self):
-        super().__init__()
+    def __init__(
+        self,
+        cache: RetwCache = None,
+        run_level_mode: RunLevelMode = RunLevelMode.MAPPING_ANCESTORS,
+        fail_on_cycles: bool = False,
+        stage_coloring: StageColoring = StageColoring.GREEDY,
+        seconds_coloring: float = 0.1,
+        size_streaming: int = None,
+    ):
+        super().__init__(
+            cache=cache,
+            run_level_mode=run_level_mode,
+            fail_on_cycles=fail_on_cycles,
+            stage_coloring=stage_coloring,
+            seconds_coloring=seconds_coloring,
+            size_streaming=size_streaming,
+        )
         self.dag = ig.Graph()
         self.impact = []
+        self.propagation = None
 
     def set_entities_failed(self, entity_refs: list) -> None:
         """Sets the specified entities as failed in the ETL DAG.
 
-        Marks the given entities as failed and identifies all downstream components affected by these failures.
+        Marks the given entities as failed, in addition to the entities that were set as failed
+        before, and identifies all downstream components affected by these failures. All failures
+        are propagated together in a single pass over the ETL DAG, see propagate_failures, which
+        also finds the distance of each affected component to the nearest failure.
         The impact of the failures (failed entity/mapping and affected components) is stored for reporting and visualization.
 
         Args:
@@ -24,24 +63,359 @@ class EtlFailure(DagReporting):
             None
         """
         try:
-            dag = self.get_dag_ETL()
+            dag = self._get_dag_ETL_cached()
         except NoFlowError:
             logger.error("There are no mappings, so there is no ETL flow!")
             return
+        vertices_failed = {}
+        for failure in self.impact:
+            try:
+                vertices_failed[failure["failed"]] = self._get_vertex_index(
+                    graph=dag, id_vertex=failure["failed"]
+                )
+            except ValueError:
+                logger.warning(f"Failed vertex {failure['failed']} is no longer in the ETL flow")
         for entity_ref in entity_refs:
             try:
                 id_entity = self.get_entity_id(entity_ref)
-                vx_failed = dag.vs.select(name=id_entity)[0]
-            except ValueError:
+                vertices_failed[id_entity] = self._get_vertex_index(graph=dag, id_vertex=id_entity)
+            except (KeyError, ValueError):
+                code_model, code_entity = entity_ref
+                logger.error(f"Can't find entity '{code_model}.{code_entity}' in ETL flow!")
+
+        self.propagation = propagate_failures(graph=dag, sources=list(vertices_failed.values()))
+        reached = get_reached(self.propagation)
+        ids_vertex = np.array(dag.vs["name"])
+        self.impact = [
+            {"failed": id_failed, "affected": ids_vertex[reached[:, position]].tolist()}
+            for position, id_failed in enumerate(vertices_failed)
+        ]
+
+    def get_report_propagation(self) -> dict:
+        """Report how the failures spread through the ETL flow, without propagating them again.
+
+        Returns:
+            dict: For each failure (in 'failures') its reference, the number of mappings and entities
+            it affects and the number it affects alone (its unique blast radius), the pairs of
+            failures affecting the same components with the number they share (in 'overlaps'), and
+            for each affected component (in 'affected') its reference, the positions in 'failures'
+            of the failures reaching it, the number of edges from the nearest failure and the
+            position of that failure. Empty if no entities are set as failed.
+        """
+        if self.propagation is None:
+            logger.error("No failures are set, so there is no propagation to report!")
+            return {}
+        dag = self._get_dag_ETL_cached()
+        is_mapping = np.array(dag.vs["type"]) == VertexType.MAPPING.name
+        overlaps = get_failure_overlaps(propagation=self.propagation, is_mapping=is_mapping)
+        refs_failed = [
+            self._get_vertex_ref(graph=dag, idx_vertex=vertex)
+            for vertex in self.propagation.sources.tolist()
+        ]
+        failures = [
+            ref
+            | {
+                "qty_mappings_affected": int(overlaps.qty_mappings[position]),
+                "qty_entities_affected": int(overlaps.qty_entities[position]),
+                "qty_affected_unique": int(overlaps.qty_unique[position]),
+            }
+            for position, ref in enumerate(refs_failed)
+        ]
+        pairs = np.argwhere(np.triu(overlaps.qty_shared, k=1) > 0)
+        lst_overlaps = [
+            {
+                "failed": [refs_failed[position_a], refs_failed[position_b]],
+                "qty_shared": int(overlaps.qty_shared[position_a, position_b]),
+            }
+            for position_a, position_b in pairs.tolist()
+        ]
+        lst_affected = []
+        reached = get_reached(self.propagation)
+        for vertex in np.flatnonzero(reached.any(axis=1)).tolist():
+            lst_affected.append(
+                self._get_vertex_ref(graph=dag, idx_vertex=vertex)
+                | {
+                    "failures": np.flatnonzero(reached[vertex]).tolist(),
+                    "distance": int(self.propagation.distance[vertex]),
+                    "nearest": int(self.propagation.nearest[vertex]),
+                }
+            )
+        return {
+            "failures": failures,
+            "overlaps": sorted(lst_overlaps, key=lambda overlap: -overlap["qty_shared"]),
+            "affected": sorted(lst_affected, key=lambda affected: affected["distance"]),
+        }
+
+    def simulate_failures(
+        self,
+        qty_samples: int = 10000,
+        probability_mapping: float = 0.0,
+        probability_source: float = 0.0,
+        probabilities: dict = None,
+        seed: int = None,
+    ) -> dict:
+        """Estimate how many mappings can't run, given the probability that mappings and source entities fail.
+
+        In each sample every mapping and source entity (an entity no mapping loads) fails at random
+        with its probability, and everything downstream of a failure is down. The samples are
+        propagated through the ETL DAG together, see simulate_failures of dag_propagation.
+
+        Args:
+            qty_samples (int, optional): Number of samples. Defaults to 10000.
+            probability_mapping (float, optional): Probability of failure of each mapping. Defaults to 0.
+            probability_source (float, optional): Probability of failure of each source entity.
+                Defaults to 0.
+            probabilities (dict, optional): Probability of failure by EntityRef or MappingRef,
+                overriding the probabilities above. Defaults to none.
+            seed (int, optional): Seed of the random generator, for reproducible results. Defaults to
+                a different result each run.
+
+        Raises:
+            ValueError: If there are no samples.
+
+        Returns:
+            dict: The mean, standard deviation and percentiles of the number of mappings that can't
+            run, the probability that all mappings can run, and for each mapping and entity that is
+            down in any sample its probability of failure and of being down (its criticality),
+            most critical first. Empty if there is no ETL flow.
+        """
+        if qty_samples < 1:
+            raise ValueError("At least one sample is needed")
+        try:
+            dag = self._get_dag_ETL_cached()
+        except NoFlowError:
+            logger.error("There are no mappings, so there is no ETL flow!")
+            return {}
+        types = np.array(dag.vs["type"])
+        is_mapping = types == VertexType.MAPPING.name
+        is_source = (types == VertexType.ENTITY.name) & (np.array(dag.indegree()) == 0)
+        probs = np.where(is_mapping, probability_mapping, 0.0)
+        probs = np.where(is_source, probability_source, probs)
+        for ref, probability in (probabilities or {}).items():
+            try:
+                if isinstance(ref, EntityRef):
+                    id_vertex = self.get_entity_id(ref)
+                else:
+                    id_vertex = self.get_mapping_id(ref)
+                probs[self._get_vertex_index(graph=dag, id_vertex=id_vertex)] = probability
+            except (KeyError, ValueError):
+                logger.error(f"Can't find '{'.'.join(ref)}' in ETL flow!")
+
+        simulation = simulate_failures(
+            graph=dag,
+            probabilities=probs,
+            is_counted=is_mapping,
+            qty_samples=qty_samples,
+            seed=seed,
+        )
+        fallout = simulation.fallout
+        criticality = simulation.qty_down / qty_samples
+        lst_nodes = [
+            self._get_vertex_ref(graph=dag, idx_vertex=vertex)
+            | {
+                "probability_failure": float(probs[vertex]),
+                "criticality": float(criticality[vertex]),
+            }
+            for vertex in np.flatnonzero(simulation.qty_down).tolist()
+        ]
+        logger.info(
+            f"Simulated {qty_samples} failure samples, on average {fallout.mean():g} of "
+            f"{int(is_mapping.sum())} mappings can't run"
+        )
+        return {
+            "qty_samples": qty_samples,
+            "seed": seed,
+            "qty_mappings": int(is_mapping.sum()),
+            "fallout": {
+                "mean": float(fallout.mean()),
+                "std": float(fallout.std()),
+                "p50": float(np.percentile(fallout, 50)),
+                "p95": float(np.percentile(fallout, 95)),
+                "p99": float(np.percentile(fallout, 99)),
+                "max": int(fallout.max()),
+            },
+            "probability_no_fallout": float((fallout == 0).mean()),
+            "nodes": sorted(lst_nodes, key=lambda node: -node["criticality"]),
+        }
+
+    def get_rerun_plan(self, entity_refs: list = None, mapping_refs: list = None) -> list:
+        """Plan the mappings to rerun after entities or mappings failed, and their order.
+
+        The mappings to rerun are the failed mappings, the mappings loading the failed entities and
+        all mappings downstream of them; the other mappings don't need to run again. They get run
+        levels and stages determined on the part of the ETL DAG with only these mappings and their
+        entities, so they are not held up by mappings that are not rerun.
+
+        Args:
+            entity_refs (list, optional): EntityRef tuples of the failed entities. Defaults to none.
+            mapping_refs (list, optional): MappingRef tuples of the failed mappings. Defaults to none.
+
+        Returns:
+            list: The mappings to rerun, with their RunLevel and RunLevelStage in the rerun, in the
+            format of get_mapping_order. Empty if there is no ETL flow or nothing failed.
+        """
+        try:
+            dag = self._get_dag_ETL_cached()
+        except NoFlowError:
+            logger.error("There are no mappings, so there is no ETL flow!")
+            return []
+        vertices_failed = []
+        for entity_ref in entity_refs or []:
+            try:
+                id_entity = self.get_entity_id(entity_ref)
+                vx_entity = self._get_vertex_index(graph=dag, id_vertex=id_entity)
+            except (KeyError, ValueError):
                 code_model, code_entity = entity_ref
                 logger.error(f"Can't find entity '{code_model}.{code_entity}' in ETL flow!")
                 continue
-            ids_affected = dag.subcomponent(vx_failed, mode="out")
-            ids_affected.remove(vx_failed.index)
-            self.impact.append(
-                {"failed": vx_failed["name"], "affected": dag.vs(ids_affected)["name"]}
+            # The entity is reloaded by the mappings loading it
+            vertices_failed.extend(dag.predecessors(vx_entity) or [vx_entity])
+        for mapping_ref in mapping_refs or []:
+            try:
+                id_mapping = self.get_mapping_id(mapping_ref)
+                vertices_failed.append(self._get_vertex_index(graph=dag, id_vertex=id_mapping))
+            except (KeyError, ValueError):
+                file_RETW, code_mapping = mapping_ref
+                logger.error(f"Can't find mapping '{code_mapping}' of '{file_RETW}' in ETL flow!")
+
+        is_mapping = np.array(dag.vs["type"]) == VertexType.MAPPING.name
+        is_rerun = get_downstream(graph=dag, sources=vertices_failed) & is_mapping
+        mappings_rerun = np.flatnonzero(is_rerun).tolist()
+        if not mappings_rerun:
+            logger.info("No mappings need to be rerun")
+            return []
+        # The mappings to rerun with their sources and targets
+        vertices = set(mappings_rerun)
+        for mapping in mappings_rerun:
+            vertices.update(dag.neighbors(mapping, mode="all"))
+        dag_rerun = dag.induced_subgraph(sorted(vertices))
+        dag_rerun = self._dag_ETL_run_order(dag=dag_rerun)
+        lst_mappings = self._get_mapping_order(dag=dag_rerun)
+        report = self._get_stage_report(dag=dag_rerun)
+        logger.info(
+            f"Rerun plan of {len(mappings_rerun)} of {int(is_mapping.sum())} mappings, in "
+            f"{report['qty_stages']} stages in {report['qty_run_levels']} run levels"
+        )
+        return lst_mappings
+
+    def get_blast_radius_index(self) -> BlastRadiusIndex:
+        """Build an index of the downstream work of every entity and mapping of the ETL flow.
+
+        The downstream mappings and entities and the estimated run time of the downstream mappings
+        (see set_mapping_costs) are summed for all vertices at once from the reachability index of
+        the ETL DAG, instead of setting each vertex as failed. The index is built once for each
+        version of the graph data and mapping costs.
+
+        Raises:
+            NoFlowError: If no mappings are found, indicating no ETL flow.
+
+        Returns:
+            BlastRadiusIndex: The blast radius of each vertex of the ETL DAG
+        """
+        dag = self._get_dag_ETL_cached()
+
+        def build() -> BlastRadiusIndex:
+            return BlastRadiusIndex(
+                index=self.get_reachability_index(etl=True),
+                is_mapping=np.array(dag.vs["type"]) == VertexType.MAPPING.name,
+                costs=self._get_mapping_costs(dag=dag),
             )
 
+        return self._get_graph_cached(name="blast_radius_ETL", build=build)
+
+    def set_mapping_costs(self, costs: MappingCosts) -> None:
+        """Set the estimated run times of the mappings, used for the critical path and blast radius.
+
+        Args:
+            costs (MappingCosts): Estimated run times, mappings without run history get its default cost.
+
+        Returns:
+            None
+        """
+        super().set_mapping_costs(costs=costs)
+        self._graphs.pop("blast_radius_ETL", None)
+
+    def get_report_blast_radius(
+        self,
+        top: int = 10,
+        measure: BlastRadiusMeasure = BlastRadiusMeasure.MAPPINGS,
+        vertex_type: VertexType = None,
+    ) -> list:
+        """Rank the entities and mappings whose failure takes down the most downstream work.
+
+        Args:
+            top (int, optional): Number of entities and mappings to report. Defaults to 10.
+            measure (BlastRadiusMeasure, optional): Measure to rank by. Defaults to the number of
+                downstream mappings.
+            vertex_type (VertexType, optional): Only rank entities or only mappings. Defaults to both.
+
+        Returns:
+            list: The reference and blast radius of the entities and mappings, largest first, see
+            iter_blast_radius. Empty if there is no ETL flow.
+        """
+        return list(
+            self.iter_blast_radius(top=top, measure=measure, vertex_type=vertex_type)
+        )
+
+    def iter_blast_radius(
+        self,
+        top: int = None,
+        measure: BlastRadiusMeasure = BlastRadiusMeasure.MAPPINGS,
+        vertex_type: VertexType = None,
+    ):
+        """Iterate over the entities and mappings, ranked by their blast radius.
+
+        Args:
+            top (int, optional): Number of entities and mappings. Defaults to all.
+            measure (BlastRadiusMeasure, optional): Measure to rank by. Defaults to the number of
+                downstream mappings.
+            vertex_type (VertexType, optional): Only rank entities or only mappings. Defaults to both.
+
+        Yields:
+            dict: The reference of an entity or mapping, with the number of mappings and entities
+            downstream of it and the estimated run time of the downstream mappings
+        """
+        try:
+            dag = self._get_dag_ETL_cached()
+        except NoFlowError:
+            logger.error("There are no mappings, so there is no ETL flow!")
+            return
+        index = self.get_blast_radius_index()
+        is_candidate = None
+        if vertex_type is not None:
+            is_candidate = np.array(dag.vs["type"]) == vertex_type.name
+        vertices = index.get_top(
+            k=dag.vcount() if top is None else top, measure=measure, is_candidate=is_candidate
+        )
+        for vertex in vertices.tolist():
+            yield self._get_vertex_ref(graph=dag, idx_vertex=vertex) | {
+                "qty_mappings_downstream": int(index.qty_mappings[vertex]),
+                "qty_entities_downstream": int(index.qty_entities[vertex]),
+                "cost_downstream": float(index.cost[vertex]),
+            }
+
+    def write_blast_radius(
+        self, file_jsonl: str, measure: BlastRadiusMeasure = BlastRadiusMeasure.MAPPINGS
+    ) -> int:
+        """Write the blast radius of all entities and mappings to a JSON Lines file, largest first.
+
+        Args:
+            file_jsonl (str): Path of the JSON Lines file.
+            measure (BlastRadiusMeasure, optional): Measure to rank by. Defaults to the number of
+                downstream mappings.
+
+        Returns:
+            int: The number of entities and mappings written
+        """
+        self._create_output_dir(file_path=file_jsonl)
+        qty_vertices = 0
+        with open(file_jsonl, "w", encoding="utf-8") as file:
+            for vertex in self.iter_blast_radius(measure=measure):
+                file.write(json.dumps(vertex) + "\n")
+                qty_vertices += 1
+        logger.info(f"Wrote the blast radius of {qty_vertices} vertices to '{file_jsonl}'")
+        return qty_vertices
+
     def _format_failure_impact(self, dag: ig.Graph) -> ig.Graph:
         """Update the DAG to reflect the impact of failed nodes.
 
@@ -50,11 +424,15 @@ class EtlFailure(DagReporting):
         Returns:
             ig.Graph: The updated DAG.
         """
-        for failure in self.impact:
-            dag.vs.select(name=failure["failed"])["color"] = "red"
-            dag.vs.select(name=failure["failed"])["shape"] = "star"
-            for affected in failure["affected"]:
-                dag.vs.select(name=affected)["color"] = "red"
+        idx_vertex = self._get_vertex_indices(graph=dag)
+        ids_failed = [failure["failed"] for failure in self.impact]
+        ids_affected = [id_vertex for failure in self.impact for id_vertex in failure["affected"]]
+        vertices_failed = idx_vertex[ids_failed]
+        vertices_failed = vertices_failed[vertices_failed >= 0].tolist()
+        vertices_affected = idx_vertex[ids_affected]
+        vertices_affected = vertices_affected[vertices_affected >= 0].tolist()
+        dag.vs[vertices_affected + vertices_failed]["color"] = "red"
+        dag.vs[vertices_failed]["shape"] = "star"
         return dag
 
     def get_report_fallout(self) -> list:
@@ -64,9 +442,11 @@ class EtlFailure(DagReporting):
             list: Report on mappings and entities that failed or are affected by the failure
         """
         result = []
-        dag = self.get_dag_ETL()
+        dag = self._get_dag_ETL_cached()
+        idx_vertex = self._get_vertex_indices(graph=dag)
         for failure in self.impact:
-            vs_affected = dag.vs.select(name_in=failure["affected"])
+            vertices_affected = idx_vertex[failure["affected"]]
+            vs_affected = dag.vs[vertices_affected[vertices_affected >= 0].tolist()]
             mappings_data = [
                 vx.attributes()
                 for vx in vs_affected
@@ -77,7 +457,10 @@ class EtlFailure(DagReporting):
                 for vx in vs_affected
                 if vx["type"] == VertexType.ENTITY.name
             ]
-            failed = [vx.attributes() for vx in dag.vs.select(name=failure["failed"])][0]
+            vx_failed = self._get_vertex_index(
+                graph=dag, id_vertex=failure["failed"], idx_vertex=idx_vertex
+            )
+            failed = dag.vs[vx_failed].attributes()
             result.append(
                 {
                     "failed": failed,
@@ -1,18 +1,35 @@
 import json
-import hashlib
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from enum import Enum, auto
+from itertools import chain, repeat
 from pathlib import Path
 
 import igraph as ig
-
+import numpy as np
+
+from dag_coloring import get_coloring_balanced, get_coloring_dsatur, get_coloring_exact
+from dag_cycles import get_shortest_cycles
+from dag_reachability import ReachabilityIndex
+from dag_registry import IdRegistry
+from dag_run_levels import count_ancestors, get_longest_path_counts
+from dag_store import EdgeTable, EdgeView, VertexTable, VertexView
 from logtools import get_logger
+from retw_cache import RetwCache, take_signature
+from retw_reader import RetwReader, select_fields
 
 logger = get_logger(__name__)
 
 EntityRef = namedtuple("EntityRef", ("CodeModel", "CodeEntity"))
 MappingRef = namedtuple("MappingRef", ("FileRETW", "CodeMapping"))
+RetwRecords = namedtuple(
+    "RetwRecords", ("file", "entities", "entities_referenced", "mappings", "edges")
+)
+GraphChanges = namedtuple(
+    "GraphChanges",
+    ("vertices_removed", "vertices_added", "vertices_updated", "edges_added"),
+)
 
 
 class VertexType(Enum):
@@ -39,10 +56,53 @@ class EdgeType(Enum):
     ENTITY_TARGET = auto()
 
 
+class RunLevelMode(Enum):
+    """Enumerates the ways the run level of a mapping is determined.
+
+    MAPPING_ANCESTORS: The number of mappings upstream of the mapping.
+    LONGEST_PATH: The number of mappings on the longest path of mappings leading to the mapping,
+    which usually results in fewer run levels, with more mappings per level.
+    """
+
+    MAPPING_ANCESTORS = auto()
+    LONGEST_PATH = auto()
+
+
+class StageColoring(Enum):
+    """Enumerates the ways the mappings of a run level are divided over stages.
+
+    Mappings that share a source entity must be in different stages, so the stages are a coloring
+    of the graph of conflicts between the mappings. Every stage is a serial step in the load.
+
+    GREEDY: Colors the mapping with the most colored neighbors first.
+    DSATUR: Colors the mapping with the most distinct colors among its neighbors first, which
+    usually results in fewer stages.
+    EXACT: Searches for the fewest stages within a time budget, starting from DSATUR.
+    BALANCED: DSATUR, after which mappings are moved to smaller stages to even out their sizes.
+    """
+
+    GREEDY = auto()
+    DSATUR = auto()
+    EXACT = auto()
+    BALANCED = auto()
+
+
 class NoFlowError(Exception):
     pass
 
 
+class CycleError(Exception):
+    """Raised when the ETL flow has cycles, so no valid order of the mappings exists.
+
+    Attributes:
+        cycles (list): Report of the cycles, see DagGenerator.get_cycles
+    """
+
+    def __init__(self, cycles: list):
+        self.cycles = cycles
+        super().__init__(f"The ETL flow has {len(cycles)} cycle(s)")
+
+
 class DagGenerator:
     """Generates and manages directed acyclic graphs (DAGs) representing ETL processes.
 
@@ -51,24 +111,125 @@ class DagGenerator:
     the entire ETL process or individual files, determine execution order, and identify dependencies.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache: RetwCache = None,
+        run_level_mode: RunLevelMode = RunLevelMode.MAPPING_ANCESTORS,
+        fail_on_cycles: bool = False,
+        stage_coloring: StageColoring = StageColoring.GREEDY,
+        seconds_coloring: float = 0.1,
+        size_streaming: int = None,
+    ):
         """Initializes a new instance of the DagGenerator class.
 
-        Sets up the initial state by creating empty dictionaries to store RETW files, entities, mappings, and a list to store edges.
-        These data structures will be populated as RETW files are added and processed.
-        """
-        self.files_RETW = {}
-        self.entities = {}
-        self.mappings = {}
-        self.edges = []
+        Sets up the initial state by creating empty tables to store RETW files, entities, mappings and edges.
+        These tables will be populated as RETW files are added and processed. They are stored by column,
+        the dictionaries files_RETW, entities and mappings and the list edges are views on them.
 
-    def add_RETW_files(self, files_RETW: list) -> bool:
+        Args:
+            cache (RetwCache, optional): Cache of records extracted from RETW files, unchanged files
+                are not parsed again. Defaults to no caching.
+            run_level_mode (RunLevelMode, optional): How the run levels of mappings are determined.
+                Defaults to the number of upstream mappings.
+            fail_on_cycles (bool, optional): Whether building the ETL DAG raises a CycleError when
+                the flow has cycles, before ordering the mappings. Defaults to logging the cycles.
+            stage_coloring (StageColoring, optional): How the mappings of a run level are divided
+                over stages. Defaults to greedy coloring.
+            seconds_coloring (float, optional): Time budget of the EXACT stage coloring for each
+                run level. Defaults to 0.1.
+            size_streaming (int, optional): RETW files of at least this many bytes are read with a
+                RetwReader, which only keeps the fields used for the graphs in memory. Defaults to
+                loading every file with json.load.
+        """
+        self.cache = cache
+        self._run_level_mode = run_level_mode
+        self._fail_on_cycles = fail_on_cycles
+        self._stage_coloring = stage_coloring
+        self._seconds_coloring = seconds_coloring
+        self.size_streaming = size_streaming
+        self._registry = IdRegistry()
+        self._files = VertexTable()
+        self._entities = VertexTable()
+        self._mappings = VertexTable()
+        self._edges = EdgeTable()
+        # Changes through the public views discard the graphs, the private views are used for
+        # changes that are applied to the graphs in place, see _apply_graph_changes
+        self.files_RETW = VertexView(
+            table=self._files, registry=self._registry, on_change=self._discard_graphs
+        )
+        self.entities = VertexView(
+            table=self._entities, registry=self._registry, on_change=self._discard_graphs
+        )
+        self.mappings = VertexView(
+            table=self._mappings, registry=self._registry, on_change=self._discard_graphs
+        )
+        self.edges = EdgeView(table=self._edges)
+        self._view_files = VertexView(table=self._files, registry=self._registry)
+        self._view_entities = VertexView(table=self._entities, registry=self._registry)
+        self._view_mappings = VertexView(table=self._mappings, registry=self._registry)
+        # Records of the added RETW files and the files each entity is part of, by vertex ID
+        self._records_RETW = {}
+        self._entity_files = {}
+        # Graphs built from the data, by name, with the data version they were built from
+        self._version = 0
+        self._graphs = {}
+
+    @property
+    def run_level_mode(self) -> RunLevelMode:
+        """How the run levels of mappings are determined, changing it discards the built graphs."""
+        return self._run_level_mode
+
+    @run_level_mode.setter
+    def run_level_mode(self, run_level_mode: RunLevelMode) -> None:
+        if run_level_mode != self._run_level_mode:
+            self._run_level_mode = run_level_mode
+            self._discard_graphs()
+
+    @property
+    def fail_on_cycles(self) -> bool:
+        """Whether building the ETL DAG raises a CycleError, changing it discards the built graphs."""
+        return self._fail_on_cycles
+
+    @fail_on_cycles.setter
+    def fail_on_cycles(self, fail_on_cycles: bool) -> None:
+        if fail_on_cycles != self._fail_on_cycles:
+            self._fail_on_cycles = fail_on_cycles
+            self._discard_graphs()
+
+    @property
+    def stage_coloring(self) -> StageColoring:
+        """How the mappings of a run level are staged, changing it discards the built graphs."""
+        return self._stage_coloring
+
+    @stage_coloring.setter
+    def stage_coloring(self, stage_coloring: StageColoring) -> None:
+        if stage_coloring != self._stage_coloring:
+            self._stage_coloring = stage_coloring
+            self._discard_graphs()
+
+    @property
+    def seconds_coloring(self) -> float:
+        """Time budget of the EXACT stage coloring, changing it discards the built graphs."""
+        return self._seconds_coloring
+
+    @seconds_coloring.setter
+    def seconds_coloring(self, seconds_coloring: float) -> None:
+        if seconds_coloring != self._seconds_coloring:
+            self._seconds_coloring = seconds_coloring
+            self._discard_graphs()
+
+    def add_RETW_files(
+        self, files_RETW: list, parallel: bool = False, max_workers: int = None
+    ) -> bool:
         """Process multiple RETW files.
 
         Processes each RETW file in the input list, generates the mapping order,
         and creates a DAG visualization.
         Args:
             files_RETW (list): list of RETW file containing mappings
+            parallel (bool, optional): Parse the files in a process pool. Defaults to False.
+            max_workers (int, optional): Maximum number of worker processes when parsing in parallel,
+                defaults to the number of processors on the machine.
 
         Returns:
             bool: Indicates whether all RETW file were processed
@@ -76,118 +237,602 @@ class DagGenerator:
         # Make sure added files are unique
         files_RETW = list(dict.fromkeys(files_RETW))
 
+        if parallel:
+            is_added = self._add_RETW_files_parallel(
+                files_RETW=files_RETW, max_workers=max_workers
+            )
+            self._flush_cache()
+            return is_added
+
         # Process files
+        is_added = True
         for file_RETW in files_RETW:
             # Add file to parser
-            if not self.add_RETW_file(file_RETW=file_RETW):
+            records = self._get_RETW_records(file_RETW=file_RETW)
+            if records is None:
                 logger.error(f"Failed to add RETW file '{file_RETW}'")
-                return False
+                is_added = False
+                break
+            self._add_RETW_records(records=records)
+        # The cache index is written once for the whole batch
+        self._flush_cache()
+        return is_added
+
+    def _add_RETW_files_parallel(self, files_RETW: list, max_workers: int) -> bool:
+        """Process multiple RETW files using a process pool.
+
+        Each worker parses a single RETW file and returns its records, and the file's signature for
+        the cache. The records are merged in the order of the file list, so the result is identical
+        to adding the files one by one. Files with cached records are not sent to the workers.
+
+        Args:
+            files_RETW (list): Unique list of RETW files containing mappings
+            max_workers (int): Maximum number of worker processes
+
+        Returns:
+            bool: Indicates whether all RETW file were processed
+        """
+        records_cached = {}
+        for file_RETW in files_RETW:
+            records = self._get_cached_RETW_records(file_RETW=file_RETW)
+            if records is not None:
+                records_cached[file_RETW] = records
+        files_parse = [file for file in files_RETW if file not in records_cached]
+        # Signatures of changed files calculated by the cache, which the workers can reuse
+        signatures_checked = [
+            None if self.cache is None else self.cache.get_signature_checked(file_RETW=file)
+            for file in files_parse
+        ]
+
+        logger.info(f"Parsing {len(files_parse)} RETW files in parallel")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            records_parsed = executor.map(
+                _extract_RETW_records,
+                files_parse,
+                repeat(self.size_streaming),
+                repeat(self.cache is not None),
+                signatures_checked,
+            )
+            for file_RETW in files_RETW:
+                records = records_cached.get(file_RETW)
+                if records is None:
+                    records, signature = next(records_parsed)
+                    if records is not None and signature is not None:
+                        self.cache.put(file_RETW=file_RETW, records=records, signature=signature)
+                if records is None:
+                    logger.error(f"Failed to add RETW file '{file_RETW}'")
+                    return False
+                self._add_RETW_records(records=records)
         return True
 
     def add_RETW_file(self, file_RETW: str) -> bool:
         """Load a RETW json file
 
+        Graphs that were already built are updated in place, instead of being rebuilt. A file that
+        was added before is replaced, see replace_RETW_file.
+
         Args:
             file (str): RETW file containing mappings
 
         Returns:
             bool: Indicates whether the RETW file was processed
         """
+        records = self._get_RETW_records(file_RETW=file_RETW)
+        self._flush_cache()
+        if records is None:
+            return False
+        self._add_RETW_records(records=records)
+        return True
+
+    def remove_RETW_file(self, file_RETW: str) -> bool:
+        """Remove a RETW file, retracting its entities, mappings and edges.
+
+        Entities that are also part of other RETW files are kept, with the information of the
+        remaining files. Graphs that were already built are updated in place.
+
+        Args:
+            file_RETW (str): RETW file that was added before
+
+        Returns:
+            bool: Indicates whether the RETW file was removed
+        """
+        id_file = self._get_added_file_id(file_RETW=file_RETW)
+        if id_file is None:
+            return False
+        self._apply_graph_changes(self._retract_RETW_records(id_file=id_file))
+        logger.info(f"Removed RETW file '{file_RETW}'")
+        return True
+
+    def replace_RETW_file(self, file_RETW: str) -> bool:
+        """Reload a RETW file that changed since it was added.
+
+        The file keeps its place in the order of the RETW files. Graphs that were already built are
+        updated in place: the run levels are determined again in a single pass over the ETL DAG,
+        and the stages are only determined again for the run levels that gained or lost mappings.
+
+        Args:
+            file_RETW (str): RETW file that was added before
+
+        Returns:
+            bool: Indicates whether the RETW file was replaced, when the file can't be read
+            the earlier version is kept
+        """
+        if self._get_added_file_id(file_RETW=file_RETW) is None:
+            return False
+        records = self._get_RETW_records(file_RETW=file_RETW)
+        self._flush_cache()
+        if records is None:
+            return False
+        self._add_RETW_records(records=records)
+        return True
+
+    def _get_added_file_id(self, file_RETW: str) -> int | None:
+        """Get the vertex ID of a RETW file that is currently added.
+
+        Args:
+            file_RETW (str): RETW file path
+
+        Returns:
+            int | None: The vertex ID, None if the file is not added
+        """
+        key_file = self._get_file_key(file=file_RETW)
+        if key_file in self._registry:
+            id_file = self._registry.get_id(key_file)
+            if id_file in self._records_RETW:
+                return id_file
+        logger.error(f"RETW file '{file_RETW}' was not added")
+        return None
+
+    def _get_RETW_records(self, file_RETW: str) -> RetwRecords | None:
+        """Get the records of a RETW file from the cache, or by parsing the file.
+
+        Args:
+            file_RETW (str): RETW file containing mappings
+
+        Returns:
+            RetwRecords | None: The file's records, None if the file could not be read
+        """
+        records = self._get_cached_RETW_records(file_RETW=file_RETW)
+        if records is None:
+            # The signature is taken before parsing, so a change during parsing misses the cache
+            signature = None if self.cache is None else self.cache.get_signature(file_RETW)
+            records = self._extract_RETW_records(file_RETW=file_RETW)
+            if records is not None and signature is not None:
+                self.cache.put(file_RETW=file_RETW, records=records, signature=signature)
+        return records
+
+    def _flush_cache(self) -> None:
+        """Write the updates of the RETW cache index of a batch of files, if there is a cache."""
+        if self.cache is not None:
+            self.cache.flush()
+
+    def _get_cached_RETW_records(self, file_RETW: str) -> RetwRecords | None:
+        """Retrieve the records of an unchanged RETW file from the cache.
+
+        The file node is refreshed, since its dates can change without the content changing.
+
+        Args:
+            file_RETW (str): RETW file containing mappings
+
+        Returns:
+            RetwRecords | None: The file's records, None if there is no cache or the file changed
+        """
+        if self.cache is None:
+            return None
+        records = self.cache.get(file_RETW=file_RETW)
+        if records is None:
+            return None
+        return records._replace(file=self._get_file_node(file_RETW=file_RETW))
+
+    def _get_file_node(self, file_RETW: str) -> dict:
+        """Build the vertex information of a RETW file.
+
+        The order of the file is determined when the file's records are merged.
+
+        Args:
+            file_RETW (str): RETW file containing mappings
+
+        Returns:
+            dict: Vertex information of the file
+        """
+        return {
+            "name": self._get_file_key(file=file_RETW),
+            "type": VertexType.FILE_RETW.name,
+            "FileRETW": file_RETW,
+            "CreationDate": datetime.fromtimestamp(
+                Path(file_RETW).stat().st_ctime
+            ).strftime("%Y-%m-%d %H:%M:%S"),
+            "ModificationDate": datetime.fromtimestamp(
+                Path(file_RETW).stat().st_mtime
+            ).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def _read_RETW_file(self, file_RETW: str) -> dict:
+        """Read the fields of a RETW file that are used for building the graphs.
+
+        Files of at least size_streaming bytes are read with a streaming RetwReader, others are
+        loaded with json.load, which is faster, before selecting the fields.
+
+        Args:
+            file_RETW (str): RETW file path
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            json.JSONDecodeError: If the file does not contain valid json.
+
+        Returns:
+            dict: The selected part of the RETW document
+        """
+        size_file = Path(file_RETW).stat().st_size
+        if self.size_streaming is not None and size_file >= self.size_streaming:
+            return RetwReader().read(file_RETW=file_RETW)
+        with open(file_RETW) as file:
+            return select_fields(value=json.load(file))
+
+    def _extract_RETW_records(self, file_RETW: str) -> RetwRecords | None:
+        """Parse a RETW file into the vertex and edge records it contributes to the graph.
+
+        Extraction does not touch the state of the instance, so it can run in a worker process.
+
+        Args:
+            file_RETW (str): RETW file containing mappings
+
+        Returns:
+            RetwRecords | None: The file's records, None if the file could not be read
+        """
         try:
-            with open(file_RETW) as file:
-                dict_RETW = json.load(file)
+            dict_RETW = self._read_RETW_file(file_RETW=file_RETW)
             logger.info(f"Added RETW file '{file_RETW}'")
         except FileNotFoundError:
             logger.error(f"Could not find file '{file_RETW}'")
-            return False
+            return None
         except json.JSONDecodeError:
             logger.error(f"Invalid JSON content in file '{file_RETW}'")
-            return False
-
-        # Add file node information
-        order_added = len(self.files_RETW)
-        id_file = self.get_file_id(file_RETW)
-        self.files_RETW |= {
-            id_file: {
-                "name": id_file,
-                "type": VertexType.FILE_RETW.name,
-                "Order": order_added,
-                "FileRETW": file_RETW,
-                "CreationDate": datetime.fromtimestamp(
-                    Path(file_RETW).stat().st_ctime
-                ).strftime("%Y-%m-%d %H:%M:%S"),
-                "ModificationDate": datetime.fromtimestamp(
-                    Path(file_RETW).stat().st_mtime
-                ).strftime("%Y-%m-%d %H:%M:%S"),
-            }
-        }
+            return None
+
+        records = RetwRecords(
+            file=self._get_file_node(file_RETW=file_RETW),
+            entities={},
+            entities_referenced={},
+            mappings={},
+            edges=[],
+        )
 
         logger.info(f"Adding entities 'created' in the RETW file '{file_RETW}'")
-        self._add_model_entities(file_RETW=file_RETW, dict_RETW=dict_RETW)
+        self._add_model_entities(
+            file_RETW=file_RETW, dict_RETW=dict_RETW, records=records
+        )
         if "Mappings" in dict_RETW:
             logger.info(f"Adding mappings from the RETW file '{file_RETW}'")
-            self._add_mappings(file_RETW=file_RETW, mappings=dict_RETW["Mappings"])
+            self._add_mappings(
+                file_RETW=file_RETW, mappings=dict_RETW["Mappings"], records=records
+            )
         else:
             logger.warning(f"No mappings from the RETW file '{file_RETW}'")
-        return True
+        return records
+
+    def _add_RETW_records(self, records: RetwRecords) -> None:
+        """Add the records of a RETW file, replacing those of an earlier version of the file.
+
+        Args:
+            records (RetwRecords): Records extracted from a RETW file.
+
+        Returns:
+            None
+        """
+        id_file = self._registry.register(records.file["name"])
+        if id_file not in self._records_RETW:
+            self._apply_graph_changes(self._merge_RETW_records(records=records))
+            return
+
+        # Replace the earlier version of the file in one change, keeping its place
+        position = self._files.get_value(id_file, "Order")
+        changes_retract = self._retract_RETW_records(id_file=id_file)
+        changes = self._merge_RETW_records(records=records, position=position)
+        self._apply_graph_changes(
+            GraphChanges(
+                vertices_removed=changes_retract.vertices_removed,
+                vertices_added=changes.vertices_added,
+                vertices_updated=changes_retract.vertices_updated
+                + changes.vertices_updated,
+                edges_added=changes.edges_added,
+            )
+        )
+
+    def _merge_RETW_records(
+        self, records: RetwRecords, position: int = None
+    ) -> GraphChanges:
+        """Merge the records extracted from a RETW file into the graph data.
+
+        The stable keys of the records are replaced by vertex IDs. Entities defined in the file's
+        document model overwrite earlier definitions, while entities that are only referenced by
+        mappings are added only when they are not yet known (see _resolve_entity).
+
+        Args:
+            records (RetwRecords): Records extracted from a RETW file.
+            position (int, optional): Place of the file in the order of the RETW files. Defaults to last.
+
+        Returns:
+            GraphChanges: The vertices and edges the file added or changed
+        """
+        file_node = dict(records.file)
+        id_file = self._registry.register(file_node.pop("name"))
+        file_node = {
+            "name": id_file,
+            "digest": self._registry.get_digest(id_file),
+            "type": file_node.pop("type"),
+            "Order": len(self.files_RETW),
+            **file_node,
+        }
+        if position is None or position >= len(self.files_RETW):
+            self._view_files[id_file] = file_node
+        else:
+            files = list(self.files_RETW.items())
+            files.insert(position, (id_file, file_node))
+            self._view_files.clear()
+            self._view_files.update(files)
+        self._records_RETW[id_file] = records
+        ids_updated = [id for id in self._renumber_files() if id != id_file]
+
+        ids_added = [id_file]
+        for key_entity in chain(records.entities, records.entities_referenced):
+            id_entity = self._registry.register(key_entity)
+            self._entity_files.setdefault(id_entity, set()).add(id_file)
+            entity = self._resolve_entity(id_entity=id_entity)
+            if id_entity not in self.entities:
+                ids_added.append(id_entity)
+            elif entity != self.entities[id_entity]:
+                ids_updated.append(id_entity)
+            self._view_entities[id_entity] = entity
+        for key_mapping, mapping in records.mappings.items():
+            id_mapping = self._registry.register(key_mapping)
+            self._view_mappings[id_mapping] = self._set_vertex_id(mapping, id_mapping)
+            ids_added.append(id_mapping)
+        rows_edge = self._edges.extend(
+            edge
+            | {
+                "source": self._registry.get_id(edge["source"]),
+                "target": self._registry.get_id(edge["target"]),
+            }
+            for edge in records.edges
+        )
+        edges = [self._edges.get(row) for row in rows_edge]
+        return GraphChanges(
+            vertices_removed=[],
+            vertices_added=ids_added,
+            vertices_updated=ids_updated,
+            edges_added=edges,
+        )
+
+    def _retract_RETW_records(self, id_file: int) -> GraphChanges:
+        """Retract the records of a RETW file from the graph data.
+
+        The file's mappings and all edges of the file and its mappings are removed. The file's
+        entities are removed when no other file contains them, otherwise their information is
+        determined again from the remaining files.
+
+        Args:
+            id_file (int): Vertex ID of an added RETW file.
+
+        Returns:
+            GraphChanges: The vertices the retraction removed or changed
+        """
+        records = self._records_RETW.pop(id_file)
+        del self._view_files[id_file]
+        ids_removed = [id_file]
+        for key_mapping in records.mappings:
+            id_mapping = self._registry.get_id(key_mapping)
+            del self._view_mappings[id_mapping]
+            ids_removed.append(id_mapping)
+        self._edges.delete_incident(set(ids_removed))
+        ids_updated = self._renumber_files()
+
+        for key_entity in chain(records.entities, records.entities_referenced):
+            id_entity = self._registry.get_id(key_entity)
+            ids_file = self._entity_files[id_entity]
+            ids_file.discard(id_file)
+            if not ids_file:
+                del self._entity_files[id_entity]
+                del self._view_entities[id_entity]
+                ids_removed.append(id_entity)
+                continue
+            entity = self._resolve_entity(id_entity=id_entity)
+            if entity != self.entities[id_entity]:
+                self._view_entities[id_entity] = entity
+                ids_updated.append(id_entity)
+        return GraphChanges(
+            vertices_removed=ids_removed,
+            vertices_added=[],
+            vertices_updated=ids_updated,
+            edges_added=[],
+        )
+
+    def _renumber_files(self) -> list:
+        """Set the order of the RETW files to their position.
+
+        Returns:
+            list: Vertex IDs of the files whose order changed
+        """
+        ids_changed = []
+        rows = self._files.rows()
+        orders = self._files.take("Order", rows)
+        for order, (id_file, order_file) in enumerate(
+            zip(self._files.get_ids(rows).tolist(), orders)
+        ):
+            if order_file != order:
+                self._files.set_value(id_file, "Order", order)
+                ids_changed.append(id_file)
+        return ids_changed
+
+    def _resolve_entity(self, id_entity: int) -> dict:
+        """Determine the information of an entity from the RETW files it is part of.
+
+        The definition of the last file in which the entity is part of the document model is used,
+        if there is none, the information of the first file referencing the entity. This is the same
+        result as merging all files in order.
+
+        Args:
+            id_entity (int): Vertex ID of the entity
+
+        Returns:
+            dict: Vertex information of the entity
+        """
+        key_entity = self._registry.keys[id_entity]
+        records_files = [
+            self._records_RETW[id_file]
+            for id_file in sorted(
+                self._entity_files[id_entity],
+                key=lambda id_file: self._files.get_value(id_file, "Order"),
+            )
+        ]
+        definitions = [
+            records.entities[key_entity]
+            for records in records_files
+            if key_entity in records.entities
+        ]
+        if definitions:
+            entity = definitions[-1]
+        else:
+            entity = records_files[0].entities_referenced[key_entity]
+        return self._set_vertex_id(entity, id_entity)
+
+    def _set_vertex_id(self, vertex: dict, id_vertex: int) -> dict:
+        """Replace the stable key of a vertex by its ID and stable digest.
+
+        Args:
+            vertex (dict): Vertex information with the stable key as name
+            id_vertex (int): ID of the vertex
+
+        Returns:
+            dict: Vertex information with the ID as name
+        """
+        return {
+            "name": id_vertex,
+            "digest": self._registry.get_digest(id_vertex),
+            **{key: value for key, value in vertex.items() if key != "name"},
+        }
+
+    def _get_file_key(self, file: str) -> tuple:
+        """Build the stable key of a file.
+
+        Args:
+            file (str): The file path.
+
+        Returns:
+            tuple: The stable key of the file.
+        """
+        return (VertexType.FILE_RETW.name, file)
 
-    def _stable_hash(self, key: str) -> int:
-        """Generate a stable hash from a string.
+    def _get_entity_key(self, entity_ref: EntityRef) -> tuple:
+        """Build the stable key of an entity from its model code and code.
 
-        Creates a stable hash value from a given string using MD5.
-        The hash is converted to an integer for consistent usage.
+        Args:
+            entity_ref (EntityRef): A namedtuple containing the entity's code model and code.
+
+        Returns:
+            tuple: The stable key of the entity.
+        """
+        code_model, code_entity = entity_ref
+        return (VertexType.ENTITY.name, code_model, code_entity)
+
+    def _get_mapping_key(self, mapping_ref: MappingRef) -> tuple:
+        """Build the stable key of a mapping from its RETW file path and code.
 
         Args:
-            key (str): The input string.
+            mapping_ref (MappingRef): A namedtuple containing the RETW file path and mapping code.
 
         Returns:
-            int: The stable hash value as an integer.
+            tuple: The stable key of the mapping.
         """
-        str_bytes = bytes(key, "UTF-8")
-        hash_md5 = hashlib.md5(str_bytes)
-        return int(hash_md5.hexdigest(), base=16)
+        file_RETW, code_mapping = mapping_ref
+        return (VertexType.MAPPING.name, file_RETW, code_mapping)
 
     def get_file_id(self, file: str) -> int:
-        """Generate a stable hash ID for a file.
+        """Get the vertex ID of a file.
 
         Args:
             file (str): The file path.
 
+        Raises:
+            KeyError: If the file was not added.
+
         Returns:
-            int: The stable hash ID for the file.
+            int: The vertex ID for the file.
         """
-        return self._stable_hash(key=file)
+        return self._registry.get_id(self._get_file_key(file=file))
 
     def get_entity_id(self, entity_ref: EntityRef) -> int:
-        """Generate a stable hash ID for an entity.
-
-        Creates a stable hash value from the combined entity code and model code.
+        """Get the vertex ID of an entity.
 
         Args:
             entity_ref (EntityRef): A namedtuple containing the entity's code model and code.
 
+        Raises:
+            KeyError: If the entity is not part of any of the added RETW files.
+
         Returns:
-            int: The stable hash ID for the entity.
+            int: The vertex ID for the entity.
         """
-        code_model, code_entity = entity_ref
-        return self._stable_hash(key=code_model + code_entity)
+        return self._registry.get_id(self._get_entity_key(entity_ref=entity_ref))
 
     def get_mapping_id(self, mapping_ref: MappingRef) -> int:
-        """Generate a stable hash ID for a mapping.
-
-        Creates a stable hash value from the combined RETW file path and mapping code.
+        """Get the vertex ID of a mapping.
 
         Args:
             mapping_ref (MappingRef): A namedtuple containing the RETW file path and mapping code.
 
+        Raises:
+            KeyError: If the mapping is not part of any of the added RETW files.
+
         Returns:
-            int: The stable hash ID for the mapping.
+            int: The vertex ID for the mapping.
         """
-        file_RETW, code_mapping = mapping_ref
-        id_file = self.get_file_id(file=file_RETW)
-        return self._stable_hash(key=str(id_file) + code_mapping)
+        return self._registry.get_id(self._get_mapping_key(mapping_ref=mapping_ref))
+
+    def get_entity_ref(self, id_entity: int) -> EntityRef:
+        """Get the entity of a vertex ID, the reverse of get_entity_id.
+
+        Args:
+            id_entity (int): The vertex ID of the entity.
+
+        Returns:
+            EntityRef: The entity, by the code of its model and its code.
+        """
+        _, code_model, code_entity = self._registry.keys[id_entity]
+        return EntityRef(code_model, code_entity)
+
+    def get_mapping_ref(self, id_mapping: int) -> MappingRef:
+        """Get the mapping of a vertex ID, the reverse of get_mapping_id.
+
+        Args:
+            id_mapping (int): The vertex ID of the mapping.
+
+        Returns:
+            MappingRef: The mapping, by its RETW file path and code.
+        """
+        _, file_RETW, code_mapping = self._registry.keys[id_mapping]
+        return MappingRef(file_RETW, code_mapping)
+
+    def _get_vertex_ref(self, graph: ig.Graph, idx_vertex: int) -> dict:
+        """Get the reference of an entity or mapping vertex of a graph, for reports.
+
+        Args:
+            graph (ig.Graph): Graph of entities and mappings
+            idx_vertex (int): Index of the vertex in the graph
 
-    def _add_model_entities(self, file_RETW: str, dict_RETW: list) -> None:
+        Returns:
+            dict: The type of the vertex and the fields of its EntityRef or MappingRef
+        """
+        vx = graph.vs[idx_vertex]
+        if vx["type"] == VertexType.ENTITY.name:
+            ref = self.get_entity_ref(id_entity=vx["name"])
+        else:
+            ref = self.get_mapping_ref(id_mapping=vx["name"])
+        return {"type": vx["type"]} | ref._asdict()
+
+    def _add_model_entities(
+        self, file_RETW: str, dict_RETW: list, records: RetwRecords
+    ) -> None:
         """Add model entities to the graph.
 
         Extracts entities from the document model in the RETW dictionary and adds them as nodes to the graph.
@@ -196,6 +841,7 @@ class DagGenerator:
         Args:
             file_RETW (str): RETW file path
             dict_RETW (list): Dictionary containing RETW data.
+            records (RetwRecords): Records of the RETW file the entities are added to.
 
         Returns:
             None
@@ -209,10 +855,10 @@ class DagGenerator:
             return
 
         for entity in model["Entities"]:
-            id_entity = self.get_entity_id(EntityRef(model["Code"], entity["Code"]))
+            key_entity = self._get_entity_key(EntityRef(model["Code"], entity["Code"]))
             dict_entity = {
-                id_entity: {
-                    "name": id_entity,
+                key_entity: {
+                    "name": key_entity,
                     "type": VertexType.ENTITY.name,
                     "Id": entity["Id"],
                     "Name": entity["Name"],
@@ -226,15 +872,17 @@ class DagGenerator:
                     "Modifier": entity["Modifier"],
                 }
             }
-            self.entities.update(dict_entity)
+            records.entities.update(dict_entity)
             edge_entity_file = {
-                "source": self.get_file_id(file=file_RETW),
-                "target": id_entity,
+                "source": self._get_file_key(file=file_RETW),
+                "target": key_entity,
                 "type": EdgeType.FILE_ENTITY.name,
             }
-            self.edges.append(edge_entity_file)
+            records.edges.append(edge_entity_file)
 
-    def _add_mappings(self, file_RETW: str, mappings: dict) -> None:
+    def _add_mappings(
+        self, file_RETW: str, mappings: dict, records: RetwRecords
+    ) -> None:
         """Add mappings to the graph.
 
         Processes each mapping extracted from the RETW dictionary, adds them as nodes to the graph,
@@ -244,17 +892,18 @@ class DagGenerator:
         Args:
             file_RETW (str): RETW file path.
             mappings (dict): Dictionary containing mapping data.
+            records (RetwRecords): Records of the RETW file the mappings are added to.
 
         Returns:
             None
         """
         for mapping_RETW in mappings:
-            id_mapping = self.get_mapping_id(
+            key_mapping = self._get_mapping_key(
                 MappingRef(file_RETW, mapping_RETW["Code"])
             )
             mapping = {
-                id_mapping: {
-                    "name": id_mapping,
+                key_mapping: {
+                    "name": key_mapping,
                     "type": VertexType.MAPPING.name,
                     "Id": mapping_RETW["Id"],
                     "Name": mapping_RETW["Name"],
@@ -265,29 +914,36 @@ class DagGenerator:
                     "Modifier": mapping_RETW["Modifier"],
                 }
             }
-            self.mappings.update(mapping)
+            records.mappings.update(mapping)
             edge_mapping_file = {
-                "source": self.get_file_id(file=file_RETW),
-                "target": id_mapping,
+                "source": self._get_file_key(file=file_RETW),
+                "target": key_mapping,
                 "type": EdgeType.FILE_MAPPING.name,
                 "CreationDate": mapping_RETW["CreationDate"],
                 "Creator": mapping_RETW["Creator"],
                 "ModificationDate": mapping_RETW["ModificationDate"],
                 "Modifier": mapping_RETW["Modifier"],
             }
-            self.edges.append(edge_mapping_file)
-            self._add_mapping_sources(id_mapping=id_mapping, mapping=mapping_RETW)
-            self._add_mapping_target(id_mapping=id_mapping, mapping=mapping_RETW)
+            records.edges.append(edge_mapping_file)
+            self._add_mapping_sources(
+                key_mapping=key_mapping, mapping=mapping_RETW, records=records
+            )
+            self._add_mapping_target(
+                key_mapping=key_mapping, mapping=mapping_RETW, records=records
+            )
 
-    def _add_mapping_sources(self, id_mapping: int, mapping: dict) -> None:
+    def _add_mapping_sources(
+        self, key_mapping: tuple, mapping: dict, records: RetwRecords
+    ) -> None:
         """Add mapping source entities to the graph.
 
         Iterates through the source composition of a mapping, extracts source entities,
         and adds them as nodes to the graph. Also adds edges between the mapping and its source entities.
 
         Args:
-            id_mapping (int): Unique identifier of the mapping.
+            key_mapping (tuple): Stable key of the mapping.
             mapping (dict): Dictionary containing mapping data.
+            records (RetwRecords): Records of the RETW file the source entities are added to.
 
         Returns:
             None
@@ -305,12 +961,12 @@ class DagGenerator:
                 and source_entity["Stereotype"] == "mdde_FilterBusinessRule"
             ):
                 continue
-            id_entity = self.get_entity_id(
+            key_entity = self._get_entity_key(
                 EntityRef(source_entity["CodeModel"], source_entity["Code"])
             )
             entity = {
-                id_entity: {
-                    "name": id_entity,
+                key_entity: {
+                    "name": key_entity,
                     "type": VertexType.ENTITY.name,
                     "Id": source_entity["Id"],
                     "Name": source_entity["Name"],
@@ -318,24 +974,31 @@ class DagGenerator:
                     "CodeModel": source_entity["CodeModel"],
                 }
             }
-            if id_entity not in self.entities:
-                self.entities.update(entity)
+            if (
+                key_entity not in records.entities
+                and key_entity not in records.entities_referenced
+            ):
+                records.entities_referenced.update(entity)
             edge_entity_mapping = {
-                "source": id_entity,
-                "target": id_mapping,
+                "source": key_entity,
+                "target": key_mapping,
                 "type": EdgeType.ENTITY_SOURCE.name,
+                "join_types": (source.get("JoinType"),),
             }
-            self.edges.append(edge_entity_mapping)
+            records.edges.append(edge_entity_mapping)
 
-    def _add_mapping_target(self, id_mapping: int, mapping: dict) -> None:
+    def _add_mapping_target(
+        self, key_mapping: tuple, mapping: dict, records: RetwRecords
+    ) -> None:
         """Add mapping target entity to the graph.
 
         Extracts the target entity of a mapping, adds it as a node to the graph,
         and creates an edge between the mapping and its target entity.
 
         Args:
-            id_mapping (int): Unique identifier of the mapping.
+            key_mapping (tuple): Stable key of the mapping.
             mapping (dict): Dictionary containing mapping data.
+            records (RetwRecords): Records of the RETW file the target entity is added to.
 
         Returns:
             None
@@ -344,12 +1007,12 @@ class DagGenerator:
             logger.error(f"No target entity for mapping '{mapping['Name']}'")
             return
         target_entity = mapping["EntityTarget"]
-        id_entity = self.get_entity_id(
+        key_entity = self._get_entity_key(
             EntityRef(target_entity["CodeModel"], target_entity["Code"])
         )
         entity = {
-            id_entity: {
-                "name": id_entity,
+            key_entity: {
+                "name": key_entity,
                 "type": VertexType.ENTITY.name,
                 "Id": target_entity["Id"],
                 "Name": target_entity["Name"],
@@ -357,16 +1020,264 @@ class DagGenerator:
                 "CodeModel": target_entity["CodeModel"],
             }
         }
-        if id_entity not in self.entities:
-            self.entities.update(entity)
+        if (
+            key_entity not in records.entities
+            and key_entity not in records.entities_referenced
+        ):
+            records.entities_referenced.update(entity)
         edge_entity_mapping = {
-            "source": id_mapping,
-            "target": id_entity,
+            "source": key_mapping,
+            "target": key_entity,
             "type": EdgeType.ENTITY_TARGET.name,
         }
-        self.edges.append(edge_entity_mapping)
+        records.edges.append(edge_entity_mapping)
+
+    def _get_graph_cached(self, name: str, build) -> ig.Graph:
+        """Get a graph built from the current data, building it only when the data changed.
+
+        The graph is shared between callers, so it must not be modified. Indices of the graphs,
+        like the ReachabilityIndex, are kept the same way.
+
+        Args:
+            name (str): Name of the graph in the cache.
+            build: Function without arguments that builds the graph.
+
+        Returns:
+            ig.Graph: The (shared) graph
+        """
+        version, graph = self._graphs.get(name, (None, None))
+        if version != self._version:
+            graph = build()
+            self._graphs[name] = (self._version, graph)
+        return graph
+
+    def _discard_graphs(self) -> None:
+        """Discard the graphs built from the data, after a change that isn't applied to them in place.
+
+        Returns:
+            None
+        """
+        self._version += 1
+        self._graphs.clear()
+
+    def _apply_graph_changes(self, changes: GraphChanges) -> None:
+        """Register a change of the graph data, updating the graphs built from the previous data.
+
+        Graphs that can't be updated in place are discarded, they are rebuilt when requested.
+
+        Args:
+            changes (GraphChanges): The vertices and edges that were removed, added or changed.
+
+        Returns:
+            None
+        """
+        version = self._version
+        self._version += 1
+        patches = {"total": self._patch_dag_total, "ETL": self._patch_dag_ETL}
+        for name, (version_graph, graph) in list(self._graphs.items()):
+            patch = patches.get(name)
+            if version_graph == version and patch is not None and patch(graph, changes):
+                self._graphs[name] = (self._version, graph)
+            else:
+                del self._graphs[name]
+
+    def _get_vertex(self, id_vertex: int) -> dict:
+        """Get the information of a file, entity or mapping vertex.
+
+        Args:
+            id_vertex (int): ID of the vertex
+
+        Returns:
+            dict: Vertex information
+        """
+        for vertices in (self.mappings, self.entities, self.files_RETW):
+            if id_vertex in vertices:
+                return vertices[id_vertex]
+        raise KeyError(id_vertex)
+
+    def _get_vertex_indices(self, graph: ig.Graph) -> np.ndarray:
+        """Get a lookup of vertex indices in a graph by vertex ID.
+
+        Args:
+            graph (ig.Graph): Graph with the vertex IDs as name
+
+        Returns:
+            np.ndarray: Vertex index for each ID, -1 for vertices that are not in the graph
+        """
+        idx_vertex = np.full(len(self._registry), -1, dtype=np.int32)
+        if graph.vcount() > 0:
+            idx_vertex[graph.vs["name"]] = np.arange(graph.vcount(), dtype=np.int32)
+        return idx_vertex
+
+    def _get_vertex_index(
+        self, graph: ig.Graph, id_vertex: int, idx_vertex: np.ndarray = None
+    ) -> int:
+        """Get the index of a vertex in a graph.
+
+        Args:
+            graph (ig.Graph): Graph with the vertex IDs as name
+            id_vertex (int): ID of the vertex
+            idx_vertex (np.ndarray, optional): Lookup from _get_vertex_indices, when looking up
+                several vertices. Defaults to building the lookup.
+
+        Raises:
+            ValueError: If the vertex is not in the graph.
+
+        Returns:
+            int: The vertex index
+        """
+        if idx_vertex is None:
+            idx_vertex = self._get_vertex_indices(graph=graph)
+        idx = int(idx_vertex[id_vertex])
+        if idx < 0:
+            raise ValueError(f"Vertex {id_vertex} is not in the graph")
+        return idx
+
+    def _patch_graph(
+        self, graph: ig.Graph, changes: GraphChanges, vertices_added: list, edges_added: list
+    ) -> None:
+        """Apply a change of the graph data to a graph.
+
+        Args:
+            graph (ig.Graph): Graph that is updated in place.
+            changes (GraphChanges): The vertices that were removed or changed.
+            vertices_added (list): Information of the vertices to add to the graph.
+            edges_added (list): Edges to add to the graph, between vertices that are in the graph.
+
+        Returns:
+            None
+        """
+        idx_vertex = self._get_vertex_indices(graph=graph)
+        idx_removed = idx_vertex[changes.vertices_removed]
+        graph.delete_vertices(idx_removed[idx_removed >= 0].tolist())
+
+        # Update the information of changed vertices, keeping the derived attributes
+        idx_vertex = self._get_vertex_indices(graph=graph)
+        names = set(graph.vs.attributes()) - {"run_level", "run_level_stage"}
+        for id_vertex in changes.vertices_updated:
+            if idx_vertex[id_vertex] < 0:
+                continue
+            vertex = self._get_vertex(id_vertex=id_vertex)
+            vx_graph = graph.vs[int(idx_vertex[id_vertex])]
+            for name in names | vertex.keys():
+                vx_graph[name] = vertex.get(name)
+
+        graph.add_vertices(
+            len(vertices_added),
+            attributes={
+                name: [vertex.get(name) for vertex in vertices_added]
+                for name in dict.fromkeys(key for vertex in vertices_added for key in vertex)
+            },
+        )
+        idx_vertex = self._get_vertex_indices(graph=graph)
+        endpoints = np.array(
+            [(edge["source"], edge["target"]) for edge in edges_added], dtype=np.int32
+        ).reshape(-1, 2)
+        names = dict.fromkeys(key for edge in edges_added for key in edge)
+        graph.add_edges(
+            idx_vertex[endpoints].tolist(),
+            attributes={
+                name: [edge.get(name) for edge in edges_added]
+                for name in names.keys() - {"source", "target"}
+            },
+        )
+
+    def _patch_dag_total(self, dag: ig.Graph, changes: GraphChanges) -> bool:
+        """Update the total graph in place to a change of the graph data.
+
+        Args:
+            dag (ig.Graph): The total graph built from the data before the change.
+            changes (GraphChanges): The vertices and edges that were removed, added or changed.
+
+        Returns:
+            bool: Whether the graph was updated
+        """
+        vertices_added = [self._get_vertex(id_vertex=id) for id in changes.vertices_added]
+        self._patch_graph(
+            graph=dag,
+            changes=changes,
+            vertices_added=vertices_added,
+            edges_added=changes.edges_added,
+        )
+        return True
+
+    def _patch_dag_ETL(self, dag: ig.Graph, changes: GraphChanges) -> bool:
+        """Update the ETL DAG in place to a change of the graph data.
+
+        The run levels are determined again in a single pass over the DAG. The stages are only
+        determined again for the run levels that gained or lost mappings, or contain replaced mappings.
+
+        Args:
+            dag (ig.Graph): The ETL DAG built from the data before the change.
+            changes (GraphChanges): The vertices and edges that were removed, added or changed.
+
+        Returns:
+            bool: Whether the DAG was updated, False when no ETL flow is left
+        """
+        # Run levels of the mappings before the change
+        vs_mapping = dag.vs.select(type_eq=VertexType.MAPPING.name)
+        run_levels_before = dict(zip(vs_mapping["name"], vs_mapping["run_level"]))
+        idx_vertex = self._get_vertex_indices(graph=dag)
+
+        # Vertices of added edges that are not in the DAG, or are replaced
+        edge_types = [EdgeType.ENTITY_SOURCE.name, EdgeType.ENTITY_TARGET.name]
+        edges = [e for e in changes.edges_added if e["type"] in edge_types]
+        set_removed = set(changes.vertices_removed)
+        ids_new = [
+            id_vertex
+            for id_vertex in dict.fromkeys(
+                id_vertex for edge in edges for id_vertex in (edge["source"], edge["target"])
+            )
+            if idx_vertex[id_vertex] < 0 or id_vertex in set_removed
+        ]
+        vertices_added = [
+            self._get_vertex(id_vertex=id) | {"run_level": -1, "run_level_stage": None}
+            for id in ids_new
+        ]
+        self._patch_graph(
+            graph=dag, changes=changes, vertices_added=vertices_added, edges_added=edges
+        )
+        # Delete entities without mappings
+        dag.delete_vertices(dag.vs.select(_degree=0))
+        if dag.vcount() == 0:
+            return False
+        if self.fail_on_cycles and not dag.is_dag():
+            # Discarded, so the cycles are raised when the DAG is requested
+            return False
+        self._check_cycles(dag=dag)
+
+        # Only stages of run levels that gained or lost mappings are determined again
+        self._dag_ETL_run_levels(dag=dag)
+        vs_mapping = dag.vs.select(type_eq=VertexType.MAPPING.name)
+        run_levels_after = dict(zip(vs_mapping["name"], vs_mapping["run_level"]))
+        run_levels = set()
+        for id_mapping in run_levels_before.keys() | run_levels_after.keys():
+            run_level_before = run_levels_before.get(id_mapping)
+            run_level_after = run_levels_after.get(id_mapping)
+            if run_level_before != run_level_after or id_mapping in set_removed:
+                run_levels.update((run_level_before, run_level_after))
+        run_levels.discard(None)
+        self._dag_ETL_run_level_stages(dag=dag, run_levels=run_levels)
+        logger.info(f"Updated stages of {len(run_levels)} run levels")
+        return True
 
     def get_dag_total(self) -> ig.Graph:
+        """Get the total graph of mappings, entities, and files.
+
+        Returns:
+            ig.Graph: A copy of the graph, which can be modified by the caller.
+        """
+        return self._get_dag_total_cached().copy()
+
+    def _get_dag_total_cached(self) -> ig.Graph:
+        """Get the total graph, which is shared and must not be modified.
+
+        Returns:
+            ig.Graph: The total graph.
+        """
+        return self._get_graph_cached(name="total", build=self._build_dag_total)
+
+    def _build_dag_total(self) -> ig.Graph:
         """Build the total graph from mappings, entities, and files.
 
         Constructs an igraph graph using the collected mappings, entities, and files as vertices,
@@ -376,140 +1287,311 @@ class DagGenerator:
             ig.Graph: The constructed graph.
         """
         logger.info("Building a graph for RETW files, entities and mappings")
-        vertices = (
-            list(self.mappings.values())
-            + list(self.entities.values())
-            + list(self.files_RETW.values())
+        graph = self._build_graph(
+            tables=[self._mappings, self._entities, self._files],
+            rows_edge=self._edges.get_rows(),
         )
-        edges = list(self.edges)
-        graph = ig.Graph.DictList(vertices=vertices, edges=edges, directed=True)
         logger.info("Build graph total")
         return graph
 
+    def _build_graph(self, tables: list, rows_edge: np.ndarray) -> ig.Graph:
+        """Build a directed graph from vertex tables and a selection of the edges.
+
+        The edge endpoints are translated from vertex IDs to vertex indices with an array lookup,
+        and the vertex and edge attributes are assigned per column for all vertices and edges at once.
+        Attributes without any value in the graph are left out.
+
+        Args:
+            tables (list): Tables of the vertices, the graph's vertices are in the order of the tables.
+            rows_edge (np.ndarray): Rows of the edges in the edge table, between vertices of the tables.
+
+        Returns:
+            ig.Graph: The graph, with the vertex IDs as vertex attribute 'name' and the number of
+            times an edge was added as edge attribute 'weight'
+        """
+        rows_vertex = [table.rows() for table in tables]
+        ids_vertex = np.concatenate(
+            [table.get_ids(rows) for table, rows in zip(tables, rows_vertex)]
+        )
+        idx_vertex = np.full(len(self._registry), -1, dtype=np.int32)
+        idx_vertex[ids_vertex] = np.arange(len(ids_vertex), dtype=np.int32)
+        endpoints = self._edges.get_endpoints(rows=rows_edge)
+        graph = ig.Graph(
+            n=len(ids_vertex), edges=idx_vertex[endpoints], directed=True
+        )
+        graph.vs["name"] = ids_vertex.tolist()
+        graph.vs["digest"] = self._registry.digests[ids_vertex].tolist()
+        for name in dict.fromkeys(name for table in tables for name in table.columns):
+            if any(
+                table.columns[name].has_values(rows)
+                for table, rows in zip(tables, rows_vertex)
+                if name in table.columns
+            ):
+                graph.vs[name] = [
+                    value
+                    for table, rows in zip(tables, rows_vertex)
+                    for value in table.take(name, rows)
+                ]
+        for name, column in self._edges.columns.items():
+            if column.has_values(rows_edge):
+                graph.es[name] = column.take(rows_edge)
+        graph.es["weight"] = self._edges.get_weights(rows=rows_edge).tolist()
+        return graph
+
     def get_dag_single_retw_file(self, file_retw: str) -> ig.Graph:
         """Build a subgraph for a specific RETW file.
 
-        Builds the total graph and extracts the subgraph related to a specific RETW file.
+        Extracts the subgraph of the file and everything downstream of it from the total graph,
+        with a single traversal. For many files get_dags_single_retw_file is faster.
 
         Args:
             file_retw (str): The name of the RETW file.
 
+        Raises:
+            KeyError: If the file was not added.
+
         Returns:
             ig.Graph: The subgraph for the specified RETW file.
         """
 
         logger.info(f"Creating a graph for the file, '{file_retw}'")
-        dag = self.get_dag_total()
-        vx_file = dag.vs.select(FileRETW_eq=file_retw)
-        vx_file_graph = dag.subcomponent(vx_file[0], mode="out")
-        vx_delete = [i for i in dag.vs.indices if i not in vx_file_graph]
-        dag.delete_vertices(vx_delete)
-        return dag
+        dag = self._get_dag_total_cached()
+        vx_file = self._get_vertex_index(graph=dag, id_vertex=self.get_file_id(file=file_retw))
+        return dag.induced_subgraph(sorted(dag.subcomponent(vx_file, mode="out")))
+
+    def get_dags_single_retw_file(self, files_retw: list) -> dict:
+        """Build the subgraphs for several RETW files at once.
+
+        The vertices downstream of the files are looked up in the reachability index of the total graph.
+
+        Args:
+            files_retw (list): The names of the RETW files.
+
+        Raises:
+            KeyError: If one of the files was not added.
+
+        Returns:
+            dict: The subgraph for each of the RETW files, by file name
+        """
+        logger.info(f"Creating graphs for {len(files_retw)} files")
+        dag = self._get_dag_total_cached()
+        idx_vertex = self._get_vertex_indices(graph=dag)
+        vs_files = [
+            self._get_vertex_index(
+                graph=dag, id_vertex=self.get_file_id(file=file_retw), idx_vertex=idx_vertex
+            )
+            for file_retw in files_retw
+        ]
+        index = self.get_reachability_index()
+        return {
+            file_retw: dag.induced_subgraph(index.get_descendants(vx_file).tolist())
+            for file_retw, vx_file in zip(files_retw, vs_files)
+        }
+
+    def get_reachability_index(self, etl: bool = False) -> ReachabilityIndex:
+        """Get the reachability index of the total graph or the ETL DAG.
+
+        The index is built once for each version of the graph data and answers which vertices are
+        upstream or downstream of a vertex without traversing the graph. Its vertex indices are
+        those of the graphs returned by get_dag_total and get_dag_ETL.
+
+        Args:
+            etl (bool, optional): Whether to index the ETL DAG instead of the total graph.
+                Defaults to False.
+
+        Raises:
+            NoFlowError: If the ETL DAG is requested and no mappings are found.
+
+        Returns:
+            ReachabilityIndex: The index, see its get_stats for its memory use and build time
+        """
+        if etl:
+            name, get_graph = "reachability_ETL", self._get_dag_ETL_cached
+        else:
+            name, get_graph = "reachability_total", self._get_dag_total_cached
+
+        def build() -> ReachabilityIndex:
+            index = ReachabilityIndex(graph=get_graph())
+            logger.info(f"Built reachability index: {index.get_stats()}")
+            return index
+
+        return self._get_graph_cached(name=name, build=build)
 
     def get_dag_file_dependencies(self, include_entities: bool = True) -> ig.Graph:
         """Build a graph of dependencies between RETW files based on entity usage.
 
         Constructs a graph showing dependencies between RETW files based on shared entities.
-        The graph includes files as vertices and dependencies as edges. Optionally includes entities in the graph.
+        A file depends on another file when one of its mappings uses an entity as source that is
+        defined in the other file. The graph includes files as vertices and dependencies as edges.
+        Optionally includes entities in the graph.
+
+        The dependencies are determined by joining the edges between files and the entities they
+        define with the source entities of mappings and the files of the mappings, see
+        _get_file_entity_uses.
 
         Args:
             include_entities (bool, optional): Whether to include entities in the graph. Defaults to True.
 
         Returns:
-            ig.Graph: The graph of file dependencies.
+            ig.Graph: The graph of file dependencies. Without entities there is one edge for each
+            pair of files, with the number of shared entities as attribute 'weight' and their IDs in
+            'entities'. With entities there are edges from the defining file to the entity and from
+            the entity to the using file, with the number of mappings using the entity as 'weight'.
         """
-        dag = self.get_dag_total()
-        vs_files = dag.vs.select(type_eq=VertexType.FILE_RETW.name)
-        dict_vertices = {}
-        lst_edges = []
-
-        for vx_file in vs_files:
-            dict_vertices |= {vx_file["name"]: vx_file.attributes()}
-            vs_mappings = [
-                vs
-                for vs in dag.vs(dag.successors(vx_file))
-                if vs["type"] == VertexType.MAPPING.name
+        uses = self._get_file_entity_uses()
+        if include_entities:
+            edges, weights = np.unique(
+                np.concatenate((uses[:, [0, 1]], uses[:, [1, 2]])),
+                axis=0,
+                return_counts=True,
+            )
+            ids_entity = np.unique(uses[:, 1])
+        else:
+            # Distinct entities shared by each pair of files, ordered by the pair
+            shared = np.unique(uses[:, [0, 2, 1]], axis=0)
+            edges, weights = np.unique(shared[:, :2], axis=0, return_counts=True)
+            ids_entity = np.empty(0, dtype=np.int64)
+
+        dag = self._get_dag_total_cached()
+        idx_vertex = self._get_vertex_indices(graph=dag)
+        ids_file = self._files.get_ids()
+        vertices = np.sort(idx_vertex[np.concatenate((ids_file, ids_entity))])
+        dag_files = dag.induced_subgraph(vertices.tolist())
+        dag_dependencies = ig.Graph(
+            n=dag_files.vcount(),
+            edges=np.searchsorted(vertices, idx_vertex[edges]).tolist(),
+            directed=True,
+            vertex_attrs={name: dag_files.vs[name] for name in dag_files.vs.attributes()},
+        )
+        dag_dependencies.es["weight"] = weights.tolist()
+        if not include_entities and len(weights):
+            dag_dependencies.es["entities"] = [
+                entities.tolist()
+                for entities in np.split(shared[:, 2], np.cumsum(weights)[:-1])
             ]
+        return dag_dependencies
 
-            # Mappings can have source entities that are defined in another RETW file
-            for vx_mapping in vs_mappings:
-                # Get source entities
-                vs_first_order = dag.vs(dag.neighborhood(vx_mapping, mode="in"))
-                vs_source_entities = [
-                    vx for vx in vs_first_order if vx["type"] == VertexType.ENTITY.name
-                ]
+    def _get_file_entity_uses(self) -> np.ndarray:
+        """Determine which entities defined in one RETW file are used as source in another.
 
-                # Find RETW files connected to source entities other than the file in vx_file
-                for vx_source_entity in vs_source_entities:
-                    vx_file_source = [
-                        vx
-                        for vx in dag.vs(
-                            dag.neighborhood(vx_source_entity.index, mode="in")
-                        )
-                        if vx["type"] == VertexType.FILE_RETW.name
-                        and vx["name"] != vx_file["name"]
-                    ]
-                    if not vx_file_source:
-                        continue
-
-                    vx_file_source = vx_file_source[0]
-                    dict_vertices |= {
-                        vx_file_source["name"]: vx_file_source.attributes()
-                    }
-
-                    if include_entities:
-                        dict_vertices |= {
-                            vx_source_entity["name"]: vx_source_entity.attributes()
-                        }
-                        lst_edges.extend(
-                            (
-                                {
-                                    "source": vx_file_source["name"],
-                                    "target": vx_source_entity["name"],
-                                },
-                                {
-                                    "source": vx_source_entity["name"],
-                                    "target": vx_file["name"],
-                                },
-                            )
-                        )
-                    else:
-                        # Make connection between files
-                        lst_edges.append(
-                            {
-                                "source": vx_file_source["name"],
-                                "target": vx_file["name"],
-                            }
-                        )
-
-        dag_dependencies = ig.Graph.DictList(
-            vertices=list(dict_vertices.values()), edges=lst_edges, directed=True
+        Joins the edges from files to the entities they define with the edges from source entities
+        to mappings and the edges from files to their mappings.
+
+        Returns:
+            np.ndarray: A row of the IDs of the defining file, the entity and the using file for each
+            mapping that uses an entity defined in another file
+        """
+        defines = self._edges.get_endpoints(
+            rows=self._edges.get_rows(types=[EdgeType.FILE_ENTITY.name])
         )
-        return dag_dependencies
+        owns = self._edges.get_endpoints(
+            rows=self._edges.get_rows(types=[EdgeType.FILE_MAPPING.name])
+        )
+        sources = self._edges.get_endpoints(
+            rows=self._edges.get_rows(types=[EdgeType.ENTITY_SOURCE.name])
+        )
+        file_mapping = np.full(len(self._registry), -1, dtype=np.int64)
+        file_mapping[owns[:, 1]] = owns[:, 0]
+        files_use = file_mapping[sources[:, 1]]
+        is_owned = files_use >= 0
+        entities, files_use = sources[is_owned, 0], files_use[is_owned]
+
+        # Join each use of an entity with each of the files that define it
+        defines = defines[np.argsort(defines[:, 1], kind="stable")]
+        begins = np.searchsorted(defines[:, 1], entities, side="left")
+        ends = np.searchsorted(defines[:, 1], entities, side="right")
+        qty_definers = ends - begins
+        offsets = np.cumsum(qty_definers) - qty_definers
+        idx_use = np.repeat(np.arange(len(entities)), qty_definers)
+        idx_define = np.arange(len(idx_use)) - np.repeat(offsets - begins, qty_definers)
+        uses = np.column_stack(
+            (defines[idx_define, 0], entities[idx_use], files_use[idx_use])
+        ).astype(np.int64)
+        return uses[uses[:, 0] != uses[:, 2]]
+
+    def _get_entities_undefined(self) -> np.ndarray:
+        """Determine the entities that no RETW file defines, from the edge table.
+
+        An entity is defined by a file when there is an edge from the file to the entity, so the
+        entities without definition are all entities minus the targets of these edges.
+
+        Returns:
+            np.ndarray: The IDs of the entities without definition, in the order they were added
+        """
+        defines = self._edges.get_endpoints(
+            rows=self._edges.get_rows(types=[EdgeType.FILE_ENTITY.name])
+        )
+        is_defined = np.zeros(len(self._registry), dtype=bool)
+        is_defined[defines[:, 1]] = True
+        ids_entity = self._entities.get_ids()
+        return ids_entity[~is_defined[ids_entity]]
 
     def get_dag_entity(self, entity: EntityRef) -> ig.Graph:
         """Build a subgraph for a specific entity.
 
-        Builds the total graph and extracts the subgraph related to a specific entity,
-        including its incoming and outgoing connections.
+        Extracts the subgraph related to a specific entity from the total graph,
+        including its incoming and outgoing connections, with a traversal in each direction. For
+        many entities get_dags_entity is faster.
 
         Args:
-            code_model (str): The code of the model containing the entity.
-            code_entity (str): The code of the entity.
+            entity (EntityRef): The entity, by the code of its model and its code.
+
+        Raises:
+            KeyError: If the entity is not part of any of the added RETW files.
 
         Returns:
             ig.Graph: The subgraph for the specified entity.
         """
-        dag = self.get_dag_total()
+        dag = self._get_dag_total_cached()
         # Extract graph for relevant entity
         id_entity = self.get_entity_id(entity)
-        vx_entity = dag.vs.select(name=id_entity)[0]
-        vs_entity_graph = dag.subcomponent(vx_entity, mode="in") + dag.subcomponent(
-            vx_entity, mode="out"
+        vx_entity = self._get_vertex_index(graph=dag, id_vertex=id_entity)
+        vs_entity_graph = set(dag.subcomponent(vx_entity, mode="in")) | set(
+            dag.subcomponent(vx_entity, mode="out")
         )
-        vs_delete = [i for i in dag.vs.indices if i not in vs_entity_graph]
-        dag.delete_vertices(vs_delete)
-        return dag
+        return dag.induced_subgraph(sorted(vs_entity_graph))
+
+    def _get_dag_lineage(self, dag: ig.Graph, vertex: int) -> ig.Graph:
+        """Extract the subgraph of a vertex of the total graph and everything up- and downstream of it.
+
+        Args:
+            dag (ig.Graph): The cached total graph
+            vertex (int): Index of the vertex
+
+        Returns:
+            ig.Graph: The subgraph
+        """
+        index = self.get_reachability_index()
+        vertices = np.union1d(index.get_ancestors(vertex), index.get_descendants(vertex))
+        return dag.induced_subgraph(vertices.tolist())
+
+    def get_dags_entity(self, entities: list) -> dict:
+        """Build the subgraphs for several entities at once.
+
+        The vertices upstream and downstream of the entities are looked up in the reachability
+        index of the total graph.
+
+        Args:
+            entities (list): The entities, as EntityRef.
+
+        Raises:
+            KeyError: If one of the entities is not part of any of the added RETW files.
+
+        Returns:
+            dict: The subgraph for each of the entities, by EntityRef
+        """
+        dag = self._get_dag_total_cached()
+        idx_vertex = self._get_vertex_indices(graph=dag)
+        vs_entities = [
+            self._get_vertex_index(
+                graph=dag, id_vertex=self.get_entity_id(entity), idx_vertex=idx_vertex
+            )
+            for entity in entities
+        ]
+        return {
+            entity: self._get_dag_lineage(dag=dag, vertex=vx_entity)
+            for entity, vx_entity in zip(entities, vs_entities)
+        }
 
     def _dag_ETL_run_order(self, dag: ig.Graph) -> ig.Graph:
         """Enrich the DAG with the sequence the mappings should run in
@@ -521,97 +1603,166 @@ class DagGenerator:
             ig.Graph: DAG where the vertices are enriched with the attribute 'run_level',
             entity vertices get the value -1, because run order is invalid for entities.
         """
-        # For each node calculate the number of mapping nodes before the current node
-        lst_mapping_order = [
-            sum(
-                dag.vs[vs]["type"] == VertexType.MAPPING.name
-                for vs in dag.subcomponent(dag.vs[i], mode="in")
-            )
-            - 1
-            for i in range(dag.vcount())
-        ]
-        # Assign valid run order to mappings only
-        lst_run_level = []
-        lst_run_level.extend(
-            run_level if role == VertexType.MAPPING.name else -1
-            for run_level, role in zip(lst_mapping_order, dag.vs["type"])
-        )
-        dag.vs["run_level"] = lst_run_level
+        self._dag_ETL_run_levels(dag=dag)
         dag = self._dag_ETL_run_level_stages(dag=dag)
         return dag
 
-    def _dag_ETL_run_level_stages(self, dag: ig.Graph) -> ig.Graph:
+    def _dag_ETL_run_levels(self, dag: ig.Graph) -> None:
+        """Determine the run level of the mappings, following the run level mode.
+
+        Both modes are computed in one topological pass over the DAG, see count_ancestors and
+        get_longest_path_counts. If the flow has cycles, the mappings upstream of each vertex are
+        counted with a reachability index of the flow.
+
+        Args:
+            dag (ig.Graph): DAG that describes entities and mappings
+
+        Returns:
+            None
+        """
+        is_mapping = np.array(dag.vs["type"]) == VertexType.MAPPING.name
+        if not dag.is_dag():
+            logger.warning("The ETL flow has cycles, counting upstream mappings with an index")
+            qty_mappings = ReachabilityIndex(graph=dag).count_ancestors(is_counted=is_mapping)
+        elif self.run_level_mode == RunLevelMode.LONGEST_PATH:
+            qty_mappings = get_longest_path_counts(dag=dag, is_counted=is_mapping)
+        else:
+            qty_mappings = count_ancestors(dag=dag, is_counted=is_mapping)
+        # Assign valid run order to mappings only
+        dag.vs["run_level"] = np.where(is_mapping, qty_mappings - 1, -1).tolist()
+
+    def _dag_ETL_run_level_stages(
+        self, dag: ig.Graph, run_levels: set = None
+    ) -> ig.Graph:
         """Determine mapping stages for each run level
 
         Args:
             dag (ig.Graph): DAG describing the ETL
+            run_levels (set, optional): Run levels to determine the stages for. Defaults to all.
 
         Returns:
-            ig.Graph: ETL stages for a level added in the mapping vertex attribute 'stage'
+            ig.Graph: ETL stages for a level added in the mapping vertex attribute 'run_level_stage'
         """
-        dict_level_runs = {}
-        # All mapping nodes
-        vs_mapping = dag.vs.select(type_eq=VertexType.MAPPING.name)
+        # Mapping nodes by run level
+        mappings_by_level = {}
+        for idx, (role, run_level) in enumerate(zip(dag.vs["type"], dag.vs["run_level"])):
+            if role == VertexType.MAPPING.name:
+                mappings_by_level.setdefault(run_level, []).append(idx)
+        if run_levels is not None:
+            mappings_by_level = {
+                run_level: mappings
+                for run_level, mappings in mappings_by_level.items()
+                if run_level in run_levels
+            }
+        if "run_level_stage" in dag.vs.attributes():
+            lst_stages = dag.vs["run_level_stage"]
+        else:
+            lst_stages = [None] * dag.vcount()
 
         # Determine run stages of mappings by run level
-        run_levels = list({node["run_level"] for node in vs_mapping})
-        for run_level in run_levels:
-            # Find run_level mappings and corresponding source entities
-            mapping_sources = [
-                {"mapping": mapping["name"], "sources": dag.predecessors(mapping)}
-                for mapping in vs_mapping.select(run_level_eq=run_level)
-            ]
+        predecessors = dag.get_adjlist(mode="in")
+        names = dag.vs["name"]
+        for mappings in mappings_by_level.values():
+            # The coloring depends on the order of the mappings, so they are sorted on their keys
+            # to get the same stages in a patched DAG as in a DAG built from scratch
+            mappings = sorted(mappings, key=lambda idx: self._registry.keys[names[idx]])
             # Create graph of mapping conflicts (mappings that draw on the same sources)
+            mapping_sources = {idx: predecessors[idx] for idx in mappings}
             graph_conflicts = self._dag_ETL_run_level_conflicts_graph(mapping_sources)
-            # Determine unique sorting for conflicts
-            order = graph_conflicts.vertex_coloring_greedy(method="colored_neighbors")
-            # Apply them back to the DAG
-            dict_level_runs |= dict(zip(graph_conflicts.vs["name"], order))
-            for k, v in dict_level_runs.items():
-                dag.vs.select(name=k)["run_level_stage"] = v
+            order = self._dag_ETL_run_level_coloring(graph_conflicts=graph_conflicts)
+            for idx, stage in zip(mappings, order):
+                lst_stages[idx] = stage
+        # Apply them back to the DAG
+        dag.vs["run_level_stage"] = lst_stages
         return dag
 
+    def _dag_ETL_run_level_coloring(self, graph_conflicts: ig.Graph) -> list:
+        """Color the graph of mapping conflicts of a run level, following the stage coloring.
+
+        Args:
+            graph_conflicts (ig.Graph): Graph of mappings sharing source entities
+
+        Returns:
+            list: The stage of each mapping, numbered from 0
+        """
+        if self.stage_coloring == StageColoring.DSATUR:
+            return get_coloring_dsatur(graph=graph_conflicts)
+        if self.stage_coloring == StageColoring.EXACT:
+            return get_coloring_exact(graph=graph_conflicts, seconds_budget=self.seconds_coloring)
+        if self.stage_coloring == StageColoring.BALANCED:
+            return get_coloring_balanced(
+                graph=graph_conflicts, colors=get_coloring_dsatur(graph=graph_conflicts)
+            )
+        return graph_conflicts.vertex_coloring_greedy(method="colored_neighbors")
+
     def _dag_ETL_run_level_conflicts_graph(self, mapping_sources: dict) -> ig.Graph:
         """Generate a graph expressing which mappings share sources
 
+        The mappings sharing a source are found with an index of the mappings by source, so the
+        work is proportional to the number of mapping pairs that actually share a source.
+
         Args:
             mapping_sources (dict): Mappings with a list of source node ids for each of them
 
         Returns:
-            ig.Graph: Expressing mapping sharing source entities
-        """
-        lst_vertices = [{"name": mapping["mapping"]} for mapping in mapping_sources]
-        lst_edges = []
-        for a in mapping_sources:
-            for b in mapping_sources:
-                if a["mapping"] < b["mapping"]:
-                    qty_common = len(set(a["sources"]) & set(b["sources"]))
-                    if qty_common > 0:
-                        lst_edges.append(
-                            {"source": a["mapping"], "target": b["mapping"]}
-                        )
-        graph_conflicts = ig.Graph.DictList(
-            vertices=lst_vertices, edges=lst_edges, directed=False
+            ig.Graph: Expressing mapping sharing source entities, with the vertices in the order of
+            the mappings and the mappings as vertex attribute 'name'
+        """
+        mappings_by_source = {}
+        for position, sources in enumerate(mapping_sources.values()):
+            for source in set(sources):
+                mappings_by_source.setdefault(source, []).append(position)
+        lst_edges = {
+            (position_a, position_b)
+            for positions in mappings_by_source.values()
+            for i, position_a in enumerate(positions)
+            for position_b in positions[i + 1 :]
+        }
+        graph_conflicts = ig.Graph(
+            n=len(mapping_sources), edges=sorted(lst_edges), directed=False
         )
+        graph_conflicts.vs["name"] = list(mapping_sources)
         return graph_conflicts
 
     def get_dag_ETL(self) -> ig.Graph:
+        """Get the ETL DAG, showing the flow of data between entities and mappings.
+
+        Returns:
+            ig.Graph: A copy of the ETL DAG, which can be modified by the caller.
+
+        Raises:
+            NoFlowError: If no mappings are found, indicating no ETL flow.
+        """
+        return self._get_dag_ETL_cached().copy()
+
+    def _get_dag_ETL_cached(self) -> ig.Graph:
+        """Get the ETL DAG, which is shared and must not be modified.
+
+        Returns:
+            ig.Graph: The ETL DAG.
+
+        Raises:
+            NoFlowError: If no mappings are found, indicating no ETL flow.
+        """
+        return self._get_graph_cached(name="ETL", build=self._build_dag_ETL)
+
+    def _build_dag_ETL(self) -> ig.Graph:
         """Build the ETL DAG, showing the flow of data between entities and mappings.
 
         Constructs a directed acyclic graph (DAG) representing the ETL process,
         including mappings and entities as vertices, and their relationships as edges.
-        The DAG is enriched with run order information and isolated entities are removed.
+        The flow is checked for cycles before the DAG is enriched with run order information,
+        and isolated entities are removed.
 
         Returns:
             ig.Graph: The ETL DAG.
 
         Raises:
             NoFlowError: If no mappings are found, indicating no ETL flow.
+            CycleError: If the flow has cycles and fail_on_cycles is set.
         """
-        vertices = list(self.mappings.values()) + list(self.entities.values())
-        edge_types = [EdgeType.ENTITY_SOURCE.name, EdgeType.ENTITY_TARGET.name]
-        edges = [e for e in self.edges if e["type"] in edge_types]
-        dag = ig.Graph.DictList(vertices=vertices, edges=edges, directed=True)
+        dag = self._build_dag_ETL_flow()
+        self._check_cycles(dag=dag)
         dag = self._dag_ETL_run_order(dag=dag)
 
         # Delete entities without mappings
@@ -628,3 +1779,115 @@ class DagGenerator:
                 raise NoFlowError("No mappings, so no ETL flow")
         logger.info("Build graph mappings")
         return dag
+
+    def _build_dag_ETL_flow(self) -> ig.Graph:
+        """Build the graph of the flow of data between entities and mappings, without run order.
+
+        Returns:
+            ig.Graph: The graph of mappings and entities.
+
+        Raises:
+            NoFlowError: If no mappings are found, indicating no ETL flow.
+        """
+        if not self._mappings:
+            raise NoFlowError("No mappings, so no ETL flow")
+        edge_types = [EdgeType.ENTITY_SOURCE.name, EdgeType.ENTITY_TARGET.name]
+        return self._build_graph(
+            tables=[self._mappings, self._entities],
+            rows_edge=self._edges.get_rows(types=edge_types),
+        )
+
+    def get_cycles(self) -> list:
+        """Report the cycles in the ETL flow, which make it impossible to order the mappings.
+
+        The flow is split into strongly connected components in linear time, only components with a
+        cycle are searched for their shortest cycle, see get_shortest_cycles.
+
+        Returns:
+            list: A report for each set of entities and mappings that depend on each other, with
+            a shortest cycle among them, the RETW files of the mappings in that cycle and the
+            number of vertices and mappings involved. Empty if the flow is acyclic or there are no mappings.
+        """
+        try:
+            dag = self._build_dag_ETL_flow()
+        except NoFlowError:
+            return []
+        return self._report_cycles(dag=dag)
+
+    def _report_cycles(self, dag: ig.Graph) -> list:
+        """Report the cycles in a graph of the ETL flow.
+
+        Args:
+            dag (ig.Graph): Graph of mappings and entities
+
+        Returns:
+            list: The report, see get_cycles
+        """
+        if dag.is_dag():
+            return []
+        types = dag.vs["type"]
+        reports = []
+        for cycle in get_shortest_cycles(graph=dag):
+            refs = [self._get_vertex_ref(graph=dag, idx_vertex=vertex) for vertex in cycle.vertices]
+            reports.append(
+                {
+                    "cycle": refs,
+                    "files": sorted(
+                        {ref["FileRETW"] for ref in refs if "FileRETW" in ref}
+                    ),
+                    "qty_vertices": len(cycle.component),
+                    "qty_mappings": sum(
+                        types[vertex] == VertexType.MAPPING.name for vertex in cycle.component
+                    ),
+                }
+            )
+        return reports
+
+    def _check_cycles(self, dag: ig.Graph) -> None:
+        """Check the ETL flow for cycles before the mappings are ordered, logging any cycle found.
+
+        Args:
+            dag (ig.Graph): Graph of mappings and entities
+
+        Raises:
+            CycleError: If the flow has cycles and fail_on_cycles is set.
+
+        Returns:
+            None
+        """
+        cycles = self._report_cycles(dag=dag)
+        for report in cycles:
+            path = " -> ".join(
+                f"{ref['CodeModel']}.{ref['CodeEntity']}"
+                if ref["type"] == VertexType.ENTITY.name
+                else ref["CodeMapping"]
+                for ref in report["cycle"]
+            )
+            logger.error(
+                f"Cycle in the ETL flow of {report['qty_mappings']} mapping(s), shortest: "
+                f"{path}, from file(s) {', '.join(report['files'])}"
+            )
+        if cycles and self.fail_on_cycles:
+            raise CycleError(cycles=cycles)
+
+
+def _extract_RETW_records(
+    file_RETW: str, size_streaming: int, is_signed: bool, signature_checked: dict
+) -> tuple:
+    """Parse a RETW file in a worker process of the parallel ingestion.
+
+    Args:
+        file_RETW (str): RETW file containing mappings
+        size_streaming (int): Size from which the file is read with a streaming RetwReader
+        is_signed (bool): Whether to take the file's signature for the cache before parsing it
+        signature_checked (dict): Signature calculated by the cache for reuse, see take_signature
+
+    Returns:
+        tuple: The file's records, None if the file could not be read, and its signature, None if
+        it wasn't taken or the file can't be read
+    """
+    signature = None
+    if is_signed:
+        signature = take_signature(file_RETW=file_RETW, signature_checked=signature_checked)
+    dag_generator = DagGenerator(size_streaming=size_streaming)
+    return dag_generator._extract_RETW_records(file_RETW=file_RETW), signature
@@ -0,0 +1,235 @@
+from collections import deque, namedtuple
+
+import igraph as ig
+import numpy as np
+
+from dag_reachability import BitPropagator, get_condensation, get_reach_bits
+
+FailurePropagation = namedtuple(
+    "FailurePropagation", ("sources", "reached", "distance", "nearest")
+)
+FailureOverlaps = namedtuple(
+    "FailureOverlaps", ("qty_mappings", "qty_entities", "qty_unique", "qty_shared")
+)
+FailureSimulation = namedtuple("FailureSimulation", ("fallout", "qty_down"))
+
+
+def propagate_failures(graph: ig.Graph, sources: np.ndarray) -> FailurePropagation:
+    """Propagate failures of many vertices through a graph at once.
+
+    Which failures reach each vertex is determined with a single pass over the condensation of the
+    graph (see get_reach_bits), so it also works for graphs with cycles. The distance to the nearest
+    failure is determined with a single breadth first search starting from all failed vertices.
+
+    Args:
+        graph (ig.Graph): Directed graph
+        sources (np.ndarray): Indices of the failed vertices
+
+    Returns:
+        FailurePropagation: The failed vertices, an array of shape (vertices, words) of 64-bit words
+        where bit i of a vertex is set when it is downstream of sources[i] (not counting sources[i]
+        itself), and for each vertex the number of edges from the nearest failed vertex and its
+        position in sources, both -1 for vertices that are not reached
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    membership, dag = get_condensation(graph=graph)
+    reached = get_reach_bits(dag=dag, sources=membership[sources])[membership]
+    positions = np.arange(len(sources))
+    np.bitwise_and.at(
+        reached,
+        (sources, positions // 64),
+        ~np.left_shift(np.uint64(1), (positions % 64).astype(np.uint64)),
+    )
+
+    successors = graph.get_adjlist(mode="out")
+    distance = [-1] * graph.vcount()
+    nearest = [-1] * graph.vcount()
+    queue = deque()
+    for position, source in enumerate(sources.tolist()):
+        if distance[source] < 0:
+            distance[source] = 0
+            nearest[source] = position
+            queue.append(source)
+    while queue:
+        vertex = queue.popleft()
+        for succ in successors[vertex]:
+            if distance[succ] < 0:
+                distance[succ] = distance[vertex] + 1
+                nearest[succ] = nearest[vertex]
+                queue.append(succ)
+    return FailurePropagation(
+        sources=sources,
+        reached=reached,
+        distance=np.array(distance, dtype=np.int64),
+        nearest=np.array(nearest, dtype=np.int64),
+    )
+
+
+def get_downstream(graph: ig.Graph, sources: np.ndarray) -> np.ndarray:
+    """Determine which vertices are downstream of any of the source vertices, in a single pass.
+
+    Args:
+        graph (ig.Graph): Directed graph
+        sources (np.ndarray): Indices of the source vertices
+
+    Returns:
+        np.ndarray: Boolean for each vertex, whether it is a source or downstream of one
+    """
+    membership, dag = get_condensation(graph=graph)
+    bits = np.zeros((dag.vcount(), 1), dtype=np.uint64)
+    bits[membership[np.asarray(sources, dtype=np.int64)]] = 1
+    return BitPropagator(dag=dag).propagate(bits=bits)[membership, 0] != 0
+
+
+def get_reached(propagation: FailurePropagation, vertices: slice = slice(None)) -> np.ndarray:
+    """Unpack the failures reaching vertices to booleans.
+
+    Args:
+        propagation (FailurePropagation): Result of propagate_failures
+        vertices (slice, optional): Vertices to unpack. Defaults to all.
+
+    Returns:
+        np.ndarray: Array of shape (vertices, failures), whether a failure reaches a vertex
+    """
+    rows = propagation.reached[vertices].astype("<u8").view(np.uint8)
+    bits = np.unpackbits(rows, axis=1, bitorder="little")
+    return bits[:, : len(propagation.sources)].astype(bool)
+
+
+def get_failure_overlaps(
+    propagation: FailurePropagation, is_mapping: np.ndarray, size_block: int = 8192
+) -> FailureOverlaps:
+    """Count the vertices each failure reaches, alone and together with other failures.
+
+    The vertices are unpacked in blocks of size_block vertices to bound the memory.
+
+    Args:
+        propagation (FailurePropagation): Result of propagate_failures
+        is_mapping (np.ndarray): Boolean for each vertex, whether it is a mapping
+        size_block (int, optional): Number of vertices unpacked at once. Defaults to 8192.
+
+    Returns:
+        FailureOverlaps: For each failure the number of mappings and entities it reaches and the
+        number of vertices no other failure reaches, and for each pair of failures the number of
+        vertices both reach
+    """
+    qty_sources = len(propagation.sources)
+    qty_mappings = np.zeros(qty_sources, dtype=np.int64)
+    qty_entities = np.zeros(qty_sources, dtype=np.int64)
+    qty_unique = np.zeros(qty_sources, dtype=np.int64)
+    qty_shared = np.zeros((qty_sources, qty_sources), dtype=np.int64)
+    for begin in range(0, len(propagation.reached), size_block):
+        reached = get_reached(propagation, vertices=slice(begin, begin + size_block))
+        is_mapping_block = is_mapping[begin : begin + size_block]
+        qty_mappings += reached[is_mapping_block].sum(axis=0)
+        qty_entities += reached[~is_mapping_block].sum(axis=0)
+        qty_unique += reached[reached.sum(axis=1) == 1].sum(axis=0)
+        reached = reached.astype(np.float32)
+        qty_shared += np.rint(reached.T @ reached).astype(np.int64)
+    return FailureOverlaps(
+        qty_mappings=qty_mappings,
+        qty_entities=qty_entities,
+        qty_unique=qty_unique,
+        qty_shared=qty_shared,
+    )
+
+
+def simulate_failures(
+    graph: ig.Graph,
+    probabilities: np.ndarray,
+    is_counted: np.ndarray,
+    qty_samples: int,
+    seed: int = None,
+    size_block: int = 4096,
+) -> FailureSimulation:
+    """Sample random failures of the vertices of a graph and propagate them downstream.
+
+    Each sample is a bit: a vertex fails in a sample with its probability, independently of the
+    other vertices, and is down in the samples in which it or a vertex upstream of it fails. The
+    samples are propagated in blocks of size_block samples, with one pass over the condensation of
+    the graph per block, see BitPropagator.
+
+    Args:
+        graph (ig.Graph): Directed graph
+        probabilities (np.ndarray): Probability of failure of each vertex
+        is_counted (np.ndarray): Boolean for each vertex, whether it counts for the fallout
+        qty_samples (int): Number of samples
+        seed (int, optional): Seed of the random generator, for reproducible results. Defaults to
+            a different result each time.
+        size_block (int, optional): Number of samples propagated at once. Defaults to 4096.
+
+    Returns:
+        FailureSimulation: For each sample the number of counted vertices that are down, and for
+        each vertex the number of samples in which it is down
+    """
+    probabilities = np.asarray(probabilities, dtype=float)
+    is_counted = np.asarray(is_counted, dtype=bool)
+    rng = np.random.default_rng(seed)
+    membership, dag = get_condensation(graph=graph)
+    propagator = BitPropagator(dag=dag)
+    candidates = np.flatnonzero(probabilities > 0)
+    counted = np.flatnonzero(is_counted)
+
+    fallout = np.zeros(qty_samples, dtype=np.int64)
+    qty_down = np.zeros(graph.vcount(), dtype=np.int64)
+    for begin in range(0, qty_samples, size_block):
+        qty_block = min(size_block, qty_samples - begin)
+        bits_failed = _sample_failure_bits(
+            rng=rng, probabilities=probabilities[candidates], qty_samples=qty_block
+        )
+        bits = np.zeros((dag.vcount(), bits_failed.shape[1]), dtype=np.uint64)
+        np.bitwise_or.at(bits, membership[candidates], bits_failed)
+        bits = propagator.propagate(bits=bits)[membership]
+
+        qty_down += np.bitwise_count(bits).sum(axis=1, dtype=np.int64)
+        # Count the counted vertices that are down in each sample, in blocks of vertices
+        for begin_counted in range(0, len(counted), size_block):
+            rows = bits[counted[begin_counted : begin_counted + size_block]]
+            down = np.unpackbits(rows.astype("<u8").view(np.uint8), axis=1, bitorder="little")
+            fallout[begin : begin + qty_block] += down[:, :qty_block].sum(axis=0, dtype=np.int64)
+    return FailureSimulation(fallout=fallout, qty_down=qty_down)
+
+
+def _sample_failure_bits(
+    rng: np.random.Generator, probabilities: np.ndarray, qty_samples: int
+) -> np.ndarray:
+    """Draw in which samples vertices fail, each sample independently with the vertex's probability.
+
+    Instead of drawing a number for each vertex and sample, the number of failures of a vertex is
+    drawn from the binomial distribution, and then that many distinct samples at random, so the time
+    taken grows with the number of failures. For probabilities above 0.5 the samples without
+    failure are drawn instead.
+
+    Args:
+        rng (np.random.Generator): Random generator
+        probabilities (np.ndarray): Probability of failure of each vertex
+        qty_samples (int): Number of samples
+
+    Returns:
+        np.ndarray: Array of shape (vertices, words) of 64-bit words, bit i of a vertex is set when
+        it fails in sample i
+    """
+    is_inverted = probabilities > 0.5
+    qty_failed = rng.binomial(qty_samples, np.where(is_inverted, 1 - probabilities, probabilities))
+    vertices = np.arange(len(probabilities))
+    # Keys of the drawn (vertex, sample) pairs; pairs drawn twice are drawn again
+    keys = np.empty(0, dtype=np.int64)
+    qty_missing = qty_failed
+    while qty_missing.any():
+        keys_new = np.repeat(vertices, qty_missing) * qty_samples + rng.integers(
+            0, qty_samples, qty_missing.sum()
+        )
+        keys = np.unique(np.concatenate((keys, keys_new)))
+        qty_missing = qty_failed - np.bincount(keys // qty_samples, minlength=len(vertices))
+
+    samples = keys % qty_samples
+    bits = np.zeros((len(probabilities), (qty_samples + 63) // 64), dtype=np.uint64)
+    np.bitwise_or.at(
+        bits,
+        (keys // qty_samples, samples // 64),
+        np.left_shift(np.uint64(1), (samples % 64).astype(np.uint64)),
+    )
+    bits[is_inverted] = ~bits[is_inverted]
+    if qty_samples % 64:
+        bits[:, -1] &= np.uint64((1 << (qty_samples % 64)) - 1)
+    return bits
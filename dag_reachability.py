@@ -0,0 +1,271 @@
+import time
+
+import igraph as ig
+import numpy as np
+
+
+def get_depths(dag: ig.Graph, mode: str = "out") -> np.ndarray:
+    """Get the number of edges on the longest path from a source vertex to each vertex of a DAG.
+
+    Args:
+        dag (ig.Graph): Directed acyclic graph
+        mode (str, optional): 'out' to follow the edges, 'in' to follow them in reverse, so the
+            depth is measured from the sink vertices. Defaults to 'out'.
+
+    Returns:
+        np.ndarray: Depth for each vertex, 0 for vertices without predecessors
+    """
+    predecessors = dag.get_adjlist(mode="in" if mode == "out" else "out")
+    depths = [0] * dag.vcount()
+    for vertex in dag.topological_sorting(mode=mode):
+        if predecessors[vertex]:
+            depths[vertex] = max(depths[pred] for pred in predecessors[vertex]) + 1
+    return np.array(depths, dtype=np.int64)
+
+
+class BitPropagator:
+    """Propagates bitsets along the edges of a DAG in a single topological pass.
+
+    The edges are ordered by the depth of their target once, so bitsets with any number of words
+    can be propagated repeatedly: the vertices are processed by depth, and for all vertices at a
+    depth the bitsets of their predecessors, which are all less deep, are combined at once.
+    """
+
+    def __init__(self, dag: ig.Graph, mode: str = "out"):
+        """Order the edges of the DAG for propagation.
+
+        Args:
+            dag (ig.Graph): Directed acyclic graph
+            mode (str, optional): 'out' to follow the edges, so bits spread to the descendants,
+                'in' to follow them in reverse, so bits spread to the ancestors. Defaults to 'out'.
+        """
+        self.qty_vertices = dag.vcount()
+        # Edges ordered by the depth of their target, and within a depth by target
+        depths = get_depths(dag, mode=mode)
+        edges = np.array(dag.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+        if mode != "out":
+            edges = edges[:, ::-1]
+        order = np.lexsort((edges[:, 1], depths[edges[:, 1]]))
+        self._preds, self._targets = edges[order, 0], edges[order, 1]
+        depth_max = depths.max() if len(depths) else 0
+        self._bounds = np.searchsorted(depths[self._targets], np.arange(1, depth_max + 2))
+
+    def propagate(self, bits: np.ndarray) -> np.ndarray:
+        """Add the bits of all predecessors to the bits of each vertex, in place.
+
+        Args:
+            bits (np.ndarray): Array of shape (vertices, words) of 64-bit words
+
+        Returns:
+            np.ndarray: The bits, where each vertex has the union of its own bits and those of all
+            vertices it can be reached from
+        """
+        for begin, end in zip(self._bounds[:-1], self._bounds[1:]):
+            if begin == end:
+                continue
+            targets_depth = self._targets[begin:end]
+            starts = np.flatnonzero(np.r_[True, targets_depth[1:] != targets_depth[:-1]])
+            bits[targets_depth[starts]] |= np.bitwise_or.reduceat(
+                bits[self._preds[begin:end]], starts, axis=0
+            )
+        return bits
+
+
+def get_reach_bits(dag: ig.Graph, sources: np.ndarray, mode: str = "out") -> np.ndarray:
+    """Determine which of the source vertices reach each vertex of a DAG.
+
+    Each vertex gets a bitset of the sources it can be reached from, including itself. The bitsets
+    are filled in a single topological pass, see BitPropagator.
+
+    Args:
+        dag (ig.Graph): Directed acyclic graph
+        sources (np.ndarray): Indices of the source vertices
+        mode (str, optional): 'out' to follow the edges, so the bits mark the descendants of the
+            sources, 'in' to follow them in reverse, so the bits mark their ancestors. Defaults to 'out'.
+
+    Returns:
+        np.ndarray: Array of shape (vertices, words) of 64-bit words, bit i of a vertex is set when
+        the vertex is reachable from sources[i]
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    bits = np.zeros((dag.vcount(), (len(sources) + 63) // 64), dtype=np.uint64)
+    if len(sources) == 0:
+        return bits
+    positions = np.arange(len(sources))
+    np.bitwise_or.at(
+        bits,
+        (sources, positions // 64),
+        np.left_shift(np.uint64(1), (positions % 64).astype(np.uint64)),
+    )
+    return BitPropagator(dag=dag, mode=mode).propagate(bits=bits)
+
+
+def get_condensation(graph: ig.Graph) -> tuple:
+    """Condense the strongly connected components of a directed graph into a DAG.
+
+    Args:
+        graph (ig.Graph): Directed graph
+
+    Returns:
+        tuple: The component of each vertex as np.ndarray, and the DAG with a vertex for each
+        component and an edge between two components when an edge of the graph connects them
+    """
+    membership = np.array(graph.connected_components(mode="strong").membership, dtype=np.int64)
+    qty_components = int(membership.max()) + 1 if len(membership) else 0
+    edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    edges = membership[edges]
+    edges = np.unique(edges[edges[:, 0] != edges[:, 1]], axis=0)
+    dag = ig.Graph(n=qty_components, edges=edges.tolist(), directed=True)
+    return membership, dag
+
+
+class ReachabilityIndex:
+    """Answers which vertices of a graph are upstream or downstream of each other without traversing it.
+
+    The strongly connected components of the graph are condensed into a DAG, so the index also
+    works for graphs with cycles. For each component the components it can be reached from are
+    stored as a row of a transitive closure bit matrix, built with get_reach_bits in blocks of
+    components. Whether a vertex depends on another is a single bit test, the ancestors of a
+    vertex are a row of the matrix and its descendants a column.
+
+    The matrix takes components * components / 8 bytes, get_stats reports the memory and build time.
+    """
+
+    def __init__(self, graph: ig.Graph, size_block: int = 4096):
+        """Build the index.
+
+        Args:
+            graph (ig.Graph): Directed graph, which must not be changed while the index is used
+            size_block (int, optional): Number of components whose descendants are determined in
+                one pass over the graph, rounded up to a multiple of 64 so each block fills whole
+                words of the matrix. Defaults to 4096.
+        """
+        start = time.perf_counter()
+        size_block = max(64, (size_block + 63) // 64 * 64)
+        self.qty_vertices = graph.vcount()
+        self.qty_edges = graph.ecount()
+        self.membership, dag = get_condensation(graph=graph)
+        self.qty_components = dag.vcount()
+
+        words = (self.qty_components + 63) // 64
+        self._closure = np.zeros((self.qty_components, words), dtype=np.uint64)
+        for begin in range(0, self.qty_components, size_block):
+            sources = np.arange(begin, min(begin + size_block, self.qty_components))
+            bits = get_reach_bits(dag=dag, sources=sources)
+            self._closure[:, begin // 64 : begin // 64 + bits.shape[1]] = bits
+        self.seconds_build = time.perf_counter() - start
+
+    def _get_components_bits(self, row: np.ndarray) -> np.ndarray:
+        """Unpack a row of the closure matrix to a boolean for each component."""
+        bits = np.unpackbits(row.astype("<u8").view(np.uint8), bitorder="little")
+        return bits[: self.qty_components].astype(bool)
+
+    def _get_members(self, is_component: np.ndarray) -> np.ndarray:
+        """Get the vertices that belong to the selected components, in increasing order."""
+        return np.flatnonzero(is_component[self.membership])
+
+    def depends_on(self, vertex: int, vertex_upstream: int) -> bool:
+        """Check whether a vertex depends on another, which is the case when the other vertex is upstream of it.
+
+        Args:
+            vertex (int): Index of the vertex
+            vertex_upstream (int): Index of the vertex that might be upstream
+
+        Returns:
+            bool: True if there is a path from vertex_upstream to vertex, or they are the same vertex
+        """
+        component = self.membership[vertex]
+        upstream = self.membership[vertex_upstream]
+        word = self._closure[component, upstream // 64]
+        return bool(word & np.left_shift(np.uint64(1), np.uint64(upstream % 64)))
+
+    def get_ancestors(self, vertex: int) -> np.ndarray:
+        """Get the vertices upstream of a vertex.
+
+        Args:
+            vertex (int): Index of the vertex
+
+        Returns:
+            np.ndarray: Indices of the vertices with a path to the vertex, including the vertex
+            itself, in increasing order
+        """
+        row = self._closure[self.membership[vertex]]
+        return self._get_members(self._get_components_bits(row))
+
+    def get_descendants(self, vertex: int) -> np.ndarray:
+        """Get the vertices downstream of a vertex.
+
+        Args:
+            vertex (int): Index of the vertex
+
+        Returns:
+            np.ndarray: Indices of the vertices with a path from the vertex, including the vertex
+            itself, in increasing order
+        """
+        component = self.membership[vertex]
+        column = self._closure[:, component // 64]
+        is_component = (column & np.left_shift(np.uint64(1), np.uint64(component % 64))) != 0
+        return self._get_members(is_component)
+
+    def count_ancestors(self, is_counted: np.ndarray, size_block: int = 1024) -> np.ndarray:
+        """Count the counted vertices among each vertex and its ancestors.
+
+        Args:
+            is_counted (np.ndarray): Boolean for each vertex, whether it is counted
+            size_block (int, optional): Number of components whose rows are unpacked at once.
+                Defaults to 1024.
+
+        Returns:
+            np.ndarray: For each vertex the number of counted vertices with a path to it,
+            including itself
+        """
+        counts_component = np.bincount(
+            self.membership, weights=is_counted, minlength=self.qty_components
+        ).astype(np.int64)
+        counts = np.zeros(self.qty_components, dtype=np.int64)
+        for begin in range(0, self.qty_components, size_block):
+            rows = self._closure[begin : begin + size_block].astype("<u8").view(np.uint8)
+            bits = np.unpackbits(rows, axis=1, bitorder="little")[:, : self.qty_components]
+            counts[begin : begin + size_block] = bits @ counts_component
+        return counts[self.membership]
+
+    def sum_descendants(self, weights: np.ndarray, size_block: int = 1024) -> np.ndarray:
+        """Sum the weights of each vertex and its descendants.
+
+        The rows of the closure matrix are unpacked in blocks; a row adds the weight of its
+        component to all components upstream of it.
+
+        Args:
+            weights (np.ndarray): Weight of each vertex, or an array of shape (vertices, measures)
+                to sum several weights in the same pass
+            size_block (int, optional): Number of components whose rows are unpacked at once.
+                Defaults to 1024.
+
+        Returns:
+            np.ndarray: For each vertex the sum of the weights of the vertices with a path from it,
+            including itself, in the shape of weights
+        """
+        weights = np.asarray(weights, dtype=float)
+        weights_component = np.zeros((self.qty_components,) + weights.shape[1:])
+        np.add.at(weights_component, self.membership, weights)
+        sums = np.zeros((self.qty_components,) + weights.shape[1:])
+        for begin in range(0, self.qty_components, size_block):
+            rows = self._closure[begin : begin + size_block].astype("<u8").view(np.uint8)
+            bits = np.unpackbits(rows, axis=1, bitorder="little")[:, : self.qty_components]
+            sums += (weights_component[begin : begin + size_block].T @ bits).T
+        return sums[self.membership]
+
+    def get_stats(self) -> dict:
+        """Report on the size and build time of the index.
+
+        Returns:
+            dict: Number of vertices, edges and strongly connected components of the graph, the
+            bytes taken by the closure matrix and the seconds it took to build the index
+        """
+        return {
+            "vertices": self.qty_vertices,
+            "edges": self.qty_edges,
+            "components": self.qty_components,
+            "bytes": self._closure.nbytes + self.membership.nbytes,
+            "seconds": round(self.seconds_build, 4),
+        }
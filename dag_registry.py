@@ -0,0 +1,89 @@
+import hashlib
+from array import array
+
+import numpy as np
+
+
+class IdRegistry:
+    """Assigns dense integer ids to the vertices of the graphs.
+
+    Each vertex is identified by a stable key, a tuple starting with the vertex type. The first time
+    a key is registered it gets the next free id, so the ids can be used as indices into arrays.
+    Besides the id each key has a 64-bit stable digest, which stays the same across runs and can be
+    used to identify vertices outside of the graphs.
+    """
+
+    def __init__(self):
+        """Initializes a new instance of the IdRegistry class."""
+        self._ids = {}
+        self.keys = []
+        self._digests = array("Q")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._ids
+
+    def register(self, key: tuple) -> int:
+        """Get the id of a key, assigning a new id if the key is not registered yet.
+
+        Args:
+            key (tuple): Stable key of a vertex
+
+        Returns:
+            int: Dense id of the vertex
+        """
+        id_vertex = self._ids.get(key)
+        if id_vertex is None:
+            id_vertex = len(self.keys)
+            self._ids[key] = id_vertex
+            self.keys.append(key)
+            self._digests.append(stable_digest(key=key))
+        return id_vertex
+
+    def get_id(self, key: tuple) -> int:
+        """Get the id of a registered key.
+
+        Args:
+            key (tuple): Stable key of a vertex
+
+        Raises:
+            KeyError: If the key is not registered.
+
+        Returns:
+            int: Dense id of the vertex
+        """
+        return self._ids[key]
+
+    def get_digest(self, id_vertex: int) -> int:
+        """Get the stable digest of a vertex.
+
+        Args:
+            id_vertex (int): Dense id of the vertex
+
+        Returns:
+            int: 64-bit stable digest of the vertex's key
+        """
+        return self._digests[id_vertex]
+
+    @property
+    def digests(self) -> np.ndarray:
+        """Stable digests of all registered vertices, indexed by id.
+
+        A copy, because a view would keep the buffer from growing when vertices are registered.
+        """
+        return np.array(self._digests, dtype=np.uint64)
+
+
+def stable_digest(key: tuple) -> int:
+    """Generate a 64-bit stable digest of a vertex key.
+
+    Args:
+        key (tuple): Stable key of a vertex, consisting of strings
+
+    Returns:
+        int: The digest as an unsigned integer
+    """
+    str_bytes = bytes("\x1f".join(key), "UTF-8")
+    return int.from_bytes(hashlib.blake2b(str_bytes, digest_size=8).digest())
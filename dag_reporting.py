@@ -1,14 +1,29 @@
+import json
 import os
-from collections import deque
+from collections import Counter
 from enum import Enum, auto
 from pathlib import Path
 
 import igraph as ig
 import networkx as nx
+import numpy as np
+import pandas as pd
 from pyvis.network import Network
 
-from dag_generator import DagGenerator, EntityRef, NoFlowError, VertexType
+from dag_generator import (
+    DagGenerator,
+    EntityRef,
+    NoFlowError,
+    RunLevelMode,
+    StageColoring,
+    VertexType,
+)
+from dag_critical_path import get_schedule_times
+from dag_reachability import get_condensation, get_depths
+from dag_scheduler import get_barrier_makespan, schedule_list
 from logtools import get_logger
+from mapping_costs import MappingCosts
+from retw_cache import RetwCache
 
 logger = get_logger(__name__)
 
@@ -27,13 +42,42 @@ class DagReporting(DagGenerator):
     and determining node hierarchy levels for visualization.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache: RetwCache = None,
+        run_level_mode: RunLevelMode = RunLevelMode.MAPPING_ANCESTORS,
+        fail_on_cycles: bool = False,
+        stage_coloring: StageColoring = StageColoring.GREEDY,
+        seconds_coloring: float = 0.1,
+        size_streaming: int = None,
+    ):
         """Initializes a new instance of the DagReporting class.
 
         Initializes color palettes, node shapes, and node colors for visualization.
         It also calls the constructor of the parent class (DagGenerator).
+
+        Args:
+            cache (RetwCache, optional): Cache of records extracted from RETW files. Defaults to no caching.
+            run_level_mode (RunLevelMode, optional): How the run levels of mappings are determined.
+                Defaults to the number of upstream mappings.
+            fail_on_cycles (bool, optional): Whether building the ETL DAG raises a CycleError when
+                the flow has cycles. Defaults to logging the cycles.
+            stage_coloring (StageColoring, optional): How the mappings of a run level are divided
+                over stages. Defaults to greedy coloring.
+            seconds_coloring (float, optional): Time budget of the EXACT stage coloring for each
+                run level. Defaults to 0.1.
+            size_streaming (int, optional): RETW files of at least this many bytes are read with a
+                RetwReader, which only keeps the fields used for the graphs in memory. Defaults to
+                loading every file with json.load.
         """
-        super().__init__()
+        super().__init__(
+            cache=cache,
+            run_level_mode=run_level_mode,
+            fail_on_cycles=fail_on_cycles,
+            stage_coloring=stage_coloring,
+            seconds_coloring=seconds_coloring,
+            size_streaming=size_streaming,
+        )
         self.colors_discrete = [
             "#ff595e",
             "#ff924c",
@@ -59,6 +103,8 @@ class DagReporting(DagGenerator):
             VertexType.MAPPING.name: "hexagon",
             VertexType.ERROR.name: "star",
         }
+        self.color_critical_path = "#e4572e"
+        self.mapping_costs = MappingCosts()
         self.node_type_color = {
             VertexType.ENTITY.name: "#fbed8f",
             VertexType.FILE_RETW.name: "#73c4e5",
@@ -88,8 +134,21 @@ class DagReporting(DagGenerator):
 
         # Convert edges
         lst_edges_igraph = graph.get_edge_dataframe().to_dict("records")
+        # Only visual edge attributes are kept, pyvis derives the width of an edge from its 'weight'
+        attrs_visual = {"color": "color", "width": "weight"}
         lst_edges = []
-        lst_edges.extend((edge["source"], edge["target"]) for edge in lst_edges_igraph)
+        lst_edges.extend(
+            (
+                edge["source"],
+                edge["target"],
+                {
+                    attr_nx: edge[attr]
+                    for attr, attr_nx in attrs_visual.items()
+                    if attr in edge and not pd.isna(edge[attr])
+                },
+            )
+            for edge in lst_edges_igraph
+        )
         dag_nx.add_edges_from(lst_edges)
         return dag_nx
 
@@ -194,8 +253,9 @@ class DagReporting(DagGenerator):
     def _calculate_node_levels(self, dag: ig.Graph) -> ig.Graph:
         """Calculate and assign a level to each node in the DAG.
 
-        Calculates the level of each node in the DAG based on its predecessors,
-        and adds a 'level' attribute to each vertex.
+        The level of a node is the length of the longest path from a node without predecessors
+        to it. Nodes on a cycle share the level of their strongly connected component, so graphs
+        with cycles get levels as well.
 
         Args:
             dag (ig.Graph): The DAG to process.
@@ -203,21 +263,12 @@ class DagReporting(DagGenerator):
         Returns:
             ig.Graph: The DAG with node levels calculated and set.
         """
-        # Getting the number of preceding nodes to determine where to start
-        for i in range(dag.vcount()):
-            dag.vs[i]["qty_predecessors"] = len(dag.subcomponent(dag.vs[i], mode="in"))
-
-        # Calculating levels
-        # FIXME: Iterates through nodes that have multiple incoming connections multiple times
-        id_vertices = deque(
-            [(vtx, 0) for vtx in dag.vs.select(qty_predecessors_eq=1).indices]
-        )
-        while id_vertices:
-            id_vx, level = id_vertices.popleft()
-            dag.vs[id_vx]["level"] = level
-            id_vertices.extend(
-                [(vtx, level + 1) for vtx in dag.neighbors(id_vx, mode="out")]
-            )
+        if dag.is_dag():
+            levels = get_depths(dag=dag)
+        else:
+            membership, dag_components = get_condensation(graph=dag)
+            levels = get_depths(dag=dag_components)[membership]
+        dag.vs["level"] = levels.tolist()
         return dag
 
     def _dag_node_position_category(self, dag: ig.Graph) -> ig.Graph:
@@ -351,28 +402,63 @@ class DagReporting(DagGenerator):
         dag = self._set_visual_attributes(dag=dag)
         # Recolor requested entity
         id_entity = self.get_entity_id(entity_ref=entity)
-        vx_entity = dag.vs.select(name=id_entity)[0]
+        vx_entity = dag.vs.find(name=id_entity)
         dag.vs[vx_entity.index]["color"] = "#f296bf"
         self.plot_graph_html(dag=dag, file_html=file_html)
 
+    def iter_entities_without_definition(self):
+        """Iterate over the entities that are used in mappings, but not defined in any RETW file.
+
+        The entities are found with the edge table, without building a graph (see
+        _get_entities_undefined), and are grouped by model.
+
+        Yields:
+            dict: The attributes of an entity without definition, with the RETW files referencing
+            it as 'FilesRETW', ordered by CodeModel and Code
+        """
+        ids_entity = self._get_entities_undefined().tolist()
+        entities = sorted(
+            (self.entities[id_entity] for id_entity in ids_entity),
+            key=lambda entity: (str(entity.get("CodeModel")), str(entity.get("Code"))),
+        )
+        for entity in entities:
+            ids_file = sorted(
+                self._entity_files[entity["name"]],
+                key=lambda id_file: self._files.get_value(id_file, "Order"),
+            )
+            yield entity | {"FilesRETW": [self._registry.keys[id_file][1] for id_file in ids_file]}
+
     def get_entities_without_definition(self) -> list:
         """Identifies entities without a definition in the DAG.
 
-        This function checks for entities that do not have any incoming connections from a RETW file,
-        indicating they lack a definition within the current scope.
+        Entities that are referenced by mappings, but not part of the document model of any of the
+        RETW files, see iter_entities_without_definition.
 
         Returns:
             list: A list of dictionaries, where each dictionary represents an entity without a definition
                   and contains its attributes.
         """
-        lst_entities = []
-        dag = self.get_dag_total()
-        vs_entities = dag.vs.select(type_eq=VertexType.ENTITY.name)
-        for vx_entity in vs_entities:
-            vs_in = dag.vs(dag.neighbors(vx_entity, mode="in"))
-            if not [vx for vx in vs_in if vx["type"] == VertexType.FILE_RETW.name]:
-                lst_entities.append(vx_entity.attributes())
-        return lst_entities
+        return list(self.iter_entities_without_definition())
+
+    def write_entities_without_definition(self, file_jsonl: str) -> int:
+        """Write the entities without a definition to a JSON Lines file, one entity per line.
+
+        The entities are written while they are found, see iter_entities_without_definition.
+
+        Args:
+            file_jsonl (str): Path of the JSON Lines file.
+
+        Returns:
+            int: The number of entities written
+        """
+        self._create_output_dir(file_path=file_jsonl)
+        qty_entities = 0
+        with open(file_jsonl, "w", encoding="utf-8") as file:
+            for entity in self.iter_entities_without_definition():
+                file.write(json.dumps(entity) + "\n")
+                qty_entities += 1
+        logger.info(f"Wrote {qty_entities} entities without definition to '{file_jsonl}'")
+        return qty_entities
 
     def get_mapping_order(self) -> list:
         """Returns mappings and order of running (could be parallel,
@@ -381,14 +467,31 @@ class DagReporting(DagGenerator):
         Returns:
             list: List of mappings with order
         """
-        lst_mappings = []
         try:
-            dag = self.get_dag_ETL()
+            dag = self._get_dag_ETL_cached()
         except NoFlowError:
             logger.error(
                 "There are no mappings, so there is no mapping order to generate!"
             )
             return []
+        lst_mappings = self._get_mapping_order(dag=dag)
+        report = self._get_stage_report(dag=dag)
+        logger.info(
+            f"Mapping order has {report['qty_stages']} stages in {report['qty_run_levels']} run "
+            f"levels with {self.stage_coloring.name} coloring, stage sizes {report['stage_sizes']}"
+        )
+        return lst_mappings
+
+    def _get_mapping_order(self, dag: ig.Graph) -> list:
+        """List the mappings of an ETL DAG with run levels and stages, see get_mapping_order.
+
+        Args:
+            dag (ig.Graph): ETL DAG with the run levels and stages of its mappings
+
+        Returns:
+            list: List of mappings with order
+        """
+        lst_mappings = []
         for node in dag.vs:
             if node["type"] == VertexType.MAPPING.name:
                 dict_mapping = {key: node[key] for key in node.attribute_names()}
@@ -402,6 +505,55 @@ class DagReporting(DagGenerator):
         )
         return lst_mappings
 
+    def get_stage_report(self) -> dict:
+        """Report how the mappings are divided over run levels and stages.
+
+        Each stage is a serial step when the mappings are run in the mapping order, so fewer and
+        evenly sized stages mean a shorter load. The coloring of the stages is set with the
+        stage_coloring of the constructor.
+
+        Returns:
+            dict: The stage coloring, the number of mappings, run levels and stages, the number of
+            stages by number of mappings, the largest and average stage and for each run level the
+            sizes of its stages. Empty if there is no ETL flow.
+        """
+        try:
+            dag = self._get_dag_ETL_cached()
+        except NoFlowError:
+            logger.error("There are no mappings, so there are no stages to report!")
+            return {}
+        return self._get_stage_report(dag=dag)
+
+    def _get_stage_report(self, dag: ig.Graph) -> dict:
+        """Count the mappings per run level stage of the ETL DAG, see get_stage_report.
+
+        Args:
+            dag (ig.Graph): The ETL DAG
+
+        Returns:
+            dict: The report of the stages
+        """
+        sizes = Counter(
+            (vx["run_level"], vx["run_level_stage"])
+            for vx in dag.vs.select(type_eq=VertexType.MAPPING.name)
+        )
+        sizes_by_level = {}
+        for (run_level, stage), size in sorted(sizes.items()):
+            sizes_by_level.setdefault(run_level, []).append(size)
+        return {
+            "stage_coloring": self.stage_coloring.name,
+            "qty_mappings": sum(sizes.values()),
+            "qty_run_levels": len(sizes_by_level),
+            "qty_stages": len(sizes),
+            "stage_sizes": dict(sorted(Counter(sizes.values()).items())),
+            "max_stage_size": max(sizes.values(), default=0),
+            "avg_stage_size": sum(sizes.values()) / len(sizes) if sizes else 0.0,
+            "run_levels": [
+                {"RunLevel": run_level, "StageSizes": stage_sizes}
+                for run_level, stage_sizes in sizes_by_level.items()
+            ],
+        }
+
     def _dag_etl_coloring(self, dag: ig.Graph) -> ig.Graph:
         """Helper function to color nodes in the ETL DAG based on their type and model.
 
@@ -449,11 +601,284 @@ class DagReporting(DagGenerator):
         dag = self._dag_etl_coloring(dag=dag)
         return dag
 
-    def plot_etl_dag(self, file_html: str) -> None:
+    def set_mapping_costs(self, costs: MappingCosts) -> None:
+        """Set the estimated run times of the mappings, used for the critical path.
+
+        Args:
+            costs (MappingCosts): Estimated run times, mappings without run history get its default cost.
+
+        Returns:
+            None
+        """
+        self.mapping_costs = costs
+
+    def _get_mapping_costs(self, dag: ig.Graph) -> np.ndarray:
+        """Get the estimated run time of each vertex of the ETL DAG.
+
+        Args:
+            dag (ig.Graph): The ETL DAG
+
+        Returns:
+            np.ndarray: The estimated run time of each mapping, 0 for entities
+        """
+        costs = np.zeros(dag.vcount())
+        for vx in dag.vs.select(type_eq=VertexType.MAPPING.name):
+            file_RETW, code_mapping = self.get_mapping_ref(id_mapping=vx["name"])
+            costs[vx.index] = self.mapping_costs.get_cost(
+                file_RETW=file_RETW, code_mapping=code_mapping
+            )
+        return costs
+
+    def get_critical_path_report(self) -> dict:
+        """Estimate how long the ETL flow takes and which chain of mappings determines that.
+
+        The run times of the mappings are estimated with the mapping costs, see set_mapping_costs.
+        Two ways of running the flow are estimated:
+        * With barriers: the run levels and their stages run one after the other, a stage takes
+          as long as its slowest mapping.
+        * Dependency driven: each mapping starts as soon as the mappings loading its sources have
+          finished, which takes as long as the critical path.
+
+        Returns:
+            dict: The estimated run times of both ways of running, the mappings on the critical path
+            and for each mapping its cost, earliest and latest start and slack when dependency
+            driven. Empty if there is no ETL flow or it has cycles.
+        """
+        try:
+            dag = self._get_dag_ETL_cached()
+        except NoFlowError:
+            logger.error("There are no mappings, so there is no critical path!")
+            return {}
+        if not dag.is_dag():
+            logger.error("The ETL flow has cycles, so there is no critical path!")
+            return {}
+        costs = self._get_mapping_costs(dag=dag)
+        times = get_schedule_times(dag=dag, costs=costs)
+        is_critical = np.zeros(dag.vcount(), dtype=bool)
+        is_critical[times.critical_path] = True
+
+        lst_mappings = []
+        cost_stages = {}
+        for vx in dag.vs.select(type_eq=VertexType.MAPPING.name):
+            file_RETW, code_mapping = self.get_mapping_ref(id_mapping=vx["name"])
+            stage = (vx["run_level"], vx["run_level_stage"])
+            cost_stages[stage] = max(cost_stages.get(stage, 0.0), costs[vx.index])
+            lst_mappings.append(
+                {
+                    "FileRETW": file_RETW,
+                    "CodeMapping": code_mapping,
+                    "RunLevel": vx["run_level"],
+                    "RunLevelStage": vx["run_level_stage"],
+                    "Cost": float(costs[vx.index]),
+                    "EarliestStart": float(times.earliest_start[vx.index]),
+                    "LatestStart": float(times.latest_start[vx.index]),
+                    "Slack": float(times.latest_start[vx.index] - times.earliest_start[vx.index]),
+                    "Critical": bool(is_critical[vx.index]),
+                }
+            )
+        lst_mappings = sorted(
+            lst_mappings, key=lambda mapping: (mapping["EarliestStart"], mapping["RunLevel"])
+        )
+        return {
+            "makespan_barriers": float(sum(cost_stages.values())),
+            "makespan_dependencies": float(times.makespan),
+            "critical_path": [mapping for mapping in lst_mappings if mapping["Critical"]],
+            "mappings": lst_mappings,
+        }
+
+    def get_mapping_schedule(self, qty_slots: int) -> list:
+        """Schedule the mappings on a number of worker slots, as an alternative to the run levels and stages.
+
+        Instead of running the run levels and their stages one after the other, a mapping is started
+        as soon as a slot is free, the mappings loading its sources have finished and none of its
+        source entities is read by a running mapping, see schedule_list. The run times of the
+        mappings are estimated with the mapping costs, see set_mapping_costs.
+
+        Args:
+            qty_slots (int): Number of mappings the warehouse can run at the same time
+
+        Returns:
+            list: The mappings in the order they start, with their RunLevel and RunLevelStage, the
+            slot they run in and their estimated start and finish time. Empty if there is no ETL
+            flow or it has cycles.
+        """
+        try:
+            dag = self._get_dag_ETL_cached()
+        except NoFlowError:
+            logger.error("There are no mappings, so there are no mappings to schedule!")
+            return []
+        if not dag.is_dag():
+            logger.error("The ETL flow has cycles, so the mappings can't be scheduled!")
+            return []
+        is_mapping = np.array(dag.vs["type"]) == VertexType.MAPPING.name
+        costs = self._get_mapping_costs(dag=dag)
+        schedule = schedule_list(
+            dag=dag, is_mapping=is_mapping, costs=costs, qty_slots=qty_slots
+        )
+
+        lst_mappings = []
+        costs_stages = {}
+        for vx in dag.vs.select(type_eq=VertexType.MAPPING.name):
+            file_RETW, code_mapping = self.get_mapping_ref(id_mapping=vx["name"])
+            stage = (vx["run_level"], vx["run_level_stage"])
+            costs_stages.setdefault(stage, []).append(costs[vx.index])
+            lst_mappings.append(
+                {
+                    "FileRETW": file_RETW,
+                    "CodeMapping": code_mapping,
+                    "RunLevel": vx["run_level"],
+                    "RunLevelStage": vx["run_level_stage"],
+                    "Slot": int(schedule.slot[vx.index]),
+                    "Start": float(schedule.start[vx.index]),
+                    "Finish": float(schedule.finish[vx.index]),
+                }
+            )
+        makespan_barriers = get_barrier_makespan(
+            costs_stages=[costs_stages[stage] for stage in sorted(costs_stages)],
+            qty_slots=qty_slots,
+        )
+        logger.info(
+            f"Scheduled mappings on {qty_slots} slots, estimated run time {schedule.makespan:g}, "
+            f"with run level stages {makespan_barriers:g}"
+        )
+        return sorted(lst_mappings, key=lambda mapping: (mapping["Start"], mapping["Slot"]))
+
+    def _get_mapping_dependencies(self, dag: ig.Graph) -> tuple:
+        """Find for each mapping of the ETL DAG the mappings it waits for and the mappings it conflicts with.
+
+        Args:
+            dag (ig.Graph): The ETL DAG
+
+        Returns:
+            tuple: Two dicts by mapping vertex index with sorted lists of mapping vertex indices: the
+            mappings loading its sources and the other mappings reading one of its sources
+        """
+        predecessors = dag.get_adjlist(mode="in")
+        successors = dag.get_adjlist(mode="out")
+        mappings = dag.vs.select(type_eq=VertexType.MAPPING.name).indices
+        mappings_predecessor = {
+            mapping: sorted(
+                {pred for source in predecessors[mapping] for pred in predecessors[source]}
+            )
+            for mapping in mappings
+        }
+        mappings_conflict = {
+            mapping: sorted(
+                {succ for source in predecessors[mapping] for succ in successors[source]} - {mapping}
+            )
+            for mapping in mappings
+        }
+        return mappings_predecessor, mappings_conflict
+
+    def get_dependency_plan(self) -> dict:
+        """Export the dependencies between mappings, so an orchestrator can run without run level barriers.
+
+        Each mapping lists the mappings loading its sources, which must finish before it can start,
+        and the mappings reading one of its sources, which should not run at the same time. This is
+        all an orchestrator needs to start each mapping as soon as its own inputs are ready, instead
+        of waiting for a whole run level stage.
+
+        The parallelism profile counts the mappings that can run at once, taking a step of the same
+        length for each mapping:
+        * run_levels: the run levels and their stages run one after the other.
+        * dependencies: each mapping starts in the first step in which the mappings loading its
+          sources have finished and no conflicting mapping is started, see schedule_list.
+
+        Returns:
+            dict: The number of steps, maximum and average number of mappings per step for both ways
+            of running, and the mappings with their RunLevel, RunLevelStage, Predecessors and
+            Conflicts. Empty if there is no ETL flow or it has cycles.
+        """
+        try:
+            dag = self._get_dag_ETL_cached()
+        except NoFlowError:
+            logger.error("There are no mappings, so there is no dependency plan!")
+            return {}
+        if not dag.is_dag():
+            logger.error("The ETL flow has cycles, so there is no dependency plan!")
+            return {}
+        is_mapping = np.array(dag.vs["type"]) == VertexType.MAPPING.name
+        mappings_predecessor, mappings_conflict = self._get_mapping_dependencies(dag=dag)
+        schedule = schedule_list(
+            dag=dag,
+            is_mapping=is_mapping,
+            costs=is_mapping.astype(float),
+            qty_slots=max(int(is_mapping.sum()), 1),
+        )
+        steps_dependencies = Counter(schedule.start[is_mapping].tolist())
+        steps_barriers = Counter(
+            zip(
+                np.array(dag.vs["run_level"])[is_mapping].tolist(),
+                np.array(dag.vs["run_level_stage"])[is_mapping].tolist(),
+            )
+        )
+
+        refs = {}
+        for vx in dag.vs.select(type_eq=VertexType.MAPPING.name):
+            file_RETW, code_mapping = self.get_mapping_ref(id_mapping=vx["name"])
+            refs[vx.index] = {"FileRETW": file_RETW, "CodeMapping": code_mapping}
+        lst_mappings = [
+            refs[mapping]
+            | {
+                "RunLevel": dag.vs[mapping]["run_level"],
+                "RunLevelStage": dag.vs[mapping]["run_level_stage"],
+                "Predecessors": [refs[pred] for pred in mappings_predecessor[mapping]],
+                "Conflicts": [refs[other] for other in mappings_conflict[mapping]],
+            }
+            for mapping in refs
+        ]
+        lst_mappings = sorted(
+            lst_mappings,
+            key=lambda mapping: (mapping["RunLevel"], mapping["RunLevelStage"]),
+        )
+        return {
+            "parallelism": {
+                mode: {
+                    "qty_steps": len(steps),
+                    "max": max(steps.values(), default=0),
+                    "avg": len(lst_mappings) / len(steps) if steps else 0.0,
+                }
+                for mode, steps in (
+                    ("run_levels", steps_barriers),
+                    ("dependencies", steps_dependencies),
+                )
+            },
+            "mappings": lst_mappings,
+        }
+
+    def _format_critical_path(self, dag: ig.Graph) -> ig.Graph:
+        """Highlight the critical path in the ETL DAG and add the timing of the mappings to their tooltips.
+
+        Args:
+            dag (ig.Graph): The formatted ETL DAG
+
+        Returns:
+            ig.Graph: The ETL DAG with the critical path highlighted.
+        """
+        costs = self._get_mapping_costs(dag=dag)
+        times = get_schedule_times(dag=dag, costs=costs)
+        for vx in dag.vs.select(type_eq=VertexType.MAPPING.name):
+            slack = times.latest_start[vx.index] - times.earliest_start[vx.index]
+            vx["title"] = vx["title"] + (
+                f"Cost: {costs[vx.index]:g}\n"
+                f"Earliest start: {times.earliest_start[vx.index]:g}\n"
+                f"Slack: {slack:g}\n"
+            )
+        dag.vs.select(times.critical_path)["color"] = self.color_critical_path
+        edges = dag.get_eids(
+            pairs=list(zip(times.critical_path, times.critical_path[1:])), directed=True
+        )
+        dag.es.select(edges)["color"] = self.color_critical_path
+        dag.es.select(edges)["width"] = 3
+        return dag
+
+    def plot_etl_dag(self, file_html: str, show_critical_path: bool = False) -> None:
         """Create a html file with a graphical representation of the ETL DAG
 
         Args:
             file_html_out (str): file path that the result should be written to
+            show_critical_path (bool, optional): Whether to highlight the critical path and show the
+                estimated timing of mappings, see get_critical_path_report. Defaults to False.
         """
         try:
             dag = self.get_dag_ETL()
@@ -461,4 +886,6 @@ class DagReporting(DagGenerator):
             logger.error("There are no mappings, so there is no ETL flow to plot!")
             return
         dag = self._format_etl_dag(dag=dag)
+        if show_critical_path and dag.is_dag():
+            dag = self._format_critical_path(dag=dag)
         self.plot_graph_html(dag=dag, file_html=file_html)
@@ -0,0 +1,49 @@
+import igraph as ig
+import numpy as np
+
+from dag_reachability import get_reach_bits
+
+
+def count_ancestors(
+    dag: ig.Graph, is_counted: np.ndarray, size_block: int = 4096
+) -> np.ndarray:
+    """Count the counted vertices among each vertex and its ancestors in a DAG.
+
+    The counted vertices are propagated down the DAG as bitsets in a single topological pass, see
+    get_reach_bits. They are handled in blocks of size_block bits, which bounds the memory to
+    vertices * size_block / 8 bytes.
+
+    Args:
+        dag (ig.Graph): Directed acyclic graph
+        is_counted (np.ndarray): Boolean for each vertex, whether it is counted
+        size_block (int, optional): Number of counted vertices handled in one pass. Defaults to 4096.
+
+    Returns:
+        np.ndarray: For each vertex the number of counted vertices among itself and its ancestors
+    """
+    counts = np.zeros(dag.vcount(), dtype=np.int64)
+    idx_counted = np.flatnonzero(is_counted)
+    for start in range(0, len(idx_counted), size_block):
+        bits = get_reach_bits(dag=dag, sources=idx_counted[start : start + size_block])
+        counts += np.bitwise_count(bits).sum(axis=1, dtype=np.int64)
+    return counts
+
+
+def get_longest_path_counts(dag: ig.Graph, is_counted: np.ndarray) -> np.ndarray:
+    """Get the largest number of counted vertices on a path ending at each vertex of a DAG.
+
+    Args:
+        dag (ig.Graph): Directed acyclic graph
+        is_counted (np.ndarray): Boolean for each vertex, whether it is counted
+
+    Returns:
+        np.ndarray: For each vertex the largest number of counted vertices on a path to and
+        including the vertex
+    """
+    predecessors = dag.get_adjlist(mode="in")
+    is_counted = is_counted.tolist()
+    counts = [0] * dag.vcount()
+    for vertex in dag.topological_sorting(mode="out"):
+        count = max((counts[pred] for pred in predecessors[vertex]), default=0)
+        counts[vertex] = count + 1 if is_counted[vertex] else count
+    return np.array(counts, dtype=np.int64)
@@ -0,0 +1,107 @@
+import heapq
+from collections import Counter, namedtuple
+
+import igraph as ig
+import numpy as np
+
+from dag_critical_path import get_schedule_times
+
+Schedule = namedtuple("Schedule", ("start", "finish", "slot", "makespan"))
+
+
+def schedule_list(
+    dag: ig.Graph, is_mapping: np.ndarray, costs: np.ndarray, qty_slots: int
+) -> Schedule:
+    """Schedule the mappings of an ETL DAG on a number of worker slots.
+
+    List scheduling: whenever a slot is free, the waiting mapping with the longest remaining path
+    to the end of the flow is started, provided all mappings loading its sources have finished and
+    none of its source entities is read by a running mapping. The latter is the same constraint as
+    between mappings in a run level stage.
+
+    Args:
+        dag (ig.Graph): ETL DAG of entities and mappings
+        is_mapping (np.ndarray): Boolean for each vertex, whether it is a mapping
+        costs (np.ndarray): Run time of each vertex, 0 for entities
+        qty_slots (int): Number of mappings that can run at the same time
+
+    Raises:
+        ValueError: If there are no slots.
+
+    Returns:
+        Schedule: Start and finish time and slot of each vertex as np.ndarray, -1 for entities,
+        and the time the last mapping finishes
+    """
+    if qty_slots < 1:
+        raise ValueError("At least one worker slot is needed")
+    predecessors = dag.get_adjlist(mode="in")
+    successors = dag.get_adjlist(mode="out")
+    costs = np.asarray(costs, dtype=float).tolist()
+    # Mappings with the least slack to the end of the flow go first
+    priorities = get_schedule_times(dag=dag, costs=costs).latest_start.tolist()
+
+    mappings = np.flatnonzero(is_mapping).tolist()
+    successors_mapping = {
+        mapping: {succ for target in successors[mapping] for succ in successors[target]}
+        for mapping in mappings
+    }
+    qty_waiting = Counter(succ for succs in successors_mapping.values() for succ in succs)
+    ready = [(priorities[mapping], mapping) for mapping in mappings if not qty_waiting[mapping]]
+    heapq.heapify(ready)
+    running = []
+    slots_free = list(range(qty_slots))
+    entities_read = Counter()
+
+    start = np.full(dag.vcount(), -1.0)
+    finish = np.full(dag.vcount(), -1.0)
+    slot = np.full(dag.vcount(), -1, dtype=np.int64)
+    time = 0.0
+    while ready or running:
+        blocked = []
+        while ready and slots_free:
+            item = heapq.heappop(ready)
+            mapping = item[1]
+            if any(entities_read[source] for source in predecessors[mapping]):
+                blocked.append(item)
+                continue
+            slot[mapping] = heapq.heappop(slots_free)
+            start[mapping] = time
+            finish[mapping] = time + costs[mapping]
+            entities_read.update(predecessors[mapping])
+            heapq.heappush(running, (finish[mapping], slot[mapping], mapping))
+        for item in blocked:
+            heapq.heappush(ready, item)
+
+        # Advance to the next mapping that finishes
+        time = running[0][0]
+        while running and running[0][0] == time:
+            _, slot_free, mapping = heapq.heappop(running)
+            heapq.heappush(slots_free, slot_free)
+            entities_read.subtract(predecessors[mapping])
+            for succ in successors_mapping[mapping]:
+                qty_waiting[succ] -= 1
+                if not qty_waiting[succ]:
+                    heapq.heappush(ready, (priorities[succ], succ))
+    return Schedule(start=start, finish=finish, slot=slot, makespan=float(finish.max(initial=0.0)))
+
+
+def get_barrier_makespan(costs_stages: list, qty_slots: int) -> float:
+    """Determine how long running stages one after the other takes on a number of worker slots.
+
+    The mappings of a stage are assigned to slots longest first, each to the slot that is free
+    first; the next stage starts when all mappings of the stage have finished.
+
+    Args:
+        costs_stages (list): For each stage, in order, the run times of its mappings
+        qty_slots (int): Number of mappings that can run at the same time
+
+    Returns:
+        float: The time the last stage finishes
+    """
+    makespan = 0.0
+    for costs in costs_stages:
+        loads = [0.0] * min(qty_slots, len(costs))
+        for cost in sorted(costs, reverse=True):
+            heapq.heapreplace(loads, loads[0] + cost)
+        makespan += max(loads, default=0.0)
+    return float(makespan)
@@ -0,0 +1,500 @@
+from array import array
+from collections.abc import MutableMapping, Sequence
+from typing import Callable
+
+import numpy as np
+
+from dag_registry import IdRegistry
+
+
+def _to_array(values: np.ndarray) -> array:
+    """Convert a numpy array to a typed array of 32-bit integers.
+
+    Args:
+        values (np.ndarray): Integer values
+
+    Returns:
+        array: The values as a typed array
+    """
+    return array("i", values.astype(np.int32).tobytes())
+
+
+def _as_numpy(values: array) -> np.ndarray:
+    """Get a numpy view of a typed array of 32-bit integers.
+
+    Args:
+        values (array): Typed array
+
+    Returns:
+        np.ndarray: View of the values, which is invalid once the typed array grows
+    """
+    if not values:
+        return np.empty(0, dtype=np.int32)
+    return np.frombuffer(values, dtype=np.int32)
+
+
+class Column:
+    """A column of values, stored as integer codes into a list of the distinct values.
+
+    Repeated values, like vertex types, model codes, creators and dates, are stored once. The code
+    -1 marks rows without a value, which is different from a None value.
+    """
+
+    def __init__(self, qty_rows: int = 0):
+        """Initializes a new instance of the Column class.
+
+        Args:
+            qty_rows (int, optional): Number of rows without a value to start with. Defaults to 0.
+        """
+        self.codes = array("i", [-1]) * qty_rows
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value) -> int:
+        """Get the code of a value, adding it to the distinct values when it is new.
+
+        Args:
+            value: Hashable value
+
+        Returns:
+            int: Code of the value
+        """
+        # The type is part of the key, so values like True and 1 get different codes
+        key = (type(value), value)
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self._codes[key] = code
+            self.values.append(value)
+        return code
+
+    def take(self, rows: np.ndarray) -> list:
+        """Get the values of rows.
+
+        Args:
+            rows (np.ndarray): Row indices
+
+        Returns:
+            list: The values, None for rows without a value
+        """
+        # Filled one by one, so tuple values are not unpacked into the array
+        values = np.empty(len(self.values) + 1, dtype=object)
+        for code, value in enumerate(self.values):
+            values[code] = value
+        return values[_as_numpy(self.codes)[rows]].tolist()
+
+    def has_values(self, rows: np.ndarray) -> bool:
+        """Check whether any of the rows has a value.
+
+        Args:
+            rows (np.ndarray): Row indices
+
+        Returns:
+            bool: True if at least one of the rows has a value
+        """
+        return bool((_as_numpy(self.codes)[rows] >= 0).any())
+
+    def compact(self, keep: np.ndarray) -> None:
+        """Keep only some of the rows, discarding values that are no longer used.
+
+        Args:
+            keep (np.ndarray): Boolean mask of the rows to keep
+        """
+        codes = _as_numpy(self.codes)[keep]
+        used = np.unique(codes[codes >= 0])
+        # The last item maps the code -1 onto itself
+        recode = np.full(len(self.values) + 1, -1, dtype=np.int32)
+        recode[used] = np.arange(len(used), dtype=np.int32)
+        self.codes = _to_array(recode[codes])
+        self.values = [self.values[code] for code in used.tolist()]
+        self._codes = {(type(value), value): code for code, value in enumerate(self.values)}
+
+
+class VertexTable:
+    """Columnar storage of the information of vertices of one type.
+
+    The vertex IDs are kept in a typed array and each attribute in a Column. Rows of deleted
+    vertices are marked with the ID -1 and are removed when they make up half of the table, so
+    the rows stay in the order the vertices were added, like a dictionary.
+    """
+
+    def __init__(self):
+        """Initializes a new instance of the VertexTable class."""
+        self.ids = array("i")
+        self.columns = {}
+        self._rows = {}
+        self._qty_deleted = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, id_vertex: int) -> bool:
+        return id_vertex in self._rows
+
+    def rows(self) -> np.ndarray:
+        """Get the rows of the current vertices, in the order they were added.
+
+        Returns:
+            np.ndarray: Row indices
+        """
+        return np.flatnonzero(_as_numpy(self.ids) >= 0)
+
+    def get_ids(self, rows: np.ndarray = None) -> np.ndarray:
+        """Get the IDs of vertices.
+
+        Args:
+            rows (np.ndarray, optional): Row indices. Defaults to the rows of all current vertices.
+
+        Returns:
+            np.ndarray: The vertex IDs
+        """
+        ids = _as_numpy(self.ids)
+        return ids[ids >= 0] if rows is None else ids[rows]
+
+    def get(self, id_vertex: int) -> dict:
+        """Get the attributes of a vertex.
+
+        Args:
+            id_vertex (int): ID of the vertex
+
+        Raises:
+            KeyError: If the vertex is not in the table.
+
+        Returns:
+            dict: Attributes the vertex has a value for
+        """
+        row = self._rows[id_vertex]
+        vertex = {}
+        for name, column in self.columns.items():
+            code = column.codes[row]
+            if code >= 0:
+                vertex[name] = column.values[code]
+        return vertex
+
+    def get_value(self, id_vertex: int, name: str) -> object:
+        """Get the value of one attribute of a vertex.
+
+        Args:
+            id_vertex (int): ID of the vertex
+            name (str): Name of the attribute
+
+        Raises:
+            KeyError: If the vertex is not in the table.
+
+        Returns:
+            object: The value, None if the vertex has no value for the attribute
+        """
+        row = self._rows[id_vertex]
+        column = self.columns.get(name)
+        if column is None or column.codes[row] < 0:
+            return None
+        return column.values[column.codes[row]]
+
+    def put(self, id_vertex: int, vertex: dict) -> None:
+        """Add a vertex, or replace the attributes of a vertex that is already in the table.
+
+        Args:
+            id_vertex (int): ID of the vertex
+            vertex (dict): Attributes of the vertex
+        """
+        for name in vertex:
+            if name not in self.columns:
+                self.columns[name] = Column(qty_rows=len(self.ids))
+        row = self._rows.get(id_vertex)
+        if row is None:
+            self._rows[id_vertex] = len(self.ids)
+            self.ids.append(id_vertex)
+            for name, column in self.columns.items():
+                column.codes.append(column.encode(vertex[name]) if name in vertex else -1)
+            return
+        for name, column in self.columns.items():
+            column.codes[row] = column.encode(vertex[name]) if name in vertex else -1
+
+    def set_value(self, id_vertex: int, name: str, value) -> None:
+        """Set the value of one attribute of a vertex.
+
+        Args:
+            id_vertex (int): ID of the vertex
+            name (str): Name of the attribute
+            value: The new value
+        """
+        row = self._rows[id_vertex]
+        if name not in self.columns:
+            self.columns[name] = Column(qty_rows=len(self.ids))
+        column = self.columns[name]
+        column.codes[row] = column.encode(value)
+
+    def delete(self, id_vertex: int) -> None:
+        """Delete a vertex.
+
+        Args:
+            id_vertex (int): ID of the vertex
+
+        Raises:
+            KeyError: If the vertex is not in the table.
+        """
+        row = self._rows.pop(id_vertex)
+        self.ids[row] = -1
+        self._qty_deleted += 1
+        if 2 * self._qty_deleted > len(self.ids):
+            self._compact()
+
+    def clear(self) -> None:
+        """Delete all vertices."""
+        self.ids = array("i")
+        self.columns = {}
+        self._rows = {}
+        self._qty_deleted = 0
+
+    def take(self, name: str, rows: np.ndarray) -> list:
+        """Get the values of an attribute for rows.
+
+        Args:
+            name (str): Name of the attribute
+            rows (np.ndarray): Row indices
+
+        Returns:
+            list: The values, None for rows without a value
+        """
+        column = self.columns.get(name)
+        return [None] * len(rows) if column is None else column.take(rows)
+
+    def _compact(self) -> None:
+        """Remove the rows of deleted vertices."""
+        keep = _as_numpy(self.ids) >= 0
+        self.ids = _to_array(_as_numpy(self.ids)[keep])
+        for column in self.columns.values():
+            column.compact(keep)
+        self.columns = {
+            name: column for name, column in self.columns.items() if column.values
+        }
+        self._rows = {id_vertex: row for row, id_vertex in enumerate(self.ids)}
+        self._qty_deleted = 0
+
+
+class EdgeTable:
+    """Columnar storage of unique edges.
+
+    The endpoints are kept as vertex IDs in typed arrays, the other attributes each in a Column.
+    Edges are indexed on their source, target and type: adding an edge that is already stored
+    raises its weight, the number of times it was added, instead of storing a parallel edge.
+    The join types of the duplicates are collected in the edge's 'join_types', the other
+    attributes are those of the first edge.
+    """
+
+    def __init__(self):
+        """Initializes a new instance of the EdgeTable class."""
+        self.sources = array("i")
+        self.targets = array("i")
+        self.weights = array("i")
+        self.columns = {}
+        self._index = {}
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def get(self, row: int) -> dict:
+        """Get an edge.
+
+        Args:
+            row (int): Row index of the edge
+
+        Returns:
+            dict: The edge, with the vertex IDs of its endpoints under 'source' and 'target'
+            and the number of times it was added under 'weight'
+        """
+        edge = {"source": self.sources[row], "target": self.targets[row]}
+        for name, column in self.columns.items():
+            code = column.codes[row]
+            if code >= 0:
+                edge[name] = column.values[code]
+        edge["weight"] = self.weights[row]
+        return edge
+
+    def extend(self, edges: list) -> list:
+        """Add edges, merging edges with the same source, target and type.
+
+        Args:
+            edges (list): Edges, with the vertex IDs of their endpoints under 'source' and 'target'
+
+        Returns:
+            list: Rows of the edges that were not stored before
+        """
+        rows_new = []
+        for edge in edges:
+            key = (edge["source"], edge["target"], edge["type"])
+            row = self._index.get(key)
+            if row is not None:
+                self.weights[row] += 1
+                if "join_types" in edge:
+                    column = self.columns["join_types"]
+                    join_types = column.values[column.codes[row]] + edge["join_types"]
+                    column.codes[row] = column.encode(join_types)
+                continue
+            for name in edge:
+                if name not in self.columns and name not in ("source", "target"):
+                    self.columns[name] = Column(qty_rows=len(self.sources))
+            self._index[key] = len(self.sources)
+            rows_new.append(len(self.sources))
+            self.sources.append(edge["source"])
+            self.targets.append(edge["target"])
+            self.weights.append(1)
+            for name, column in self.columns.items():
+                column.codes.append(column.encode(edge[name]) if name in edge else -1)
+        return rows_new
+
+    def get_endpoints(self, rows: np.ndarray) -> np.ndarray:
+        """Get the vertex IDs of the endpoints of edges.
+
+        Args:
+            rows (np.ndarray): Row indices of the edges
+
+        Returns:
+            np.ndarray: Array with a row of source and target vertex ID for each edge
+        """
+        return np.column_stack((_as_numpy(self.sources)[rows], _as_numpy(self.targets)[rows]))
+
+    def get_weights(self, rows: np.ndarray) -> np.ndarray:
+        """Get the number of times edges were added.
+
+        Args:
+            rows (np.ndarray): Row indices of the edges
+
+        Returns:
+            np.ndarray: The weights of the edges
+        """
+        return _as_numpy(self.weights)[rows]
+
+    def get_rows(self, types: list = None) -> np.ndarray:
+        """Get the rows of edges, optionally only those of some types.
+
+        Args:
+            types (list, optional): Values of the 'type' attribute to select. Defaults to all edges.
+
+        Returns:
+            np.ndarray: Row indices of the edges, in the order they were added
+        """
+        if types is None:
+            return np.arange(len(self.sources))
+        column = self.columns.get("type")
+        if column is None:
+            return np.empty(0, dtype=np.int64)
+        codes = [code for code, value in enumerate(column.values) if value in types]
+        return np.flatnonzero(np.isin(_as_numpy(column.codes), codes))
+
+    def delete_incident(self, ids_vertex: set) -> None:
+        """Delete the edges from or to vertices.
+
+        Args:
+            ids_vertex (set): Vertex IDs
+        """
+        ids_vertex = np.fromiter(ids_vertex, dtype=np.int32, count=len(ids_vertex))
+        keep = ~(
+            np.isin(_as_numpy(self.sources), ids_vertex)
+            | np.isin(_as_numpy(self.targets), ids_vertex)
+        )
+        if keep.all():
+            return
+        self.sources = _to_array(_as_numpy(self.sources)[keep])
+        self.targets = _to_array(_as_numpy(self.targets)[keep])
+        self.weights = _to_array(_as_numpy(self.weights)[keep])
+        for column in self.columns.values():
+            column.compact(keep)
+        types = self.take("type", np.arange(len(self.sources)))
+        self._index = {
+            key: row for row, key in enumerate(zip(self.sources, self.targets, types))
+        }
+
+    def take(self, name: str, rows: np.ndarray) -> list:
+        """Get the values of an attribute for edges.
+
+        Args:
+            name (str): Name of the attribute
+            rows (np.ndarray): Row indices of the edges
+
+        Returns:
+            list: The values, None for edges without a value
+        """
+        column = self.columns.get(name)
+        return [None] * len(rows) if column is None else column.take(rows)
+
+
+class VertexView(MutableMapping):
+    """Dictionary of vertex information by vertex ID, backed by a VertexTable.
+
+    Each lookup builds the vertex information from the table's columns, with the vertex ID under
+    'name' and its stable digest under 'digest'. Changing a returned dictionary does not change the
+    table, assigning one does.
+    """
+
+    def __init__(self, table: VertexTable, registry: IdRegistry, on_change: Callable = None):
+        """Initializes a new instance of the VertexView class.
+
+        Args:
+            table (VertexTable): Table storing the vertices
+            registry (IdRegistry): Registry the vertex IDs and digests come from
+            on_change (Callable, optional): Function without arguments called after vertices are
+                assigned, deleted or cleared through the view. Defaults to none.
+        """
+        self.table = table
+        self._registry = registry
+        self._on_change = on_change
+
+    def __getitem__(self, id_vertex: int) -> dict:
+        return {
+            "name": id_vertex,
+            "digest": self._registry.get_digest(id_vertex),
+            **self.table.get(id_vertex),
+        }
+
+    def __setitem__(self, id_vertex: int, vertex: dict) -> None:
+        self.table.put(
+            id_vertex,
+            {key: value for key, value in vertex.items() if key not in ("name", "digest")},
+        )
+        self._changed()
+
+    def __delitem__(self, id_vertex: int) -> None:
+        self.table.delete(id_vertex)
+        self._changed()
+
+    def __iter__(self):
+        return iter(self.table.get_ids().tolist())
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __contains__(self, id_vertex) -> bool:
+        return id_vertex in self.table
+
+    def clear(self) -> None:
+        self.table.clear()
+        self._changed()
+
+    def _changed(self) -> None:
+        if self._on_change is not None:
+            self._on_change()
+
+
+class EdgeView(Sequence):
+    """Read-only list of edges, backed by an EdgeTable."""
+
+    def __init__(self, table: EdgeTable):
+        """Initializes a new instance of the EdgeView class.
+
+        Args:
+            table (EdgeTable): Table storing the edges
+        """
+        self.table = table
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.table.get(row) for row in range(len(self.table))[index]]
+        if index < 0:
+            index += len(self.table)
+        if not 0 <= index < len(self.table):
+            raise IndexError("edge index out of range")
+        return self.table.get(index)
+
+    def __len__(self) -> int:
+        return len(self.table)
@@ -0,0 +1,395 @@
+import asyncio
+import inspect
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from enum import Enum, auto
+
+import igraph as ig
+
+from dag_generator import DagGenerator, MappingRef, VertexType
+from logtools import get_logger
+
+logger = get_logger(__name__)
+
+
+class PoolType(Enum):
+    """Enumerates the worker pools mappings can be run on.
+
+    THREADS: A pool of threads, backends are called in the worker threads.
+    ASYNCIO: An asyncio event loop, coroutine backends are awaited, other backends are called in a thread.
+    """
+
+    THREADS = auto()
+    ASYNCIO = auto()
+
+
+class RunStatus(Enum):
+    """Enumerates the outcomes of running a mapping.
+
+    DONE: The mapping ran successfully.
+    FAILED: The backend raised an error.
+    SKIPPED: Not run, because a mapping upstream of it failed.
+    BLOCKED: Not run, because it is on or downstream of a cycle, so its sources are never loaded.
+    """
+
+    DONE = auto()
+    FAILED = auto()
+    SKIPPED = auto()
+    BLOCKED = auto()
+
+
+class NoOpBackend:
+    """Backend that runs nothing, for testing the executor and measuring its overhead."""
+
+    def __init__(self, seconds: float = 0.0):
+        """Initializes a new instance of the NoOpBackend class.
+
+        Args:
+            seconds (float, optional): Time each mapping takes, to simulate a load. Defaults to 0.
+        """
+        self.seconds = seconds
+
+    def run(self, mapping: MappingRef) -> None:
+        """Pretend to run a mapping.
+
+        Args:
+            mapping (MappingRef): The mapping
+
+        Returns:
+            None
+        """
+        if self.seconds:
+            time.sleep(self.seconds)
+
+
+class CallableBackend:
+    """Backend that runs mappings by calling a function, or awaiting a coroutine function, with the mapping."""
+
+    def __init__(self, function):
+        """Initializes a new instance of the CallableBackend class.
+
+        Args:
+            function: Function or coroutine function with a MappingRef as argument, that raises an
+                exception when the mapping fails
+        """
+        self.function = function
+        if inspect.iscoroutinefunction(function):
+            self.run = self._run_async
+
+    def run(self, mapping: MappingRef) -> None:
+        """Run a mapping.
+
+        Args:
+            mapping (MappingRef): The mapping
+
+        Returns:
+            None
+        """
+        self.function(mapping)
+
+    async def _run_async(self, mapping: MappingRef) -> None:
+        """Run a mapping with a coroutine function."""
+        await self.function(mapping)
+
+
+class DuckDBBackend:
+    """Backend that runs an SQL statement for each mapping on a local DuckDB database.
+
+    Each run uses its own cursor, so mappings can run in several threads on the same database.
+    Requires the duckdb package.
+    """
+
+    def __init__(self, statements, database: str = ":memory:"):
+        """Initializes a new instance of the DuckDBBackend class.
+
+        Args:
+            statements: Dictionary with the SQL statement by MappingRef, or a function with a
+                MappingRef as argument that returns the statement. Mappings without a statement
+                are not run.
+            database (str, optional): Path of the database file. Defaults to an in-memory database.
+        """
+        import duckdb
+
+        self.statements = statements
+        self.connection = duckdb.connect(database)
+
+    def run(self, mapping: MappingRef) -> None:
+        """Run the SQL statement of a mapping.
+
+        Args:
+            mapping (MappingRef): The mapping
+
+        Returns:
+            None
+        """
+        if callable(self.statements):
+            statement = self.statements(mapping)
+        else:
+            statement = self.statements.get(mapping)
+        if statement is None:
+            return
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+class _RunState:
+    """Bookkeeping of a run: which mappings can start, and which are running, done or skipped.
+
+    A mapping can start when the mappings loading its sources are done and none of its source
+    entities is read by a running mapping. When a mapping fails, the mappings downstream of it are skipped.
+    """
+
+    def __init__(self, dag: ig.Graph):
+        self.dag = dag
+        self.predecessors = dag.get_adjlist(mode="in")
+        successors = dag.get_adjlist(mode="out")
+        self.mappings = dag.vs.select(type_eq=VertexType.MAPPING.name).indices
+        self.successors = {
+            mapping: {succ for target in successors[mapping] for succ in successors[target]}
+            for mapping in self.mappings
+        }
+        self.qty_waiting = dict.fromkeys(self.mappings, 0)
+        for succs in self.successors.values():
+            for succ in succs:
+                self.qty_waiting[succ] += 1
+        # Mappings are started in the order of their run level and stage
+        self.priorities = {
+            mapping: (dag.vs[mapping]["run_level"], dag.vs[mapping]["run_level_stage"], mapping)
+            for mapping in self.mappings
+        }
+        self.ready = {mapping for mapping in self.mappings if not self.qty_waiting[mapping]}
+        self.running = set()
+        self.entities_read = set()
+        self.status = {}
+
+    def get_startable(self, qty_max: int) -> list:
+        """Take the mappings that can start now, at most qty_max, and mark them as running."""
+        startable = []
+        for mapping in sorted(self.ready, key=self.priorities.get):
+            if len(startable) == qty_max:
+                break
+            sources = set(self.predecessors[mapping])
+            if sources & self.entities_read:
+                continue
+            startable.append(mapping)
+            self.entities_read |= sources
+        self.ready.difference_update(startable)
+        self.running.update(startable)
+        return startable
+
+    def finish(self, mapping: int, is_done: bool) -> None:
+        """Register that a running mapping finished, making its successors ready or skipping them."""
+        self.running.discard(mapping)
+        self.entities_read -= set(self.predecessors[mapping])
+        self.status[mapping] = RunStatus.DONE if is_done else RunStatus.FAILED
+        if not is_done:
+            self._skip_successors(mapping)
+            return
+        for succ in self.successors[mapping]:
+            self.qty_waiting[succ] -= 1
+            if not self.qty_waiting[succ] and succ not in self.status:
+                self.ready.add(succ)
+
+    def _skip_successors(self, mapping: int) -> None:
+        """Skip all mappings downstream of a failed mapping."""
+        for vertex in self.dag.subcomponent(mapping, mode="out"):
+            if vertex in self.qty_waiting and vertex not in self.status:
+                self.status[vertex] = RunStatus.SKIPPED
+                self.ready.discard(vertex)
+
+    def is_finished(self) -> bool:
+        return not self.ready and not self.running
+
+
+class EtlExecutor:
+    """Runs the mappings of an ETL flow locally, each as soon as its sources are loaded.
+
+    Unlike running the run levels one after the other, a mapping starts when the mappings loading its
+    sources are done, a worker is free and none of its source entities is read by a running mapping,
+    the constraint between mappings in a run level stage. The mappings are run by a backend, an
+    object with a method run that takes a MappingRef and raises an exception when the mapping fails.
+    The start and finish time of each mapping are captured, to measure the parallelism reached.
+    """
+
+    def __init__(
+        self, backend, max_workers: int = 4, pool_type: PoolType = PoolType.THREADS
+    ):
+        """Initializes a new instance of the EtlExecutor class.
+
+        Args:
+            backend: Backend that runs a mapping, like NoOpBackend, CallableBackend or DuckDBBackend
+            max_workers (int, optional): Maximum number of mappings running at the same time. Defaults to 4.
+            pool_type (PoolType, optional): Worker pool the mappings run on. Defaults to threads.
+
+        Raises:
+            ValueError: If there are no workers.
+        """
+        if max_workers < 1:
+            raise ValueError("At least one worker is needed")
+        self.backend = backend
+        self.max_workers = max_workers
+        self.pool_type = pool_type
+
+    def run(self, dag_generator: DagGenerator) -> dict:
+        """Run the mappings of the ETL flow of the RETW files added to a DagGenerator.
+
+        Args:
+            dag_generator (DagGenerator): Generator with the RETW files of the flow
+
+        When the flow has cycles, the mappings on or downstream of a cycle can't start, because
+        they wait for each other; they get the status BLOCKED and the other mappings are run.
+
+        Raises:
+            NoFlowError: If there are no mappings.
+            CycleError: If the flow has cycles and the generator fails on cycles.
+
+        Returns:
+            dict: The wall clock time of the run, the total time of the mappings and their ratio,
+            the average number of mappings running, and for each mapping its run level, run
+            level stage, status, start, finish and duration in seconds since the start of the run
+        """
+        dag = dag_generator.get_dag_ETL()
+        if not dag.is_dag():
+            logger.warning("The ETL flow has cycles, mappings on or downstream of them are blocked")
+        state = _RunState(dag=dag)
+        times = {}
+        errors = {}
+        start = time.perf_counter()
+        if self.pool_type == PoolType.ASYNCIO:
+            asyncio.run(self._run_async(dag_generator, dag, state, times, errors))
+        else:
+            self._run_threads(dag_generator, dag, state, times, errors)
+        seconds = time.perf_counter() - start
+
+        lst_mappings = []
+        for mapping in state.mappings:
+            start_mapping, finish_mapping = times.get(mapping, (None, None))
+            ref = dag_generator.get_mapping_ref(id_mapping=dag.vs[mapping]["name"])
+            lst_mappings.append(
+                {
+                    "FileRETW": ref.FileRETW,
+                    "CodeMapping": ref.CodeMapping,
+                    "RunLevel": dag.vs[mapping]["run_level"],
+                    "RunLevelStage": dag.vs[mapping]["run_level_stage"],
+                    "Status": state.status.get(mapping, RunStatus.BLOCKED).name,
+                    "Start": start_mapping,
+                    "Finish": finish_mapping,
+                    "Seconds": (
+                        None if start_mapping is None else finish_mapping - start_mapping
+                    ),
+                    "Error": errors.get(mapping),
+                }
+            )
+        lst_mappings = sorted(
+            lst_mappings, key=lambda mapping: (mapping["Start"] is None, mapping["Start"] or 0)
+        )
+        seconds_mappings = sum(mapping["Seconds"] or 0 for mapping in lst_mappings)
+        qty_by_status = Counter(mapping["Status"] for mapping in lst_mappings)
+        report = {
+            "seconds": seconds,
+            "seconds_mappings": seconds_mappings,
+            "parallelism": seconds_mappings / seconds if seconds else 0.0,
+            **{f"qty_{status.name.lower()}": qty_by_status[status.name] for status in RunStatus},
+            "mappings": lst_mappings,
+        }
+        logger.info(
+            f"Ran {report['qty_done']} mappings in {seconds:.3f}s with {self.max_workers} workers, "
+            f"parallelism {report['parallelism']:.2f}, {report['qty_failed']} failed, "
+            f"{report['qty_skipped']} skipped, {report['qty_blocked']} blocked"
+        )
+        return report
+
+    def _run_mapping(self, ref: MappingRef, start_run: float) -> tuple:
+        """Run a mapping with the backend, in a worker thread.
+
+        A backend that returns a coroutine, like a CallableBackend with a coroutine function, is run
+        to completion in the worker thread with its own event loop.
+
+        Returns:
+            tuple: Start and finish time since the start of the run, and the error if the mapping failed
+        """
+        start = time.perf_counter() - start_run
+        try:
+            result = self.backend.run(ref)
+            if inspect.iscoroutine(result):
+                asyncio.run(result)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return start, time.perf_counter() - start_run, error
+
+    def _finish_mapping(
+        self,
+        mapping: int,
+        result: tuple,
+        state: _RunState,
+        times: dict,
+        errors: dict,
+        ref: MappingRef,
+    ) -> None:
+        """Register the result of a mapping run."""
+        start, finish, error = result
+        times[mapping] = (start, finish)
+        if error is not None:
+            errors[mapping] = error
+            logger.error(f"Mapping '{ref.CodeMapping}' of '{ref.FileRETW}' failed: {error}")
+        state.finish(mapping=mapping, is_done=error is None)
+
+    def _run_threads(
+        self,
+        dag_generator: DagGenerator,
+        dag: ig.Graph,
+        state: _RunState,
+        times: dict,
+        errors: dict,
+    ) -> None:
+        """Run the mappings on a thread pool."""
+        start_run = time.perf_counter()
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while not state.is_finished():
+                for mapping in state.get_startable(qty_max=self.max_workers - len(futures)):
+                    ref = dag_generator.get_mapping_ref(id_mapping=dag.vs[mapping]["name"])
+                    future = pool.submit(self._run_mapping, ref, start_run)
+                    futures[future] = (mapping, ref)
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    mapping, ref = futures.pop(future)
+                    self._finish_mapping(mapping, future.result(), state, times, errors, ref)
+
+    async def _run_async(
+        self,
+        dag_generator: DagGenerator,
+        dag: ig.Graph,
+        state: _RunState,
+        times: dict,
+        errors: dict,
+    ) -> None:
+        """Run the mappings as asyncio tasks."""
+        start_run = time.perf_counter()
+        is_coroutine = inspect.iscoroutinefunction(self.backend.run)
+
+        async def run_mapping(ref: MappingRef) -> tuple:
+            if not is_coroutine:
+                return await asyncio.to_thread(self._run_mapping, ref, start_run)
+            start = time.perf_counter() - start_run
+            try:
+                await self.backend.run(ref)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            return start, time.perf_counter() - start_run, error
+
+        tasks = {}
+        while not state.is_finished():
+            for mapping in state.get_startable(qty_max=self.max_workers - len(tasks)):
+                ref = dag_generator.get_mapping_ref(id_mapping=dag.vs[mapping]["name"])
+                tasks[asyncio.create_task(run_mapping(ref))] = (mapping, ref)
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                mapping, ref = tasks.pop(task)
+                self._finish_mapping(mapping, task.result(), state, times, errors, ref)
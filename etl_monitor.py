@@ -0,0 +1,277 @@
+import json
+from enum import Enum, auto
+from typing import Callable, Iterable
+
+from dag_generator import MappingRef, VertexType
+from dag_reporting import DagReporting
+from logtools import get_logger
+
+logger = get_logger(__name__)
+
+
+class MappingState(Enum):
+    """Enumerates the states of a mapping during a run followed by a RunMonitor.
+
+    WAITING: Not all mappings loading its sources have succeeded yet.
+    RUNNABLE: All mappings loading its sources have succeeded, but it hasn't started.
+    RUNNING: Started, but not finished.
+    DONE: Succeeded.
+    FAILED: Failed.
+    BLOCKED: A mapping upstream of it failed, so it can't run until that one succeeds.
+    """
+
+    WAITING = auto()
+    RUNNABLE = auto()
+    RUNNING = auto()
+    DONE = auto()
+    FAILED = auto()
+    BLOCKED = auto()
+
+
+# States set by the 'Status' of an event
+_STATES_EVENT = {
+    "started": MappingState.RUNNING,
+    "succeeded": MappingState.DONE,
+    "failed": MappingState.FAILED,
+}
+
+
+class RunMonitor:
+    """Follows a run of the ETL flow from a stream of mapping status events.
+
+    Each event is a dict with the 'FileRETW' and 'CodeMapping' of a mapping, its 'Status', which is
+    'started', 'succeeded' or 'failed', and optionally the 'Time' of the event. Events can be read
+    from a JSONL file (read_file), a pipe or other stream of JSONL lines (read_events), or passed one
+    by one (process_event, which can be used as a callback).
+
+    The ETL DAG is built once, when the monitor is created. For each mapping the monitor counts the
+    mappings loading its sources that haven't succeeded and the ones that failed or are blocked, so
+    an event only updates the mappings whose state changes and their successors. A mapping that
+    failed and succeeds on a retry unblocks the mappings downstream of it. In flows with cycles the
+    mappings on a cycle wait on each other, so they never become runnable.
+    """
+
+    def __init__(self, dag_generator: DagReporting):
+        """Initializes a new instance of the RunMonitor class.
+
+        Args:
+            dag_generator (DagReporting): Generator with the RETW files of the flow, its mapping
+                costs are used to estimate the remaining work
+
+        Raises:
+            NoFlowError: If there are no mappings.
+            CycleError: If the flow has cycles and the generator fails on cycles.
+        """
+        self.dag_generator = dag_generator
+        dag = dag_generator.get_dag_ETL()
+        successors = dag.get_adjlist(mode="out")
+        mappings = dag.vs.select(type_eq=VertexType.MAPPING.name).indices
+        costs = dag_generator._get_mapping_costs(dag=dag)
+        self._vertices = {dag.vs[mapping]["name"]: mapping for mapping in mappings}
+        self._successors = {
+            mapping: {succ for target in successors[mapping] for succ in successors[target]}
+            for mapping in mappings
+        }
+        self._nodes = {}
+        for mapping in mappings:
+            ref = dag_generator.get_mapping_ref(id_mapping=dag.vs[mapping]["name"])
+            self._nodes[mapping] = {
+                "FileRETW": ref.FileRETW,
+                "CodeMapping": ref.CodeMapping,
+                "RunLevel": dag.vs[mapping]["run_level"],
+                "RunLevelStage": dag.vs[mapping]["run_level_stage"],
+                "Seconds": float(costs[mapping]),
+            }
+        # Mappings loading its sources that haven't succeeded, and that failed or are blocked
+        self._qty_waiting = dict.fromkeys(mappings, 0)
+        self._qty_failed = dict.fromkeys(mappings, 0)
+        for succs in self._successors.values():
+            for succ in succs:
+                self._qty_waiting[succ] += 1
+        # Last status reported by an event
+        self._status = {}
+        self._state = {}
+        self._mappings = {state: set() for state in MappingState}
+        for mapping in mappings:
+            self._update_state(mapping)
+        self.qty_events = 0
+        self.time_last_event = None
+
+    def process_event(self, event: dict) -> None:
+        """Process a status event of a mapping, updating the states of the mappings.
+
+        Events that are not a dict, of unknown mappings or with an unknown status are logged and
+        ignored.
+
+        Args:
+            event (dict): The 'FileRETW', 'CodeMapping' and 'Status' of a mapping, and optionally the
+                'Time' of the event
+
+        Returns:
+            None
+        """
+        if not isinstance(event, dict):
+            logger.error(f"Event {event} is not an object")
+            return
+        state = _STATES_EVENT.get(str(event.get("Status", "")).lower())
+        if state is None:
+            logger.error(f"Unknown status '{event.get('Status')}' of event {event}")
+            return
+        mapping_ref = MappingRef(event.get("FileRETW"), event.get("CodeMapping"))
+        try:
+            mapping = self._vertices[self.dag_generator.get_mapping_id(mapping_ref)]
+        except (KeyError, TypeError):
+            file_RETW, code_mapping = mapping_ref
+            logger.error(f"Can't find mapping '{code_mapping}' of '{file_RETW}' in ETL flow!")
+            return
+        self.qty_events += 1
+        self.time_last_event = event.get("Time", self.time_last_event)
+        self._set_status(mapping=mapping, status=state)
+
+    def read_events(self, lines: Iterable[str], callback: Callable = None) -> int:
+        """Process the events of a stream of JSONL lines as they come in, like a pipe or sys.stdin.
+
+        Empty lines are skipped, lines that are not valid JSON are logged and skipped.
+
+        Args:
+            lines (Iterable[str]): Lines with a JSON event each, see process_event
+            callback (Callable, optional): Function called with the monitor after each event, for
+                example to report the progress. Defaults to none.
+
+        Returns:
+            int: Number of lines with an event
+        """
+        qty_lines = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                logger.error(f"Can't read event from line '{line.strip()}'")
+                continue
+            qty_lines += 1
+            self.process_event(event)
+            if callback is not None:
+                callback(self)
+        return qty_lines
+
+    def read_file(self, file_jsonl: str, callback: Callable = None) -> None:
+        """Process the events of a JSONL file, see read_events.
+
+        Args:
+            file_jsonl (str): Path of a file with a JSON event on each line
+            callback (Callable, optional): Function called with the monitor after each event.
+                Defaults to none.
+
+        Returns:
+            None
+        """
+        with open(file_jsonl, encoding="utf-8") as file:
+            qty_lines = self.read_events(lines=file, callback=callback)
+        logger.info(f"Read {qty_lines} events from '{file_jsonl}'")
+
+    def get_mappings(self, state: MappingState) -> list:
+        """Get the mappings that are currently in a state.
+
+        Args:
+            state (MappingState): State of the mappings
+
+        Returns:
+            list: MappingRef tuples of the mappings
+        """
+        return [
+            MappingRef(self._nodes[mapping]["FileRETW"], self._nodes[mapping]["CodeMapping"])
+            for mapping in sorted(self._mappings[state])
+        ]
+
+    def get_report_status(self) -> dict:
+        """Report the current fallout of failures and the work remaining in the run.
+
+        Returns:
+            dict: The number of events processed and the time of the last event, the number of
+            mappings in each state, the estimated seconds of the mappings still to run, the fallout:
+            the failed and blocked mappings, and the remaining work: the running, runnable and
+            waiting mappings, each with its State, RunLevel, RunLevelStage and estimated Seconds
+        """
+        states_fallout = (MappingState.FAILED, MappingState.BLOCKED)
+        states_remaining = (MappingState.RUNNING, MappingState.RUNNABLE, MappingState.WAITING)
+        remaining = self._get_nodes(states=states_remaining)
+        return {
+            "qty_events": self.qty_events,
+            "time_last_event": self.time_last_event,
+            **{f"qty_{state.name.lower()}": len(self._mappings[state]) for state in MappingState},
+            "seconds_remaining": sum(node["Seconds"] for node in remaining),
+            "fallout": self._get_nodes(states=states_fallout),
+            "remaining": remaining,
+        }
+
+    def _get_nodes(self, states: tuple) -> list:
+        """Get the report nodes of the mappings in some states, in run order."""
+        lst_nodes = [
+            {**self._nodes[mapping], "State": state.name}
+            for state in states
+            for mapping in self._mappings[state]
+        ]
+        return sorted(
+            lst_nodes,
+            key=lambda node: (
+                node["RunLevel"],
+                node["RunLevelStage"],
+                node["FileRETW"],
+                node["CodeMapping"],
+            ),
+        )
+
+    def _is_failed(self, mapping: int) -> bool:
+        return self._state[mapping] in (MappingState.FAILED, MappingState.BLOCKED)
+
+    def _is_done(self, mapping: int) -> bool:
+        return self._state[mapping] == MappingState.DONE
+
+    def _update_state(self, mapping: int) -> None:
+        """Determine the state of a mapping from its status and counters, and move it to its set."""
+        state = self._status.get(mapping)
+        if state is None:
+            if self._qty_failed[mapping]:
+                state = MappingState.BLOCKED
+            elif self._qty_waiting[mapping]:
+                state = MappingState.WAITING
+            else:
+                state = MappingState.RUNNABLE
+        state_old = self._state.get(mapping)
+        if state_old is not None:
+            self._mappings[state_old].discard(mapping)
+        self._mappings[state].add(mapping)
+        self._state[mapping] = state
+
+    def _set_status(self, mapping: int, status: MappingState) -> None:
+        """Set the status of a mapping and update the counters and states of the mappings downstream.
+
+        Only mappings of which it changes whether they are done or failed/blocked affect their
+        successors, so the update stops at the mappings whose state doesn't change in that respect.
+        """
+        changes = []
+        self._update_status(mapping=mapping, status=status, changes=changes)
+        while changes:
+            vertex, was_done, was_failed, is_done, is_failed = changes.pop()
+            if is_done == was_done and is_failed == was_failed:
+                continue
+            for succ in self._successors[vertex]:
+                self._qty_waiting[succ] += was_done - is_done
+                self._qty_failed[succ] += is_failed - was_failed
+                self._update_status(mapping=succ, status=self._status.get(succ), changes=changes)
+
+    def _update_status(self, mapping: int, status: MappingState, changes: list) -> None:
+        """Update the state of a mapping, and record whether it was and is done and failed/blocked.
+
+        The change is recorded as it is at the time of the update, because a mapping can change more
+        than once during a single event.
+        """
+        was_done, was_failed = self._is_done(mapping), self._is_failed(mapping)
+        if status is not None:
+            self._status[mapping] = status
+        self._update_state(mapping)
+        changes.append(
+            (mapping, was_done, was_failed, self._is_done(mapping), self._is_failed(mapping))
+        )
@@ -2,7 +2,11 @@ import json
 
 from dag_etl_failure import EtlFailure
 from dag_reporting import DagReporting, EntityRef
+from etl_executor import EtlExecutor, NoOpBackend
+from etl_monitor import RunMonitor
 from logtools import get_logger, issue_tracker
+from mapping_costs import MappingCosts
+from retw_cache import RetwCache
 
 logger = get_logger(__name__)
 
@@ -16,7 +20,9 @@ if __name__ == "__main__":
         "output/Usecase_Test_BOK.json",
         "output/DMS_LDM_AZURE_SL.json",
     ]
-    dag = DagReporting()
+    # Records extracted from RETW files are cached, so unchanged files are not parsed again
+    cache = RetwCache()
+    dag = DagReporting(cache=cache)
     dag.add_RETW_files(files_RETW=lst_files_RETW)
 
     """File dependencies
@@ -38,22 +44,59 @@ if __name__ == "__main__":
         file_html=f"{dir_output}file_dependencies.html", include_entities=True
     )
     # Entities which are used in mappings, but are not defined in a Power Designer document
-    lst_entities = dag.get_entities_without_definition()
-    with open(f"{dir_output}entities_not_defined.jsonl", "w", encoding="utf-8") as file:
-        for item in lst_entities:
-            file.write(json.dumps(item) + "\n")
+    dag.write_entities_without_definition(file_jsonl=f"{dir_output}entities_not_defined.jsonl")
 
     """ETL Flow (DAG)
     * Determine the ordering of the mappings in an ETL flow
     * Visualizes the ETL flow for all RETW files combined
+    * Estimates the run time of the ETL flow and its critical path
     """
     # Determine the ordering of the mappings in an ETL flow: a list of mapping dictionaries with their RunLevel and RunLevelStage
     lst_mapping_order = dag.get_mapping_order()
     with open(f"{dir_output}mapping_order.jsonl", "w", encoding="utf-8") as file:
         for item in lst_mapping_order:
             file.write(json.dumps(item) + "\n")
+    # Number and sizes of the run level stages, which depend on the stage_coloring of the DagReporting
+    with open(f"{dir_output}stage_report.json", "w", encoding="utf-8") as file:
+        json.dump(dag.get_stage_report(), file, indent=4)
+    # Dependencies between mappings, for an orchestrator that runs without run level barriers
+    with open(f"{dir_output}dependency_plan.json", "w", encoding="utf-8") as file:
+        json.dump(dag.get_dependency_plan(), file, indent=4)
     # Visualization of the ETL flow for all RETW files combined
     dag.plot_etl_dag(file_html=f"{dir_output}ETL_flow.html")
+    # Estimated run time and critical path of the ETL flow, run times of earlier runs can be read
+    # from a CSV or JSON file with costs.read; mappings without run times get the default cost
+    costs = MappingCosts(cost_default=60)
+    dag.set_mapping_costs(costs=costs)
+    with open(f"{dir_output}critical_path.json", "w", encoding="utf-8") as file:
+        json.dump(dag.get_critical_path_report(), file, indent=4)
+    dag.plot_etl_dag(
+        file_html=f"{dir_output}ETL_flow_critical_path.html", show_critical_path=True
+    )
+
+    """Local execution
+    * Runs the mappings as soon as their sources are loaded, here with a backend that runs nothing
+    """
+    executor = EtlExecutor(backend=NoOpBackend(), max_workers=4)
+    report_run = executor.run(dag_generator=dag)
+    with open(f"{dir_output}mapping_runs.json", "w", encoding="utf-8") as file:
+        json.dump(report_run, file, indent=4)
+
+    """Live run monitoring
+    * Follows a run from its mapping status events, here the first half of the local run with its
+      first mapping failing, and reports the fallout and remaining work at that moment
+    """
+    lst_runs = report_run["mappings"][: len(report_run["mappings"]) // 2]
+    with open(f"{dir_output}mapping_events.jsonl", "w", encoding="utf-8") as file:
+        for i, run in enumerate(lst_runs):
+            ref = {"FileRETW": run["FileRETW"], "CodeMapping": run["CodeMapping"]}
+            file.write(json.dumps({**ref, "Status": "started", "Time": run["Start"]}) + "\n")
+            status = "failed" if i == 0 else "succeeded"
+            file.write(json.dumps({**ref, "Status": status, "Time": run["Finish"]}) + "\n")
+    monitor = RunMonitor(dag_generator=dag)
+    monitor.read_file(file_jsonl=f"{dir_output}mapping_events.jsonl")
+    with open(f"{dir_output}mapping_status.json", "w", encoding="utf-8") as file:
+        json.dump(monitor.get_report_status(), file, indent=4)
 
     """Failure simulation
     * Sets a failed object status
@@ -63,7 +106,7 @@ if __name__ == "__main__":
         EntityRef("Da_Central_CL", "AggrLastStatus"),
         EntityRef("Da_Central_BOK", "AggrLastStatus"),
     ]  # Set for other examples
-    etl_simulator = EtlFailure()
+    etl_simulator = EtlFailure(cache=cache)
     # Adding RETW files to generate complete ETL DAG
     etl_simulator.add_RETW_files(files_RETW=lst_files_RETW)
     # Set failed node
@@ -72,5 +115,22 @@ if __name__ == "__main__":
     lst_mapping_order = etl_simulator.get_report_fallout()
     with open(f"{dir_output}dag_run_fallout.json", "w", encoding="utf-8") as file:
         json.dump(lst_mapping_order, file, indent=4)
+    # Report which failures reach each affected component, their overlaps and unique blast radius
+    with open(f"{dir_output}dag_run_propagation.json", "w", encoding="utf-8") as file:
+        json.dump(etl_simulator.get_report_propagation(), file, indent=4)
+    # Expected number of mappings that can't run when mappings and source entities fail at random
+    report_simulation = etl_simulator.simulate_failures(
+        qty_samples=10000, probability_mapping=0.01, probability_source=0.02, seed=1
+    )
+    with open(f"{dir_output}dag_run_simulation.json", "w", encoding="utf-8") as file:
+        json.dump(report_simulation, file, indent=4)
+    # Entities and mappings whose failure takes down the most downstream mappings
+    etl_simulator.write_blast_radius(file_jsonl=f"{dir_output}blast_radius.jsonl")
+    # Mappings to rerun after the failures, with run levels and stages for the rerun only
+    lst_rerun = etl_simulator.get_rerun_plan(entity_refs=lst_entities_failed)
+    with open(f"{dir_output}rerun_plan.jsonl", "w", encoding="utf-8") as file:
+        for item in lst_rerun:
+            file.write(json.dumps(item) + "\n")
     # Create fallout visualization
     etl_simulator.plot_etl_fallout(file_html=f"{dir_output}dag_run_report.html")
+    logger.info(f"RETW cache statistics: {cache.get_stats()}")
@@ -0,0 +1,95 @@
+import csv
+import json
+from collections import defaultdict
+from pathlib import Path
+from statistics import median
+
+from logtools import get_logger
+
+logger = get_logger(__name__)
+
+
+class MappingCosts:
+    """Estimates of the run time of mappings, based on the run times of earlier runs.
+
+    Run times are read from CSV or JSON files with a record per run of a mapping, with the fields
+    'CodeMapping' and 'Seconds', and optionally 'FileRETW' to tell apart mappings with the same code
+    in different RETW files. RETW files are matched on their file name, so the history stays
+    valid when the files are moved. The estimate of a mapping is the median of its run times,
+    mappings without history get the default cost.
+    """
+
+    def __init__(self, cost_default: float = 60.0):
+        """Initializes a new instance of the MappingCosts class.
+
+        Args:
+            cost_default (float, optional): Cost of a mapping without run history, in seconds.
+                Defaults to 60.
+        """
+        self.cost_default = cost_default
+        # Run times by (RETW file name or None, mapping code)
+        self._runs = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def add_run(self, code_mapping: str, seconds: float, file_RETW: str = None) -> None:
+        """Add the run time of a single run of a mapping.
+
+        Args:
+            code_mapping (str): Code of the mapping
+            seconds (float): Run time of the mapping
+            file_RETW (str, optional): RETW file of the mapping. Defaults to the mapping code in any file.
+
+        Returns:
+            None
+        """
+        name_file = Path(file_RETW).name if file_RETW else None
+        self._runs[(name_file, code_mapping)].append(float(seconds))
+
+    def read(self, file_runs: str) -> None:
+        """Read run times from a CSV or JSON file, depending on its suffix.
+
+        Args:
+            file_runs (str): Path of a '.csv' file with a header, or a '.json' file with a list of records
+
+        Raises:
+            ValueError: If the file is neither CSV nor JSON, or a record lacks 'CodeMapping' or 'Seconds'.
+
+        Returns:
+            None
+        """
+        suffix = Path(file_runs).suffix.lower()
+        if suffix == ".csv":
+            with open(file_runs, encoding="utf-8", newline="") as file:
+                records = list(csv.DictReader(file))
+        elif suffix == ".json":
+            with open(file_runs, encoding="utf-8") as file:
+                records = json.load(file)
+        else:
+            raise ValueError(f"Run times must be in a CSV or JSON file, not '{file_runs}'")
+        for record in records:
+            if "CodeMapping" not in record or "Seconds" not in record:
+                raise ValueError(f"Record without 'CodeMapping' or 'Seconds' in '{file_runs}'")
+            self.add_run(
+                code_mapping=record["CodeMapping"],
+                seconds=record["Seconds"],
+                file_RETW=record.get("FileRETW") or None,
+            )
+        logger.info(f"Read {len(records)} run times from '{file_runs}'")
+
+    def get_cost(self, file_RETW: str, code_mapping: str) -> float:
+        """Get the estimated run time of a mapping.
+
+        Args:
+            file_RETW (str): RETW file of the mapping
+            code_mapping (str): Code of the mapping
+
+        Returns:
+            float: The median of the run times of the mapping in this RETW file, otherwise of the
+            run times recorded without file, otherwise the default cost
+        """
+        for key in ((Path(file_RETW).name, code_mapping), (None, code_mapping)):
+            if key in self._runs:
+                return median(self._runs[key])
+        return self.cost_default
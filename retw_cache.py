@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+
+from logtools import get_logger
+
+logger = get_logger(__name__)
+
+# Version of the cached records, cache entries of another version are discarded
+FORMAT_RECORDS = 4
+
+
+class RetwCache:
+    """On-disk cache of the records extracted from RETW files.
+
+    Each RETW file has one cache entry, which is valid as long as the file's size, modification time
+    and content digest match those at the time the records were stored. When the size or
+    modification time changed, the content digest is recalculated, so a file that was only touched
+    still hits the cache. The total size of the entries is bounded, the least recently used
+    entries are evicted first.
+
+    The signature of a file (see get_signature) is to be taken before the file is parsed, so the
+    records of a file that changes while it is parsed are stored under the old signature and miss
+    the cache later. Entries are keyed by the resolved path of the RETW file, so a file has one entry
+    however its path is written; the records refer to the file by the path it was parsed with, so
+    they are only used for that path. Updates of the index by get, put and evictions are kept in
+    memory until the next flush.
+    """
+
+    def __init__(self, dir_cache: str = ".retw_cache", max_bytes: int = 256 * 1024**2):
+        """Initializes a new instance of the RetwCache class.
+
+        Args:
+            dir_cache (str, optional): Directory the cache entries are stored in. Defaults to '.retw_cache'.
+            max_bytes (int, optional): Maximum total size of the cache entries. Defaults to 256 MiB.
+        """
+        self.dir_cache = Path(dir_cache)
+        self.max_bytes = max_bytes
+        self.qty_hits = 0
+        self.qty_misses = 0
+        self.qty_evictions = 0
+        self.dir_cache.mkdir(parents=True, exist_ok=True)
+        self._file_index = self.dir_cache / "index.json"
+        self._index = self._load_index()
+        self._is_changed = False
+        # Signatures of files whose content get found changed, by key, see get_signature_checked
+        self._signatures_checked = {}
+        self._evict()
+        self.flush()
+
+    def _load_index(self) -> dict:
+        """Load the index of cache entries, discarding it if it has another records format.
+
+        Returns:
+            dict: Cache entry information by resolved RETW file path
+        """
+        try:
+            with open(self._file_index, encoding="utf-8") as file:
+                index = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logger.warning(f"Invalid cache index in '{self.dir_cache}', clearing cache")
+            index = {}
+        if index.get("format") != FORMAT_RECORDS:
+            for key in index.get("entries", {}):
+                self._file_entry(key).unlink(missing_ok=True)
+            return {}
+        return index["entries"]
+
+    def _save_index(self) -> None:
+        """Write the index of cache entries to disk."""
+        file_tmp = self._file_index.with_suffix(".tmp")
+        with open(file_tmp, "w", encoding="utf-8") as file:
+            json.dump({"format": FORMAT_RECORDS, "entries": self._index}, file)
+        os.replace(file_tmp, self._file_index)
+        self._is_changed = False
+
+    def flush(self) -> None:
+        """Write the index of cache entries to disk if it changed since it was last written."""
+        if self._is_changed:
+            self._save_index()
+
+    def _get_key(self, file_RETW: str) -> str:
+        """Key of a RETW file in the index, so different paths to the same file share an entry.
+
+        Args:
+            file_RETW (str): RETW file path
+
+        Returns:
+            str: Resolved RETW file path
+        """
+        return str(Path(file_RETW).resolve())
+
+    def _file_entry(self, key: str) -> Path:
+        """Path of the cache entry for a RETW file.
+
+        Args:
+            key (str): Key of the RETW file in the index
+
+        Returns:
+            Path: Cache entry file
+        """
+        name = hashlib.blake2b(bytes(key, "UTF-8"), digest_size=16).hexdigest()
+        return self.dir_cache / f"{name}.pickle"
+
+    def _is_valid(self, key: str, entry: dict) -> bool:
+        """Check whether a cache entry still matches the RETW file.
+
+        When the content digest is calculated and doesn't match, the file's signature is kept, so
+        it doesn't have to be calculated again when the file is parsed (see get_signature_checked).
+
+        Args:
+            key (str): Key of the RETW file in the index
+            entry (dict): Index information of the cache entry
+
+        Returns:
+            bool: Whether the cached records are those of the file's current content
+        """
+        stat = Path(key).stat()
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return True
+        if entry["size"] != stat.st_size:
+            return False
+        digest = _digest(key)
+        if entry["digest"] != digest:
+            self._signatures_checked[key] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "digest": digest,
+            }
+            return False
+        entry["mtime"] = stat.st_mtime_ns
+        self._is_changed = True
+        return True
+
+    def get_signature_checked(self, file_RETW: str) -> dict | None:
+        """Take the signature of a RETW file that get calculated when it missed the cache.
+
+        Args:
+            file_RETW (str): RETW file path
+
+        Returns:
+            dict | None: The signature to pass to take_signature, None if get didn't calculate the
+            file's content digest
+        """
+        return self._signatures_checked.pop(self._get_key(file_RETW), None)
+
+    def get_signature(self, file_RETW: str) -> dict | None:
+        """Take the size, modification time and content digest of a RETW file, see take_signature.
+
+        The content digest calculated by get is reused if the file didn't change since.
+
+        Args:
+            file_RETW (str): RETW file path
+
+        Returns:
+            dict | None: The signature to pass to put with the records parsed after it was taken,
+            None if the file can't be read
+        """
+        return take_signature(
+            file_RETW=file_RETW, signature_checked=self.get_signature_checked(file_RETW)
+        )
+
+    def get(self, file_RETW: str) -> object:
+        """Retrieve the cached records of a RETW file.
+
+        Args:
+            file_RETW (str): RETW file path
+
+        Returns:
+            object: The cached records, None if there are none for the file's current content
+        """
+        key = self._get_key(file_RETW)
+        entry = self._index.get(key)
+        if entry is not None and entry["file"] != file_RETW:
+            entry = None
+        try:
+            is_hit = entry is not None and self._is_valid(key, entry)
+            if is_hit:
+                with open(self._file_entry(key), "rb") as file:
+                    records = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            is_hit = False
+        if not is_hit:
+            self.qty_misses += 1
+            return None
+        self.qty_hits += 1
+        entry["last_used"] = time.time()
+        self._is_changed = True
+        logger.info(f"Using cached records for RETW file '{file_RETW}'")
+        return records
+
+    def put(self, file_RETW: str, records: object, signature: dict) -> None:
+        """Store the records extracted from a RETW file.
+
+        Args:
+            file_RETW (str): RETW file path
+            records (object): Records extracted from the file
+            signature (dict): Signature of the file taken before it was parsed, see get_signature
+        """
+        key = self._get_key(file_RETW)
+        file_entry = self._file_entry(key)
+        with open(file_entry, "wb") as file:
+            pickle.dump(records, file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._index[key] = {
+            "file": file_RETW,
+            **signature,
+            "bytes": file_entry.stat().st_size,
+            "last_used": time.time(),
+        }
+        self._is_changed = True
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used cache entries until the cache fits its maximum size."""
+        qty_bytes = sum(entry["bytes"] for entry in self._index.values())
+        if qty_bytes <= self.max_bytes:
+            return
+        by_last_used = sorted(self._index.items(), key=lambda item: item[1]["last_used"])
+        for key, entry in by_last_used:
+            if qty_bytes <= self.max_bytes:
+                break
+            self._file_entry(key).unlink(missing_ok=True)
+            del self._index[key]
+            qty_bytes -= entry["bytes"]
+            self.qty_evictions += 1
+            logger.info(f"Evicted cached records for RETW file '{key}'")
+        self._is_changed = True
+
+    def clear(self) -> None:
+        """Remove all cache entries."""
+        for key in self._index:
+            self._file_entry(key).unlink(missing_ok=True)
+        self._index = {}
+        self._signatures_checked = {}
+        self._save_index()
+
+    def get_stats(self) -> dict:
+        """Report on the use of the cache.
+
+        Returns:
+            dict: Number of hits, misses and evictions since the cache was opened, and the number
+            and total size of the stored entries
+        """
+        return {
+            "hits": self.qty_hits,
+            "misses": self.qty_misses,
+            "evictions": self.qty_evictions,
+            "entries": len(self._index),
+            "bytes": sum(entry["bytes"] for entry in self._index.values()),
+        }
+
+
+def _digest(file_RETW: str) -> str:
+    """Calculate the digest of a file's content.
+
+    Args:
+        file_RETW (str): RETW file path
+
+    Returns:
+        str: Hexadecimal content digest
+    """
+    hash_content = hashlib.blake2b(digest_size=16)
+    with open(file_RETW, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            hash_content.update(chunk)
+    return hash_content.hexdigest()
+
+
+def take_signature(file_RETW: str, signature_checked: dict = None) -> dict | None:
+    """Take the size, modification time and content digest of a RETW file.
+
+    It doesn't use the cache's state, so it can run in the worker process that parses the file.
+
+    Args:
+        file_RETW (str): RETW file path
+        signature_checked (dict, optional): Signature calculated earlier, see
+            RetwCache.get_signature_checked, its digest is reused if the file's size and modification
+            time didn't change since. Defaults to calculating the digest.
+
+    Returns:
+        dict | None: The signature to pass to RetwCache.put with the records parsed after it was
+        taken, None if the file can't be read
+    """
+    try:
+        stat = Path(file_RETW).stat()
+        if signature_checked is not None and (
+            signature_checked["size"] == stat.st_size
+            and signature_checked["mtime"] == stat.st_mtime_ns
+        ):
+            return dict(signature_checked)
+        return {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "digest": _digest(file_RETW),
+        }
+    except OSError:
+        return None
@@ -0,0 +1,393 @@
+import io
+import json
+import re
+from json.decoder import scanstring
+
+from logtools import get_logger
+
+logger = get_logger(__name__)
+
+# Fields of a RETW document that are needed to build the graphs. A dictionary selects the keys
+# of an object, a list selects the items of an array and True selects the complete value.
+_FIELDS_ENTITY_REF = {
+    "Id": True,
+    "Name": True,
+    "Code": True,
+    "CodeModel": True,
+    "Stereotype": True,
+}
+_FIELDS_AUDIT = {
+    "CreationDate": True,
+    "Creator": True,
+    "ModificationDate": True,
+    "Modifier": True,
+}
+SELECTION_GRAPH = {
+    "Models": [
+        {
+            "Id": True,
+            "Name": True,
+            "Code": True,
+            "IsDocumentModel": True,
+            "Entities": [{"Id": True, "Name": True, "Code": True} | _FIELDS_AUDIT],
+        }
+    ],
+    "Mappings": [
+        {"Id": True, "Name": True, "Code": True}
+        | _FIELDS_AUDIT
+        | {
+            "SourceComposition": [{"JoinType": True, "Entity": _FIELDS_ENTITY_REF}],
+            "EntityTarget": _FIELDS_ENTITY_REF,
+        }
+    ],
+}
+
+_RE_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_RE_NUMBER_CHARS = re.compile(r"[-+.0-9eE]*")
+# Everything up to the next bracket that is not part of a string
+_RE_UNTIL_BRACKET = re.compile(
+    r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*'
+)
+
+
+def select_fields(value: object, selection: dict = None) -> object:
+    """Prune a decoded json value to the selection.
+
+    Args:
+        value (object): Decoded json value
+        selection (dict, optional): Selection that applies to the value, see RetwReader. Defaults to
+            the fields used for building the graphs.
+
+    Returns:
+        object: The selected part of the value.
+    """
+    if selection is None:
+        selection = SELECTION_GRAPH
+    if isinstance(selection, dict) and isinstance(value, dict):
+        return {
+            key: select_fields(value=item, selection=selection[key])
+            for key, item in value.items()
+            if key in selection
+        }
+    if isinstance(selection, list) and isinstance(value, list):
+        return [select_fields(value=item, selection=selection[0]) for item in value]
+    return value
+
+
+class RetwReader:
+    """Reads the parts of a RETW file that are needed to build the graphs.
+
+    The document is read in chunks and walked as a stream of object members and array items.
+    Members that are part of the selection are decoded, all others are skipped: small values are
+    passed over by the json decoder within the current chunk, values that span chunks by counting
+    brackets. The full document is never held in memory, neither as text nor as Python objects.
+    The result has the same layout as the RETW document, so it can be used in place of the fully
+    loaded json.
+
+    Walking the document in Python is slower than json.load with the C decoder, so the reader is
+    meant for files that don't fit in memory comfortably; for smaller files json.load followed by
+    select_fields gives the same result faster.
+    """
+
+    def __init__(self, selection: dict = None, size_chunk: int = 1 << 16):
+        """Initializes a new instance of the RetwReader class.
+
+        Args:
+            selection (dict, optional): Fields to extract from the document, a dictionary selects
+                the keys of an object, a list the items of an array and True the complete value.
+                Defaults to the fields used for building the graphs.
+            size_chunk (int, optional): Number of characters read from the file at once.
+        """
+        self.selection = SELECTION_GRAPH if selection is None else selection
+        self.size_chunk = size_chunk
+        self._decoder = json.JSONDecoder()
+        self._file = None
+        self._buffer = ""
+        self._pos = 0
+        # Position of the start of the buffer in the document, for error messages
+        self._offset = 0
+        self._lineno = 1
+        self._colno = 1
+
+    def read(self, file_RETW: str) -> dict:
+        """Read the selected fields of a RETW file.
+
+        Args:
+            file_RETW (str): RETW file path
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            json.JSONDecodeError: If the file does not contain valid json.
+
+        Returns:
+            dict: The selected part of the RETW document
+        """
+        with open(file_RETW) as file:
+            return self._read_document(file=file)
+
+    def reads(self, doc: str) -> dict:
+        """Read the selected fields of a RETW document.
+
+        Args:
+            doc (str): RETW document
+
+        Raises:
+            json.JSONDecodeError: If the document is not valid json.
+
+        Returns:
+            dict: The selected part of the RETW document
+        """
+        return self._read_document(file=io.StringIO(doc))
+
+    def _read_document(self, file: io.TextIOBase) -> dict:
+        """Read the selected fields of the document in a text stream.
+
+        Args:
+            file (io.TextIOBase): Stream containing the RETW document
+
+        Raises:
+            json.JSONDecodeError: If the document is not valid json.
+
+        Returns:
+            dict: The selected part of the RETW document
+        """
+        self._file = file
+        self._buffer = ""
+        self._pos = 0
+        self._offset = 0
+        self._lineno = 1
+        self._colno = 1
+        try:
+            self._skip_whitespace()
+            result = self._read_value(self.selection)
+            self._skip_whitespace()
+            if self._peek():
+                raise json.JSONDecodeError("Extra data", self._buffer, self._pos)
+        except json.JSONDecodeError as e:
+            raise self._get_error(msg=e.msg, pos=e.pos) from None
+        finally:
+            self._file = None
+            self._buffer = ""
+        return result
+
+    def _fill(self) -> bool:
+        """Append the next chunk of the file to the unread part of the buffer.
+
+        At least as many characters as are still unread are added, so a value that
+        is retried after each fill is decoded in amortized linear time.
+
+        Returns:
+            bool: False if the end of the file was reached
+        """
+        unread = self._buffer[self._pos :]
+        chunk = self._file.read(max(self.size_chunk, len(unread)))
+        if not chunk:
+            return False
+        qty_newlines = self._buffer.count("\n", 0, self._pos)
+        if qty_newlines:
+            self._lineno += qty_newlines
+            self._colno = self._pos - self._buffer.rindex("\n", 0, self._pos)
+        else:
+            self._colno += self._pos
+        self._offset += self._pos
+        self._buffer = unread + chunk
+        self._pos = 0
+        return True
+
+    def _get_error(self, msg: str, pos: int) -> json.JSONDecodeError:
+        """Create a decode error for a position in the buffer, located in the whole document.
+
+        Args:
+            msg (str): Description of the error.
+            pos (int): Position of the error in the buffer.
+
+        Returns:
+            json.JSONDecodeError: Error with the position, line and column in the document
+        """
+        error = json.JSONDecodeError(msg, self._buffer, pos)
+        qty_newlines = self._buffer.count("\n", 0, pos)
+        error.lineno = self._lineno + qty_newlines
+        if qty_newlines:
+            error.colno = pos - self._buffer.rindex("\n", 0, pos)
+        else:
+            error.colno = self._colno + pos
+        error.pos = self._offset + pos
+        error.args = (f"{msg}: line {error.lineno} column {error.colno} (char {error.pos})",)
+        return error
+
+    def _peek(self) -> str:
+        """Return the character at the cursor, an empty string at the end of the file."""
+        while self._pos >= len(self._buffer):
+            if not self._fill():
+                return ""
+        return self._buffer[self._pos]
+
+    def _skip_whitespace(self) -> None:
+        """Move the cursor past whitespace."""
+        while True:
+            self._pos = _RE_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def _expect(self, char: str) -> None:
+        """Move the cursor past an expected character, preceded by whitespace.
+
+        Args:
+            char (str): The expected character.
+
+        Raises:
+            json.JSONDecodeError: If the next character is not the expected one.
+        """
+        self._skip_whitespace()
+        if self._peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self._buffer, self._pos)
+        self._pos += 1
+
+    def _decode(self, decode) -> object:
+        """Decode the value at the cursor, reading more of the file until it is complete.
+
+        Args:
+            decode: Function that takes the buffer and cursor and returns the value and its end.
+
+        Raises:
+            json.JSONDecodeError: If the value is not valid json.
+
+        Returns:
+            object: The decoded value
+        """
+        while True:
+            try:
+                value, end = decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer might continue in the next chunk
+            end_number = _RE_NUMBER_CHARS.match(self._buffer, end).end()
+            if end_number < len(self._buffer) or not self._fill():
+                self._pos = end
+                return value
+
+    def _read_value(self, selection) -> object:
+        """Read the value at the cursor, restricted to the selection.
+
+        Args:
+            selection: Selection that applies to the value.
+
+        Returns:
+            object: The selected part of the value.
+        """
+        char = self._peek()
+        is_object = isinstance(selection, dict) and char == "{"
+        is_array = isinstance(selection, list) and char == "["
+        if is_object or is_array:
+            # Values that end within the buffer are decoded at once and then pruned
+            try:
+                value, self._pos = self._decoder.raw_decode(self._buffer, self._pos)
+                return select_fields(value=value, selection=selection)
+            except json.JSONDecodeError:
+                pass
+        if is_object:
+            result = {}
+            for key in self._iter_members():
+                if key in selection:
+                    result[key] = self._read_value(selection[key])
+                else:
+                    self._skip_value()
+            return result
+        if is_array:
+            return [self._read_value(selection[0]) for _ in self._iter_items()]
+        # Scalars and values without a narrower selection are decoded completely
+        return self._decode(self._decoder.raw_decode)
+
+    def _iter_members(self):
+        """Iterate over the keys of the object at the cursor.
+
+        For each key the cursor is placed at the member's value, which must be consumed
+        (read or skipped) before the next key is requested.
+
+        Yields:
+            str: Key of the object member
+        """
+        self._expect("{")
+        self._skip_whitespace()
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            self._skip_whitespace()
+            if self._peek() != '"':
+                raise json.JSONDecodeError(
+                    "Expecting property name enclosed in double quotes",
+                    self._buffer,
+                    self._pos,
+                )
+            key = self._decode(lambda buffer, pos: scanstring(buffer, pos + 1))
+            self._expect(":")
+            self._skip_whitespace()
+            yield key
+            self._skip_whitespace()
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            self._expect(",")
+
+    def _iter_items(self):
+        """Iterate over the items of the array at the cursor.
+
+        For each item the cursor is placed at its value, which must be consumed
+        before the next item is requested.
+
+        Yields:
+            int: Index of the array item
+        """
+        self._expect("[")
+        self._skip_whitespace()
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            self._skip_whitespace()
+            yield index
+            index += 1
+            self._skip_whitespace()
+            if self._peek() == "]":
+                self._pos += 1
+                return
+            self._expect(",")
+
+    def _skip_value(self) -> None:
+        """Move the cursor past the value at the cursor without keeping it.
+
+        Objects and arrays that end within the buffer are passed over by the json decoder,
+        longer ones are skipped by counting brackets outside of strings, so only their
+        balance is checked.
+
+        Raises:
+            json.JSONDecodeError: If the value is invalid or unterminated.
+        """
+        if self._peek() not in ("{", "["):
+            self._read_value(True)
+            return
+        try:
+            _, self._pos = self._decoder.raw_decode(self._buffer, self._pos)
+            return
+        except json.JSONDecodeError:
+            if not self._fill():
+                raise
+        depth = 0
+        while True:
+            self._pos = _RE_UNTIL_BRACKET.match(self._buffer, self._pos).end()
+            char = self._buffer[self._pos : self._pos + 1]
+            if char in ("", '"'):
+                # End of the buffer, possibly within a string
+                if not self._fill():
+                    raise json.JSONDecodeError(
+                        "Unterminated value", self._buffer, self._pos
+                    )
+                continue
+            depth += 1 if char in "{[" else -1
+            self._pos += 1
+            if depth == 0:
+                return